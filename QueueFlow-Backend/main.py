@@ -1,28 +1,66 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey
+from fastapi.responses import Response, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import create_engine, event, inspect, tuple_, Column, Integer, String, DateTime, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
 from typing import Optional, List
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
 import jwt
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 
 # Configuration
-DATABASE_URL = "sqlite:///./queueflow.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./queueflow.db")
 SECRET_KEY = "votre_cle_secrete_super_securisee_changez_moi_en_production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Liste des tickets : taille de page, lignes lues (et envoyées) à la fois en export
+TICKETS_PAGE_SIZE = 100
+TICKETS_MAX_PAGE_SIZE = 1000
+TICKETS_EXPORT_BATCH = 500
+
+# Cache token -> utilisateur authentifié (secondes, nombre de tokens)
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
 # Database setup
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-# Password hasher
-pwd_hasher = PasswordHasher()
+# Password hasher (coût argon2 réglable, voir benchmarks/argon2_cost.py à la racine)
+# Valeurs par défaut = celles d'argon2-cffi : les hash existants restent valides
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # Kio par hash en cours
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+pwd_hasher = PasswordHasher(
+    time_cost=ARGON2_TIME_COST,
+    memory_cost=ARGON2_MEMORY_COST,
+    parallelism=ARGON2_PARALLELISM
+)
+
+# Pool dédié au hachage : un pic de connexions (changement d'équipe) attend
+# ici au lieu d'occuper tous les threads des routes de tickets
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "5"))  # secondes
+
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_slots = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
 
 # Models
 class User(Base):
@@ -61,11 +99,15 @@ class Ticket(Base):
     status = Column(String, default="waiting")
     scheduled_time = Column(String)
     position = Column(Integer)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+# create_all ne crée pas les index ajoutés à une table existante
+for index in Ticket.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+
 # Pydantic schemas
 class UserCreate(BaseModel):
     full_name: str
@@ -112,6 +154,29 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_hasher.hash(password)
 
+async def run_password_job(func, *args):
+    # Au plus PASSWORD_HASH_WORKERS hash en cours ; au-delà on attend une place,
+    # et après PASSWORD_HASH_QUEUE_TIMEOUT secondes on répond 503
+    try:
+        await asyncio.wait_for(password_slots.acquire(), PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="Trop de connexions en cours, réessayez dans un instant",
+            headers={"Retry-After": "1"}
+        )
+    loop = asyncio.get_running_loop()
+    future = password_executor.submit(func, *args)
+    # La place n'est rendue qu'à la fin du hash, même si le client abandonne
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(password_slots.release))
+    return await asyncio.wrap_future(future)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await run_password_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await run_password_job(get_password_hash, password)
+
 # JWT functions
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -120,22 +185,111 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str, db: Session):
+# Cache des utilisateurs authentifiés : un token déjà vérifié ne coûte ni
+# décodage JWT ni requête SQL jusqu'à min(exp du token, PRINCIPAL_CACHE_TTL)
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    full_name: str
+    email: str
+    role: str
+    institution_id: Optional[int]
+
+principal_cache = OrderedDict()  # token -> (expire_at, Principal)
+principal_lock = threading.Lock()
+
+def get_cached_principal(token: str) -> Optional[Principal]:
+    with principal_lock:
+        entry = principal_cache.get(token)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del principal_cache[token]
+            return None
+        principal_cache.move_to_end(token)
+        return entry[1]
+
+def cache_principal(token: str, principal: Principal, token_exp: float):
+    expire_at = min(token_exp, time.time() + PRINCIPAL_CACHE_TTL)
+    with principal_lock:
+        principal_cache[token] = (expire_at, principal)
+        principal_cache.move_to_end(token)
+        while len(principal_cache) > PRINCIPAL_CACHE_SIZE:
+            principal_cache.popitem(last=False)
+
+def invalidate_principal(user_id: int):
+    with principal_lock:
+        for token in [t for t, (_, p) in principal_cache.items() if p.id == user_id]:
+            del principal_cache[token]
+
+# Rôle ou institution modifié, utilisateur supprimé : ses tokens en cache sont oubliés
+# (les UPDATE en masse via query.update() ne passent pas par ces événements)
+@event.listens_for(User, "after_update")
+def invalidate_principal_on_update(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.role.history.has_changes() or state.attrs.institution_id.history.has_changes():
+        invalidate_principal(target.id)
+
+@event.listens_for(User, "after_delete")
+def invalidate_principal_on_delete(mapper, connection, target):
+    invalidate_principal(target.id)
+
+def get_current_user(token: str, db: Session) -> Principal:
+    principal = get_cached_principal(token)
+    if principal:
+        return principal
+
+    # Sans "exp", le token ne pourrait pas borner sa durée en cache : refusé
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = int(payload.get("sub"))
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
-        return user
-    except:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "sub"]})
+        user_id = int(payload["sub"])
+    except Exception:
         raise HTTPException(status_code=401, detail="Token invalide")
 
-def check_role(token: str, required_roles: list, db: Session):
-    user = get_current_user(token, db)
-    if user.role not in required_roles:
-        raise HTTPException(status_code=403, detail="Accès refusé")
-    return user
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+
+    principal = Principal(
+        id=user.id,
+        full_name=user.full_name,
+        email=user.email,
+        role=user.role,
+        institution_id=user.institution_id
+    )
+    cache_principal(token, principal, payload["exp"])
+    return principal
+
+# En-tête "Authorization: Bearer <token>" ; absent -> 401 (et non le 403 de HTTPBearer)
+bearer_scheme = HTTPBearer(auto_error=False)
+
+def check_role(required_roles: list):
+    # Dépendance des routes réservées : Depends(check_role(["admin"]))
+    # Token en cache : ni décodage JWT ni requête SQL (la session reste sans connexion)
+    def dependency(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+        db: Session = Depends(get_db)
+    ) -> Principal:
+        if credentials is None:
+            raise HTTPException(status_code=401, detail="Token manquant", headers={"WWW-Authenticate": "Bearer"})
+        user = get_current_user(credentials.credentials, db)
+        if user.role not in required_roles:
+            raise HTTPException(status_code=403, detail="Accès refusé")
+        return user
+    return dependency
+
+require_admin = check_role(["admin"])
+require_operator = check_role(["operator", "admin"])
+
+# Accès DB des routes async (exécutés dans le threadpool)
+def get_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+def save(db: Session, obj):
+    db.add(obj)
+    db.commit()
+    db.refresh(obj)
+    return obj
 
 # FastAPI app
 app = FastAPI(title="QueueFlow API")
@@ -147,6 +301,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Initialize test data
@@ -190,11 +345,16 @@ def init_test_data():
         db.add(service)
     db.commit()
 
+    # Hash des comptes de test, en parallèle dans le pool dédié
+    admin_hash, *operator_hashes = password_executor.map(
+        get_password_hash, ["admin123", "operator123", "operator123", "operator123"]
+    )
+
     # Créer un admin
     admin = User(
         full_name="Admin Principal",
         email="admin@queueflow.com",
-        hashed_password=get_password_hash("admin123"),
+        hashed_password=admin_hash,
         role="admin"
     )
     db.add(admin)
@@ -204,21 +364,21 @@ def init_test_data():
         User(
             full_name="Opérateur Le Dantec",
             email="operator@ledantec.sn",
-            hashed_password=get_password_hash("operator123"),
+            hashed_password=operator_hashes[0],
             role="operator",
             institution_id=1
         ),
         User(
             full_name="Opérateur Hôpital Principal",
             email="operator@principal.sn",
-            hashed_password=get_password_hash("operator123"),
+            hashed_password=operator_hashes[1],
             role="operator",
             institution_id=2
         ),
         User(
             full_name="Opérateur Banque Atlantique",
             email="operator@atlantique.sn",
-            hashed_password=get_password_hash("operator123"),
+            hashed_password=operator_hashes[2],
             role="operator",
             institution_id=3
         ),
@@ -234,16 +394,20 @@ def init_test_data():
     print("📧 Admin: admin@queueflow.com / admin123")
     print("📧 Opérateur Le Dantec: operator@ledantec.sn / operator123")
 
+@app.on_event("shutdown")
+def stop_password_executor():
+    password_executor.shutdown(wait=False, cancel_futures=True)
+
 # Routes - Authentication
 @app.post("/api/auth/signup")
-def signup(user_data: UserCreate, db: Session = Depends(get_db)):
+async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     # Vérifier si l'utilisateur existe
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await run_in_threadpool(get_user_by_email, db, user_data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email déjà utilisé")
 
-    # Hasher le mot de passe
-    hashed_password = get_password_hash(user_data.password)
+    # Hasher le mot de passe (pool dédié)
+    hashed_password = await get_password_hash_async(user_data.password)
 
     # Créer l'utilisateur
     new_user = User(
@@ -254,9 +418,7 @@ def signup(user_data: UserCreate, db: Session = Depends(get_db)):
         institution_id=user_data.institution_id
     )
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    new_user = await run_in_threadpool(save, db, new_user)
 
     # Créer le token
     token = create_access_token(data={"sub": str(new_user.id)})
@@ -273,13 +435,21 @@ def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     }
 
 @app.post("/api/auth/login")
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     # Chercher l'utilisateur
-    user = db.query(User).filter(User.email == user_data.email).first()
+    user = await run_in_threadpool(get_user_by_email, db, user_data.email)
 
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user or not await verify_password_async(user_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Email ou mot de passe incorrect")
 
+    # Coût argon2 modifié depuis le dernier hash : on en profite pour rehasher
+    if pwd_hasher.check_needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await get_password_hash_async(user_data.password)
+            await run_in_threadpool(db.commit)
+        except HTTPException:
+            pass  # pool saturé : l'ancien hash reste valide
+
     # Créer le token
     token = create_access_token(data={"sub": str(user.id)})
 
@@ -305,7 +475,7 @@ def get_institutions(db: Session = Depends(get_db)):
         "address": inst.address
     } for inst in institutions]
 
-@app.post("/api/institutions")
+@app.post("/api/institutions", dependencies=[Depends(require_admin)])
 def create_institution(institution: InstitutionCreate, db: Session = Depends(get_db)):
     new_institution = Institution(**institution.dict())
     db.add(new_institution)
@@ -337,7 +507,7 @@ def get_services(institution_id: Optional[int] = None, db: Session = Depends(get
         "estimated_time": s.estimated_time
     } for s in services]
 
-@app.post("/api/services")
+@app.post("/api/services", dependencies=[Depends(require_admin)])
 def create_service(service: ServiceCreate, db: Session = Depends(get_db)):
     new_service = Service(**service.dict())
     db.add(new_service)
@@ -351,14 +521,40 @@ def create_service(service: ServiceCreate, db: Session = Depends(get_db)):
     }
 
 # Routes - Tickets
-@app.get("/api/tickets")
-def get_tickets(
-    user_id: Optional[int] = None,
-    institution_id: Optional[int] = None,
-    status: Optional[str] = None,
-    db: Session = Depends(get_db)
-):
-    query = db.query(Ticket)
+# Tickets triés du plus récent au plus ancien, par (created_at, id) : le curseur
+# reprend après le dernier ticket de la page précédente (index sur created_at)
+def encode_ticket_cursor(created_at, ticket_id):
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{ticket_id}".encode()).decode()
+
+def decode_ticket_cursor(cursor: str):
+    try:
+        created_at, ticket_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        created_at, ticket_id = datetime.fromisoformat(created_at), int(ticket_id)
+        # Id hors des entiers SQLite (64 bits signés) : OverflowError du pilote, donc 500
+        if not -2 ** 63 <= ticket_id < 2 ** 63:
+            raise ValueError
+        return created_at, ticket_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+def tickets_query(db: Session, user_id, institution_id, status, after):
+    # Une seule requête : institution, service et usager par jointure
+    query = db.query(
+        Ticket.id,
+        Ticket.ticket_number,
+        Ticket.status,
+        Ticket.scheduled_time,
+        Ticket.position,
+        Ticket.created_at,
+        Institution.id.label("institution_id"),
+        Institution.name.label("institution_name"),
+        Service.id.label("service_id"),
+        Service.name.label("service_name"),
+        User.id.label("user_id"),
+        User.full_name.label("user_full_name")
+    ).outerjoin(Institution, Institution.id == Ticket.institution_id) \
+     .outerjoin(Service, Service.id == Ticket.service_id) \
+     .outerjoin(User, User.id == Ticket.user_id)
 
     if user_id:
         query = query.filter(Ticket.user_id == user_id)
@@ -366,37 +562,97 @@ def get_tickets(
         query = query.filter(Ticket.institution_id == institution_id)
     if status:
         query = query.filter(Ticket.status == status)
+    if after:
+        query = query.filter(tuple_(Ticket.created_at, Ticket.id) < tuple_(*after))
+
+    return query.order_by(Ticket.created_at.desc(), Ticket.id.desc())
+
+def ticket_to_dict(row):
+    return {
+        "id": row.id,
+        "ticket_number": row.ticket_number,
+        "status": row.status,
+        "scheduled_time": row.scheduled_time,
+        "position": row.position,
+        "created_at": row.created_at.isoformat(),
+        "institution": {
+            "id": row.institution_id,
+            "name": row.institution_name
+        } if row.institution_id is not None else None,
+        "service": {
+            "id": row.service_id,
+            "name": row.service_name
+        } if row.service_id is not None else None,
+        "user": {
+            "id": row.user_id,
+            "full_name": row.user_full_name
+        } if row.user_id is not None else None
+    }
 
-    tickets = query.order_by(Ticket.created_at.desc()).all()
-
-    result = []
-    for ticket in tickets:
-        institution = db.query(Institution).filter(Institution.id == ticket.institution_id).first()
-        service = db.query(Service).filter(Service.id == ticket.service_id).first()
-        user = db.query(User).filter(User.id == ticket.user_id).first()
-
-        result.append({
-            "id": ticket.id,
-            "ticket_number": ticket.ticket_number,
-            "status": ticket.status,
-            "scheduled_time": ticket.scheduled_time,
-            "position": ticket.position,
-            "created_at": ticket.created_at.isoformat(),
-            "institution": {
-                "id": institution.id,
-                "name": institution.name
-            } if institution else None,
-            "service": {
-                "id": service.id,
-                "name": service.name
-            } if service else None,
-            "user": {
-                "id": user.id,
-                "full_name": user.full_name
-            } if user else None
-        })
-
-    return result
+def ticket_chunks(rows, ndjson: bool):
+    # Tableau JSON ou une ligne JSON par ticket, envoyés par paquets
+    batch = [] if ndjson else ["["]
+    first = True
+    for row in rows:
+        item = json.dumps(ticket_to_dict(row), ensure_ascii=False)
+        if ndjson:
+            batch.append(item + "\n")
+        else:
+            batch.append(item if first else "," + item)
+            first = False
+        if len(batch) >= TICKETS_EXPORT_BATCH:
+            yield "".join(batch)
+            batch = []
+    if not ndjson:
+        batch.append("]")
+    if batch:
+        yield "".join(batch)
+
+def export_ticket_rows(user_id, institution_id, status, after):
+    # Page par page, chaque page dans sa propre transaction courte : mémoire
+    # constante, et la base n'est pas verrouillée pendant tout l'export
+    db = SessionLocal()
+    try:
+        while True:
+            rows = tickets_query(db, user_id, institution_id, status, after).limit(TICKETS_EXPORT_BATCH).all()
+            db.rollback()
+            yield from rows
+            if len(rows) < TICKETS_EXPORT_BATCH:
+                return
+            after = (rows[-1].created_at, rows[-1].id)
+    finally:
+        db.close()
+
+@app.get("/api/tickets")
+def get_tickets(
+    user_id: Optional[int] = None,
+    institution_id: Optional[int] = None,
+    status: Optional[str] = None,
+    limit: int = Query(TICKETS_PAGE_SIZE, ge=1, le=TICKETS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    export: bool = False,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_db)
+):
+    after = decode_ticket_cursor(cursor) if cursor else None
+    ndjson = format == "ndjson"
+    media_type = "application/x-ndjson" if ndjson else "application/json"
+
+    # Export : tous les tickets (après le curseur), envoyés au fil de la lecture
+    if export:
+        return StreamingResponse(
+            ticket_chunks(export_ticket_rows(user_id, institution_id, status, after), ndjson),
+            media_type=media_type
+        )
+
+    # Une page ; le curseur de la suivante dans l'en-tête X-Next-Cursor
+    rows = tickets_query(db, user_id, institution_id, status, after).limit(limit + 1).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_ticket_cursor(rows[-1].created_at, rows[-1].id)
+
+    return Response("".join(ticket_chunks(rows, ndjson)), media_type=media_type, headers=headers)
 
 @app.post("/api/tickets")
 def create_ticket(ticket_data: TicketCreate, user_id: int, db: Session = Depends(get_db)):
@@ -466,7 +722,7 @@ def cancel_ticket(ticket_id: int, db: Session = Depends(get_db)):
 
     return {"message": "Ticket annulé avec succès"}
 
-@app.put("/api/tickets/{ticket_id}/call")
+@app.put("/api/tickets/{ticket_id}/call", dependencies=[Depends(require_operator)])
 def call_ticket(ticket_id: int, db: Session = Depends(get_db)):
     ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
 
@@ -478,7 +734,7 @@ def call_ticket(ticket_id: int, db: Session = Depends(get_db)):
 
     return {"message": "Ticket appelé avec succès"}
 
-@app.put("/api/tickets/{ticket_id}/complete")
+@app.put("/api/tickets/{ticket_id}/complete", dependencies=[Depends(require_operator)])
 def complete_ticket(ticket_id: int, db: Session = Depends(get_db)):
     ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
 
@@ -504,7 +760,7 @@ def complete_ticket(ticket_id: int, db: Session = Depends(get_db)):
     return {"message": "Ticket complété avec succès"}
 
 # Routes - Admin Stats
-@app.get("/api/admin/stats")
+@app.get("/api/admin/stats", dependencies=[Depends(require_admin)])
 def get_admin_stats(db: Session = Depends(get_db)):
     total_users = db.query(User).count()
     total_institutions = db.query(Institution).count()
@@ -40,7 +40,11 @@ const API_CONFIG = {
         ADMIN_OPERATORS: '/admin/operators',
 
         // Queue
-        QUEUE_INFO: '/queue/:institutionId'
+        QUEUE_INFO: '/queue/:institutionId',
+
+        // Temps réel (WebSocket)
+        QUEUE_WS: '/ws/queue/:institutionId',
+        TICKET_WS: '/ws/tickets/:number'
     }
 };
 
@@ -275,7 +279,8 @@ async function createTicket(institutionId, userId = null) {
 /**
  * Vérifier les statistiques d'un ticket
  * 
- * @param {string} ticketNumber - Numéro du ticket (ex: H001)
+ * @param {string} ticketNumber - Numéro affiché (ex: H01-1018-007 : lettre du type,
+ *     institution, jour de service MMJJ, séquence du jour) ou identifiant du ticket
  */
 async function getTicketStats(ticketNumber) {
     const endpoint = replaceParams(API_CONFIG.ENDPOINTS.TICKET_STATS, { number: ticketNumber });
@@ -315,7 +320,7 @@ async function callNextTicket(institutionId, operatorId) {
 /**
  * Marquer un ticket comme complété
  * 
- * @param {string} ticketNumber - Numéro du ticket
+ * @param {string} ticketNumber - Numéro affiché (ex: H01-1018-007) ou identifiant du ticket
  * @param {number} operatorId - ID de l'opérateur
  */
 async function completeTicket(ticketNumber, operatorId) {
@@ -325,6 +330,8 @@ async function completeTicket(ticketNumber, operatorId) {
 
 /**
  * Marquer un ticket comme manqué
+ *
+ * @param {string} ticketNumber - Numéro affiché (ex: H01-1018-007) ou identifiant du ticket
  */
 async function missTicket(ticketNumber) {
     const endpoint = `${API_CONFIG.ENDPOINTS.MISS_TICKET}/${ticketNumber}`;
@@ -369,6 +376,64 @@ async function getQueueInfo(institutionId) {
     return await apiRequest(endpoint);
 }
 
+// ========================================
+// MISES À JOUR EN TEMPS RÉEL (WebSocket)
+// ========================================
+
+/**
+ * Ouvre un WebSocket et appelle onMessage à chaque message reçu
+ * Reconnexion automatique après une coupure (sauf 4404 = introuvable)
+ *
+ * @returns {Function} Fonction pour se désabonner
+ */
+function subscribe(endpoint, onMessage) {
+    const url = API_CONFIG.BASE_URL.replace(/^http/, 'ws') + endpoint;
+    let socket = null;
+    let closed = false;
+
+    function connect() {
+        socket = new WebSocket(url);
+        socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+        socket.onclose = (event) => {
+            if (!closed && event.code !== 4404) {
+                setTimeout(connect, 3000);
+            }
+        };
+    }
+
+    connect();
+
+    return () => {
+        closed = true;
+        if (socket) socket.close();
+    };
+}
+
+/**
+ * S'abonner aux changements de la file d'une institution
+ * Remplace les appels répétés à getQueueInfo()
+ *
+ * @param {number} institutionId - ID de l'institution
+ * @param {Function} onUpdate - Reçoit {event, ticket_number, queue}
+ */
+function subscribeQueue(institutionId, onUpdate) {
+    const endpoint = replaceParams(API_CONFIG.ENDPOINTS.QUEUE_WS, { institutionId });
+    return subscribe(endpoint, onUpdate);
+}
+
+/**
+ * S'abonner à la position d'un ticket
+ * Remplace les appels répétés à getTicketStats()
+ *
+ * @param {string} ticketNumber - Numéro affiché (ex: H01-1018-007 : lettre du type,
+ *     institution, jour de service MMJJ, séquence du jour) ou identifiant du ticket
+ * @param {Function} onUpdate - Reçoit {event, status, stats}
+ */
+function subscribeTicket(ticketNumber, onUpdate) {
+    const endpoint = replaceParams(API_CONFIG.ENDPOINTS.TICKET_WS, { number: ticketNumber });
+    return subscribe(endpoint, onUpdate);
+}
+
 // ========================================
 // FONCTIONS DE REMPLACEMENT POUR LE FRONTEND
 // ========================================
@@ -444,6 +509,8 @@ window.QueueFlowAPI = {
 
     // Queue
     getQueueInfo,
+    subscribeQueue,
+    subscribeTicket,
 
     // Helpers
     initializeUsersFromBackend,
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+archive.py - Archivage Quotidien des Tickets Terminés
+=====================================================
+Chaque jour (UTC), les tickets terminés (COMPLETED, CANCELLED, MISSED)
+des jours précédents quittent la table `tickets` pour `tickets_archive` :
+
+- la table `tickets` (file, opérateurs, statistiques du jour) ne contient
+  plus que le volume du jour et les tickets encore en cours
+- les lectures d'historique (crud_users.get_user_ticket_history,
+  daily_counters.rebuild, wait_model) lisent les deux tables
+
+Le déplacement se fait par lots (INSERT ... SELECT puis DELETE, un commit
+par lot) pour ne jamais bloquer l'émission de tickets longtemps. Le même
+passage recale `queues.total_tickets_today` sur le jour en cours.
+
+Lancé au démarrage de l'API puis chaque nuit par ArchiveScheduler ; il
+peut aussi être lancé à la main (idempotent) :
+
+    python archive.py
+"""
+
+import threading
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, and_, delete, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+import models
+from daily_counters import day_bounds
+from database import SessionLocal
+
+# Tickets déplacés par transaction
+ARCHIVE_BATCH_SIZE = 5000
+
+# Statuts définitifs : ces tickets ne changent plus
+FINISHED_STATUSES = (
+    models.TicketStatus.COMPLETED,
+    models.TicketStatus.CANCELLED,
+    models.TicketStatus.MISSED,
+)
+
+# Colonnes copiées telles quelles de tickets vers tickets_archive
+ARCHIVED_COLUMNS = (
+    "id", "service_day", "sequence", "ticket_number", "user_id", "institution_id", "status", "queue_position",
+    "operator_id", "created_at", "called_at", "completed_at",
+)
+
+
+def _archivable(cutoff: datetime):
+    """Tickets terminés, créés et clôturés avant `cutoff`"""
+    Ticket = models.Ticket
+    return and_(
+        Ticket.status.in_(FINISHED_STATUSES),
+        Ticket.created_at < cutoff,
+        or_(Ticket.completed_at.is_(None), Ticket.completed_at < cutoff),
+    )
+
+
+def archive_finished_tickets(db: Session, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Déplace les tickets terminés avant `cutoff` vers tickets_archive
+
+    Args:
+        db: Session de base de données (un commit par lot)
+        cutoff: Début du jour de service courant
+        batch_size: Tickets par lot
+
+    Returns:
+        Nombre de tickets archivés
+    """
+    Ticket = models.Ticket
+    moved = 0
+    while True:
+        try:
+            ids = db.scalars(
+                select(Ticket.id).where(_archivable(cutoff)).order_by(Ticket.id).limit(batch_size)
+            ).all()
+            if not ids:
+                db.rollback()
+                return moved
+
+            now = datetime.utcnow()
+            db.execute(
+                insert(models.TicketArchive).from_select(
+                    [*ARCHIVED_COLUMNS, "archived_at"],
+                    select(*(getattr(Ticket, column) for column in ARCHIVED_COLUMNS), literal(now, DateTime()))
+                    .where(Ticket.id.in_(ids))
+                )
+            )
+            db.execute(delete(Ticket).where(Ticket.id.in_(ids)).execution_options(synchronize_session=False))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        moved += len(ids)
+
+
+def reset_daily_queue_counters(db: Session, day: date) -> None:
+    """
+    Recale le nombre de tickets du jour de chaque queue
+
+    La valeur vient de daily_counters (0 si aucun ticket ce jour-là) :
+    relancer le job en cours de journée ne perd pas les tickets déjà émis.
+    """
+    counter = models.DailyCounter
+    db.execute(
+        update(models.Queue).values(
+            total_tickets_today=func.coalesce(
+                select(counter.tickets_created).where(
+                    counter.service_day == day,
+                    counter.institution_id == models.Queue.institution_id
+                ).scalar_subquery(),
+                0
+            )
+        )
+    )
+    db.commit()
+
+
+def rollover(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Passage au nouveau jour de service : archivage + compteurs des queues
+
+    Args:
+        db: Session de base de données
+        now: Instant de référence (maintenant par défaut)
+
+    Returns:
+        Nombre de tickets archivés
+    """
+    now = now or datetime.utcnow()
+    cutoff, _ = day_bounds(now.date())
+    moved = archive_finished_tickets(db, cutoff)
+    reset_daily_queue_counters(db, now.date())
+    return moved
+
+
+class ArchiveScheduler:
+    """Thread qui lance rollover() au démarrage puis chaque nuit (UTC)"""
+
+    def __init__(self, delay_after_midnight: float = 60.0):
+        self.delay_after_midnight = delay_after_midnight
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="ticket-archive", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _seconds_until_next_run(self) -> float:
+        now = datetime.utcnow()
+        _, midnight = day_bounds(now.date())
+        return (midnight - now).total_seconds() + self.delay_after_midnight
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            db = SessionLocal()
+            try:
+                moved = rollover(db)
+                if moved:
+                    print(f"✅ {moved} tickets archivés")
+            except Exception as e:
+                print(f"❌ Erreur archivage des tickets: {e}")
+            finally:
+                db.close()
+            self._stopped.wait(self._seconds_until_next_run())
+
+
+archive_scheduler = ArchiveScheduler()
+
+
+if __name__ == '__main__':
+    session = SessionLocal()
+    try:
+        count = rollover(session)
+    finally:
+        session.close()
+    print(f'✅ {count} tickets archivés, compteurs du jour recalés')
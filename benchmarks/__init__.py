@@ -0,0 +1,9 @@
+"""
+benchmarks - Mesures de Performance de QueueFlow
+================================================
+Scripts à lancer depuis la racine du projet, par exemple :
+
+    python -m benchmarks.sqlite_profile
+    python -m benchmarks.load --transport asgi
+    python -m benchmarks.argon2_cost
+"""
@@ -0,0 +1,91 @@
+"""
+benchmarks/argon2_cost.py - Coût du Hachage des Mots de Passe (argon2)
+======================================================================
+Aide à choisir les paramètres argon2 de QueueFlow-Backend/main.py
+(ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM) et la taille
+de son pool de hachage (PASSWORD_HASH_WORKERS).
+
+Pour chaque combinaison de paramètres :
+
+- durée d'un hash et d'une vérification seuls (médiane)
+- débit de connexions avec `--workers` hash en parallèle, comme le pool
+  dédié pendant un pic de connexions
+- mémoire occupée par le pool plein (workers × memory_cost)
+
+    python -m benchmarks.argon2_cost --time-cost 1,2,3 --memory-cost 19456,47104,65536 --workers 2
+
+Le résultat est affiché en JSON. Viser une vérification de l'ordre de
+50 à 250 ms, puis dimensionner le pool : un pic de N connexions est
+absorbé en N / logins_per_second secondes, à comparer à
+PASSWORD_HASH_QUEUE_TIMEOUT.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from argon2 import PasswordHasher
+
+PASSWORD = "operator123"
+
+
+def _ints(value: str) -> list:
+    return [int(item) for item in value.split(",") if item]
+
+
+def measure(time_cost: int, memory_cost: int, parallelism: int, workers: int, samples: int, logins: int) -> dict:
+    """Durées unitaires et débit d'un paramétrage"""
+    hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+    hash_ms, verify_ms = [], []
+    hashed = hasher.hash(PASSWORD)
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.hash(PASSWORD)
+        hash_ms.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        hasher.verify(hashed, PASSWORD)
+        verify_ms.append((time.perf_counter() - started) * 1000)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        started = time.perf_counter()
+        for _ in executor.map(lambda _: hasher.verify(hashed, PASSWORD), range(logins)):
+            pass
+        elapsed = time.perf_counter() - started
+
+    return {
+        "time_cost": time_cost,
+        "memory_cost_kib": memory_cost,
+        "parallelism": parallelism,
+        "hash_ms": round(statistics.median(hash_ms), 1),
+        "verify_ms": round(statistics.median(verify_ms), 1),
+        "logins_per_second": round(logins / elapsed, 1),
+        "pool_memory_mib": round(workers * memory_cost / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--time-cost", type=_ints, default=[1, 2, 3])
+    parser.add_argument("--memory-cost", type=_ints, default=[19456, 47104, 65536], help="Kio")
+    parser.add_argument("--parallelism", type=_ints, default=[1, 4])
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="hash en parallèle (PASSWORD_HASH_WORKERS)")
+    parser.add_argument("--samples", type=int, default=5, help="mesures unitaires par paramétrage")
+    parser.add_argument("--logins", type=int, default=40, help="vérifications pour le débit")
+    args = parser.parse_args()
+
+    results = [
+        measure(time_cost, memory_cost, parallelism, args.workers, args.samples, args.logins)
+        for time_cost in args.time_cost
+        for memory_cost in args.memory_cost
+        for parallelism in args.parallelism
+    ]
+    print(json.dumps({"cpus": os.cpu_count(), "workers": args.workers, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+benchmarks/call_next_stress.py - "Appeler le suivant" en Concurrence
+====================================================================
+50 opérateurs répartis sur 12 institutions appellent le ticket suivant
+en même temps, jusqu'à vider les files. Vérifie que chaque ticket n'a
+été remis qu'à un seul opérateur.
+
+Les opérateurs sont des threads d'un même processus, comme en
+production : l'API tourne avec un seul worker par base, qui possède la
+file en mémoire (un second est refusé au démarrage, voir
+queue_engine.acquire_process_lock). Ne pas lancer uvicorn avec
+plusieurs workers sur une même base.
+
+    python -m benchmarks.call_next_stress --operators 50 --tickets 6000
+
+--processes N répartit les opérateurs sur N processus, chacun avec sa
+propre file en mémoire. Ce n'est pas une configuration supportée : c'est
+un test de l'UPDATE conditionnel de claim_ticket(), qui doit empêcher
+seul une double attribution si un autre processus (script, outil
+d'administration) appelle des tickets sur la même base.
+
+Le résultat est affiché en JSON (appels/s, doubles attributions, tickets
+restés en attente).
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+INSTITUTIONS = 12
+
+
+def seed(tickets: int) -> None:
+    """Crée la base temporaire : institutions, queues et tickets en attente"""
+    import crud
+    import migrations
+    import models
+    import schemas
+    from database import SessionLocal, engine
+
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        for i in range(1, INSTITUTIONS + 1):
+            crud.create_institution(db, schemas.InstitutionCreate(
+                name=f"Institution {i}", type=models.InstitutionType.BANQUE, location="Dakar"
+            ))
+        # Émission en un lot (elle n'est pas mesurée ici)
+        crud.issue_tickets(db, [
+            schemas.TicketCreate(institution_id=1 + i % INSTITUTIONS) for i in range(tickets)
+        ])
+    finally:
+        db.close()
+
+
+def run_operators(operator_ids: list, start_at: float) -> tuple:
+    """
+    Exécute un groupe d'opérateurs (threads) dans ce processus
+
+    Returns:
+        (liste des (ticket_id, operator_id) obtenus, heure de fin)
+    """
+    import crud_async
+    import crud_users
+    from database import SessionLocal
+    from sqlalchemy.exc import OperationalError
+    from queue_engine import queue_writer, waiting_queues
+
+    db = SessionLocal()
+    waiting_queues.rebuild(db)
+    db.close()
+
+    claims = []
+    lock = threading.Lock()
+
+    def call_next(db, institution_id: int, operator_id: int):
+        # Mêmes tentatives que crud_async.call_next_ticket (ici dans un thread)
+        for attempt in range(crud_async.CLAIM_RETRIES):
+            try:
+                return crud_users.call_next_ticket(db, institution_id, operator_id)
+            except OperationalError as e:
+                if "locked" not in str(e) or attempt == crud_async.CLAIM_RETRIES - 1:
+                    raise
+                time.sleep(crud_async.CLAIM_RETRY_DELAY * 2 ** attempt)
+
+    def operator(operator_id: int) -> None:
+        institution_id = 1 + operator_id % INSTITUTIONS
+        local = []
+        db = SessionLocal()
+        try:
+            while True:
+                ticket = call_next(db, institution_id, operator_id)
+                if ticket is None:
+                    break
+                local.append((ticket.id, operator_id))
+        finally:
+            db.close()
+        with lock:
+            claims.extend(local)
+
+    pool = [threading.Thread(target=operator, args=(o,)) for o in operator_ids]
+    # Départ synchronisé entre les processus
+    time.sleep(max(0.0, start_at - time.time()))
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    finished_at = time.time()
+    queue_writer.stop()
+    return claims, finished_at
+
+
+def verify(claims: list) -> dict:
+    """Compare les attributions observées avec la base"""
+    import models
+    from database import SessionLocal
+
+    per_ticket = Counter(ticket_id for ticket_id, _ in claims)
+    db = SessionLocal()
+    try:
+        stored = dict(db.query(models.Ticket.id, models.Ticket.operator_id).filter(
+            models.Ticket.status == models.TicketStatus.CALLED
+        ))
+        remaining = db.query(models.Ticket).filter(
+            models.Ticket.status == models.TicketStatus.WAITING
+        ).count()
+    finally:
+        db.close()
+
+    return {
+        "double_assignments": sum(count - 1 for count in per_ticket.values() if count > 1),
+        "operator_mismatches": sum(1 for ticket_id, operator_id in claims if stored.get(ticket_id) != operator_id),
+        "called_in_db": len(stored),
+        "remaining_waiting": remaining,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operators", type=int, default=50)
+    parser.add_argument("--processes", type=int, default=1,
+                        help="processus d'opérateurs (1 = configuration de production)")
+    parser.add_argument("--tickets", type=int, default=6000)
+    args = parser.parse_args()
+
+    # Base temporaire, héritée par les processus (à fixer avant d'importer database)
+    directory = tempfile.mkdtemp(prefix="queueflow-call-next-")
+    os.environ["QUEUEFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    seed(args.tickets)
+
+    operator_ids = list(range(1, args.operators + 1))
+    groups = [operator_ids[i::args.processes] for i in range(args.processes)]
+    start_at = time.time() + 2.0
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.processes) as pool:
+        results = pool.starmap(run_operators, [(group, start_at) for group in groups])
+
+    claims = [claim for result, _ in results for claim in result]
+    # Temps mesuré depuis le départ synchronisé jusqu'au dernier processus
+    elapsed = max(finished_at for _, finished_at in results) - start_at
+
+    print(json.dumps({
+        "operators": args.operators,
+        "institutions": INSTITUTIONS,
+        "processes": args.processes,
+        "tickets": args.tickets,
+        "claims": len(claims),
+        "elapsed_s": round(elapsed, 3),
+        "claims_per_s": round(len(claims) / elapsed, 1),
+        **verify(claims),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
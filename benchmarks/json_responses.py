@@ -0,0 +1,158 @@
+"""
+benchmarks/json_responses.py - Sérialisation Standard vs Mode Rapide
+====================================================================
+Compare, pour chaque route de lecture concernée par fast_json.py,
+l'encodage seul de la réponse (sans routage, base ni réseau) :
+
+- standard : ce que FastAPI fait d'une valeur renvoyée par la route
+             (fastapi.routing.serialize_response contre response_model,
+             puis JSONResponse.render, soit json.dumps)
+- fast     : fast_json.dumps (pydantic_core.to_json ou orjson)
+
+Les valeurs encodées sont celles que les routes passent réellement à
+fast_json.respond, capturées en appelant chaque route une fois sur une
+base temporaire (12 institutions, historique de 10 tickets, file de 50
+tickets). Chaque mode est chronométré en --rounds séries de --repeat
+encodages ; la meilleure série est retenue (le bruit ne fait
+qu'ajouter du temps). Une route n'est marquée "fast_wins" que si le
+mode rapide reste plus rapide de plus de --min-gain (10 % par défaut).
+
+Mesurer la requête entière (time.process_time autour d'un appel HTTP)
+ne permet pas de conclure : l'encodage n'en est qu'une petite partie,
+en dessous du bruit d'une série à l'autre.
+
+    python -m benchmarks.json_responses --repeat 2000 --rounds 7
+
+Le résultat est affiché en JSON (µs par encodage et gain par route).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+
+# Route (chemin FastAPI) -> URL appelée
+ROUTES = {
+    "/institutions": "/institutions",
+    "/institutions/type/{institution_type}": "/institutions/type/banque",
+    "/institutions/{institution_id}": "/institutions/1",
+    "/queue/{institution_id}": "/queue/1",
+    "/tickets/{ticket_number}": "/tickets/{ticket_number}",
+    "/tickets/{ticket_number}/stats": "/tickets/{ticket_number}/stats",
+    "/users/{user_id}/tickets": "/users/{user_id}/tickets",
+}
+
+
+async def prepare(client: httpx.AsyncClient) -> dict:
+    """Un citoyen et 50 tickets en attente dans l'institution 1"""
+    response = await client.post("/auth/signup", json={
+        "name": "Citoyen", "email": "citoyen@queueflow.sn", "password": "citoyen123"
+    })
+    response.raise_for_status()
+    user_id = response.json()["id"]
+    response = await client.post("/tickets/batch", json=[
+        {"institution_id": 1, "user_id": user_id} for _ in range(50)
+    ])
+    response.raise_for_status()
+    return {"user_id": user_id, "ticket_number": response.json()[25]["ticket_number"]}
+
+
+async def capture(client: httpx.AsyncClient, url: str):
+    """Valeur passée à fast_json.respond par la route"""
+    import fast_json
+
+    captured = []
+    respond = fast_json.respond
+
+    def recording(value, headers=None):
+        captured.append(value)
+        return respond(value, headers=headers)
+
+    fast_json.respond = recording
+    try:
+        response = await client.get(url)
+    finally:
+        fast_json.respond = respond
+    response.raise_for_status()
+    return captured[0]
+
+
+async def best_round_us(encode, repeat: int, rounds: int) -> float:
+    """Meilleure série : µs par encodage"""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await encode()
+        best = min(best, time.perf_counter() - started)
+    return best / repeat * 1e6
+
+
+async def run(repeat: int, rounds: int, min_gain: float) -> dict:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+
+    import fast_json
+    import main
+
+    fields = {route.path: route.response_field for route in main.app.routes if hasattr(route, "response_field")}
+    # JSONResponse.render n'utilise pas l'instance : pas de réponse à construire
+    render = JSONResponse.render
+
+    captured = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://queueflow") as client:
+            values = await prepare(client)
+            fast_json.FAST_JSON = False
+            for path, url in ROUTES.items():
+                captured[path] = await capture(client, url.format(**values))
+
+    results = {}
+    for path, value in captured.items():
+        async def standard(value=value, field=fields[path]) -> bytes:
+            return render(None, await serialize_response(field=field, response_content=value))
+
+        async def fast(value=value) -> bytes:
+            return fast_json.dumps(value)
+
+        standard_us = await best_round_us(standard, repeat, rounds)
+        fast_us = await best_round_us(fast, repeat, rounds)
+        results[path] = {
+            "payload_bytes": len(await fast()),
+            "standard_us": round(standard_us, 2),
+            "fast_us": round(fast_us, 2),
+            "speedup": round(standard_us / fast_us, 2),
+            "fast_wins": fast_us < standard_us * (1 - min_gain),
+            "same_json": json.loads(await standard()) == json.loads(await fast()),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="encodages par série")
+    parser.add_argument("--rounds", type=int, default=7, help="séries par route et par mode")
+    parser.add_argument("--min-gain", type=float, default=0.10, help="gain minimal pour fast_wins")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="queueflow-json-") as directory:
+        # Base temporaire (à fixer avant d'importer main / database)
+        os.environ["QUEUEFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        results = asyncio.run(run(args.repeat, args.rounds, args.min_gain))
+
+    import fast_json
+    print(json.dumps({
+        "repeat": args.repeat,
+        "rounds": args.rounds,
+        "encoder": "orjson" if fast_json.orjson is not None else "pydantic_core",
+        "routes": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
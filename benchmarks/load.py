@@ -0,0 +1,361 @@
+"""
+benchmarks/load.py - Charge du Cycle de Vie d'un Ticket
+=======================================================
+Rejoue une journée type contre l'API, sur une base temporaire, et mesure
+débit et latences (p50 / p95 / p99) par route :
+
+- kiosk    : bornes qui émettent des tickets par rafales (POST /tickets)
+- citizen  : citoyens qui suivent leur ticket (stats, état de la file)
+- operator : opérateurs qui appellent puis terminent les tickets
+- admin    : tableaux de bord (statistiques globales, opérateurs, files)
+
+Deux transports :
+
+- asgi    : l'app FastAPI est appelée dans le processus (httpx.ASGITransport),
+            sans réseau : mesure le coût de l'API elle-même
+- uvicorn : un vrai serveur uvicorn est lancé dans un sous-processus
+
+    python -m benchmarks.load --transport asgi --duration 10
+    python -m benchmarks.load --transport uvicorn --mix kiosk=2,citizen=20,operator=12,admin=1 --output avant.json
+
+Le résultat est affiché en JSON (et écrit dans --output) avec le commit
+courant, pour comparer deux versions. Les routes en erreur sont ensuite
+listées (codes HTTP, ou "transport" sans réponse) et la commande se
+termine avec le code 1 si le taux d'erreurs dépasse --max-error-rate
+(0 par défaut : aucune erreur tolérée).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+INSTITUTIONS = 12
+
+# Utilisateurs virtuels par scénario (modifiable avec --mix)
+DEFAULT_MIX = {"kiosk": 2, "citizen": 16, "operator": 12, "admin": 1}
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Percentile par rang le plus proche (values triées)"""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class Recorder:
+    """Latences (ms) et erreurs (par code HTTP) par route"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+        self.recording = False
+
+    async def call(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs):
+        """Exécute une requête ; ne compte que pendant la fenêtre de mesure"""
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        elapsed = (time.perf_counter() - started) * 1000
+        if self.recording:
+            self.latencies[route].append(elapsed)
+            if response is None:
+                self.errors[route]["transport"] += 1
+            elif response.status_code >= 400:
+                self.errors[route][str(response.status_code)] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            errors = sum(self.errors[route].values())
+            routes[route] = {
+                "requests": len(values),
+                "errors": errors,
+                "error_rate": round(errors / len(values), 4),
+                "error_status": dict(sorted(self.errors[route].items())),
+                "throughput_rps": round(len(values) / elapsed, 1),
+                "p50_ms": round(percentile(values, 0.50), 2),
+                "p95_ms": round(percentile(values, 0.95), 2),
+                "p99_ms": round(percentile(values, 0.99), 2),
+                "max_ms": round(values[-1], 2),
+            }
+        total = sum(route["requests"] for route in routes.values())
+        errors = sum(route["errors"] for route in routes.values())
+        return {
+            "requests": total,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "throughput_rps": round(total / elapsed, 1),
+            "routes": routes,
+        }
+
+
+# ========================================
+# SCÉNARIOS (un utilisateur virtuel = une tâche asyncio)
+# ========================================
+
+class Scenario:
+    """État partagé par les utilisateurs virtuels"""
+
+    def __init__(self, recorder: Recorder, deadline: float, seed: int):
+        self.recorder = recorder
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.issued = []     # numéros affichés, pour les citoyens
+        self.operators = []  # (operator_id, institution_id)
+
+    def running(self) -> bool:
+        return time.perf_counter() < self.deadline
+
+
+async def kiosk(client: httpx.AsyncClient, state: Scenario, burst: int = 10, pause: float = 0.2) -> None:
+    """Borne : une rafale de tickets, puis une courte pause"""
+    institution_id = state.rng.randint(1, INSTITUTIONS)
+    while state.running():
+        for _ in range(burst):
+            response = await state.recorder.call(
+                client, "POST /tickets", "POST", "/tickets", json={"institution_id": institution_id}
+            )
+            if response is not None and response.status_code == 201:
+                state.issued.append(response.json()["ticket_number"])
+        await asyncio.sleep(pause)
+
+
+async def citizen(client: httpx.AsyncClient, state: Scenario, interval: float = 0.05) -> None:
+    """Citoyen : suit la position de son ticket et l'état de la file"""
+    while state.running():
+        if state.issued:
+            number = state.rng.choice(state.issued)
+            await state.recorder.call(
+                client, "GET /tickets/{ticket_number}/stats", "GET", f"/tickets/{number}/stats"
+            )
+        institution_id = state.rng.randint(1, INSTITUTIONS)
+        await state.recorder.call(client, "GET /queue/{institution_id}", "GET", f"/queue/{institution_id}")
+        await asyncio.sleep(interval)
+
+
+async def operator(client: httpx.AsyncClient, state: Scenario, index: int, idle: float = 0.1) -> None:
+    """Opérateur : appelle le ticket suivant puis le termine (ou le marque manqué)"""
+    operator_id, institution_id = state.operators[index % len(state.operators)]
+    while state.running():
+        response = await state.recorder.call(
+            client, "POST /operator/next-ticket", "POST", "/operator/next-ticket",
+            params={"institution_id": institution_id, "operator_id": operator_id}
+        )
+        ticket = response.json().get("ticket") if response is not None and response.status_code == 200 else None
+        if ticket is None:
+            await asyncio.sleep(idle)
+            continue
+        number = ticket["ticket_number"]
+        if state.rng.random() < 0.05:
+            await state.recorder.call(
+                client, "PUT /operator/miss-ticket/{ticket_number}", "PUT", f"/operator/miss-ticket/{number}"
+            )
+        else:
+            await state.recorder.call(
+                client, "PUT /operator/complete-ticket/{ticket_number}", "PUT",
+                f"/operator/complete-ticket/{number}", params={"operator_id": operator_id}
+            )
+
+
+async def admin(client: httpx.AsyncClient, state: Scenario, interval: float = 0.5) -> None:
+    """Tableau de bord : rafraîchi toutes les `interval` secondes"""
+    while state.running():
+        await state.recorder.call(client, "GET /admin/stats", "GET", "/admin/stats")
+        operator_id, institution_id = state.rng.choice(state.operators)
+        await state.recorder.call(client, "GET /operator/{operator_id}/stats", "GET", f"/operator/{operator_id}/stats")
+        await state.recorder.call(
+            client, "GET /queue/details/{institution_id}", "GET", f"/queue/details/{institution_id}"
+        )
+        await asyncio.sleep(interval)
+
+
+SCENARIOS = {"kiosk": kiosk, "citizen": citizen, "operator": operator, "admin": admin}
+
+
+# ========================================
+# PRÉPARATION ET EXÉCUTION
+# ========================================
+
+async def prepare(client: httpx.AsyncClient, state: Scenario, backlog: int) -> None:
+    """Un opérateur par institution et des tickets déjà en attente"""
+    run_id = int(time.time())
+    for institution_id in range(1, INSTITUTIONS + 1):
+        response = await client.post("/auth/signup", json={
+            "name": f"Opérateur {institution_id}",
+            "email": f"bench-{run_id}-{institution_id}@queueflow.sn",
+            "password": "operator123",
+            "role": "operator",
+            "institution_id": institution_id,
+        })
+        response.raise_for_status()
+        state.operators.append((response.json()["id"], institution_id))
+
+    for start in range(0, backlog, 100):
+        response = await client.post("/tickets/batch", json=[
+            {"institution_id": 1 + i % INSTITUTIONS} for i in range(start, min(backlog, start + 100))
+        ])
+        response.raise_for_status()
+        state.issued.extend(ticket["ticket_number"] for ticket in response.json())
+
+
+async def drive(client: httpx.AsyncClient, mix: dict, duration: float, warmup: float,
+                backlog: int, seed: int) -> dict:
+    """Prépare la base, chauffe l'API puis mesure pendant `duration` secondes"""
+    recorder = Recorder()
+    state = Scenario(recorder, deadline=float("inf"), seed=seed)
+    await prepare(client, state, backlog)
+
+    state.deadline = time.perf_counter() + warmup + duration
+    tasks = []
+    for name, users in mix.items():
+        for index in range(users):
+            if name == "operator":
+                tasks.append(asyncio.create_task(operator(client, state, index)))
+            else:
+                tasks.append(asyncio.create_task(SCENARIOS[name](client, state)))
+
+    await asyncio.sleep(warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return recorder.report(elapsed)
+
+
+async def run_asgi(args) -> dict:
+    """L'app est importée ici : QUEUEFLOW_DATABASE_URL est déjà fixé"""
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://queueflow") as client:
+            return await drive(client, args.mix, args.duration, args.warmup, args.backlog, args.seed)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(args) -> dict:
+    """Serveur uvicorn dans un sous-processus, clients HTTP dans celui-ci"""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=sum(args.mix.values()) + 4)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            for _ in range(200):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn s'est arrêté au démarrage")
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn ne répond pas")
+            return await drive(client, args.mix, args.duration, args.warmup, args.backlog, args.seed)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def parse_mix(value: str) -> dict:
+    """"kiosk=2,citizen=16" -> {"kiosk": 2, "citizen": 16}"""
+    mix = {}
+    for item in value.split(","):
+        name, _, users = item.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"scénario inconnu : {name} ({', '.join(SCENARIOS)})")
+        mix[name] = int(users)
+    return mix
+
+
+def print_errors(result: dict) -> None:
+    """Routes en erreur, sur la sortie d'erreur (le JSON reste seul sur stdout)"""
+    for route, stats in result["routes"].items():
+        if stats["errors"]:
+            status = ", ".join(f"{code} ×{count}" for code, count in stats["error_status"].items())
+            print(
+                f"❌ {route} : {stats['errors']} erreurs sur {stats['requests']} requêtes "
+                f"({stats['error_rate']:.2%}) - {status}",
+                file=sys.stderr
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="utilisateurs par scénario, ex. kiosk=2,citizen=16,operator=12,admin=1")
+    parser.add_argument("--duration", type=float, default=10.0, help="secondes mesurées")
+    parser.add_argument("--warmup", type=float, default=2.0, help="secondes non mesurées")
+    parser.add_argument("--backlog", type=int, default=300, help="tickets en attente au départ")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="fichier JSON du résultat")
+    parser.add_argument("--max-error-rate", type=float, default=0.0,
+                        help="taux d'erreurs toléré (0.01 = 1 %%) avant de sortir en échec")
+    args = parser.parse_args()
+
+    runner = run_asgi if args.transport == "asgi" else run_uvicorn
+    # Base temporaire (à fixer avant d'importer main / database)
+    with tempfile.TemporaryDirectory(prefix="queueflow-load-") as directory:
+        os.environ["QUEUEFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        result = {
+            "commit": current_commit(),
+            "transport": args.transport,
+            "mix": args.mix,
+            "duration_s": args.duration,
+            **asyncio.run(runner(args)),
+        }
+
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(text + "\n")
+    print(text)
+
+    print_errors(result)
+    if result["error_rate"] > args.max_error_rate:
+        print(
+            f"❌ Taux d'erreurs {result['error_rate']:.2%} > {args.max_error_rate:.2%} "
+            f"({result['errors']} sur {result['requests']} requêtes)",
+            file=sys.stderr
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
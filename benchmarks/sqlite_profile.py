@@ -0,0 +1,136 @@
+"""
+benchmarks/sqlite_profile.py - Profil SQLite "legacy" vs "production"
+=====================================================================
+Compare le débit d'une charge mixte lecture/écriture sur une base
+temporaire, avec la configuration d'origine et avec le profil de
+database.py (WAL, busy_timeout, synchronous=NORMAL...).
+
+    python -m benchmarks.sqlite_profile --threads 32 --duration 5 --write-ratio 0.2
+
+Le résultat est affiché en JSON (opérations/s, erreurs "database is
+locked" par profil).
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import models
+from daily_counters import service_day_key
+from database import Base, create_sqlite_engine
+
+INSTITUTIONS = 12
+
+
+def seed(session_factory) -> None:
+    """Crée les institutions, leurs queues et quelques tickets terminés"""
+    db = session_factory()
+    for i in range(1, INSTITUTIONS + 1):
+        db.add(models.Institution(id=i, name=f"Institution {i}", type=models.InstitutionType.BANQUE, location="Dakar"))
+        db.add(models.Queue(institution_id=i, last_ticket_number=0, total_tickets_today=0, average_service_time=3))
+    db.commit()
+    db.close()
+
+
+def read_op(db, institution_id: int) -> None:
+    """Lecture typique : taille de la file d'une institution"""
+    db.query(func.count(models.Ticket.id)).filter(
+        models.Ticket.institution_id == institution_id,
+        models.Ticket.status == models.TicketStatus.WAITING
+    ).scalar()
+
+
+def write_op(db, institution_id: int) -> None:
+    """Écriture typique : réserver un numéro et insérer un ticket"""
+    sequence = db.execute(
+        update(models.Queue)
+        .where(models.Queue.institution_id == institution_id)
+        .values(last_ticket_number=models.Queue.last_ticket_number + 1)
+        .returning(models.Queue.last_ticket_number)
+    ).scalar()
+    db.add(models.Ticket(
+        service_day=service_day_key(datetime.utcnow().date()),
+        sequence=sequence,
+        ticket_number=f"{institution_id}-{sequence}",
+        institution_id=institution_id,
+        status=models.TicketStatus.WAITING,
+        queue_position=sequence
+    ))
+    db.commit()
+
+
+def run_profile(profile: str, threads: int, duration: float, write_ratio: float) -> dict:
+    """Lance la charge mixte sur une base neuve avec le profil donné"""
+    directory = tempfile.mkdtemp(prefix=f"queueflow-bench-{profile}-")
+    engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", profile=profile)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    seed(session_factory)
+
+    counts = {"reads": 0, "writes": 0, "locked_errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(seed_value: int) -> None:
+        rng = random.Random(seed_value)
+        local = {"reads": 0, "writes": 0, "locked_errors": 0}
+        while time.perf_counter() < deadline:
+            db = session_factory()
+            institution_id = rng.randint(1, INSTITUTIONS)
+            try:
+                if rng.random() < write_ratio:
+                    write_op(db, institution_id)
+                    local["writes"] += 1
+                else:
+                    read_op(db, institution_id)
+                    local["reads"] += 1
+            except OperationalError:
+                db.rollback()
+                local["locked_errors"] += 1
+            finally:
+                db.close()
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    return {
+        "profile": profile,
+        "elapsed_s": round(elapsed, 3),
+        **counts,
+        "ops_per_s": round((counts["reads"] + counts["writes"]) / elapsed, 1),
+        "writes_per_s": round(counts["writes"] / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0, help="secondes par profil")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--profiles", nargs="+", default=["legacy", "production"])
+    args = parser.parse_args()
+
+    results = [run_profile(p, args.threads, args.duration, args.write_ratio) for p in args.profiles]
+    print(json.dumps({"threads": args.threads, "write_ratio": args.write_ratio, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
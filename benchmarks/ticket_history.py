@@ -0,0 +1,132 @@
+"""
+benchmarks/ticket_history.py - Historique d'un Utilisateur : ORM vs Projection
+==============================================================================
+Compare deux façons de construire les TicketResponse de
+/users/{user_id}/tickets pour un historique de 1 000 tickets :
+
+- orm        : entités Ticket complètes, TicketResponse.model_validate()
+               en mode from_attributes, institution chargée paresseusement
+               ticket par ticket (version d'origine)
+- projection : colonnes de la réponse seulement, institutions depuis le
+               cache (crud_users.get_user_ticket_history)
+
+    python -m benchmarks.ticket_history --tickets 1000 --repeat 20
+
+Le résultat est affiché en JSON (durée par appel, requêtes SQL par appel).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+INSTITUTIONS = 12
+
+
+def seed(tickets: int) -> int:
+    """Base temporaire : institutions, un citoyen et son historique"""
+    import archive
+    import crud
+    import crud_users
+    import migrations
+    import models
+    import schemas
+    from database import SessionLocal, engine
+
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        for i in range(1, INSTITUTIONS + 1):
+            crud.create_institution(db, schemas.InstitutionCreate(
+                name=f"Institution {i}", type=models.InstitutionType.BANQUE, location="Dakar"
+            ))
+        user = crud_users.create_user(db, schemas.UserCreate(
+            name="Citoyen", email="citoyen@queueflow.sn", password="citoyen123"
+        ))
+        crud.issue_tickets(db, [
+            schemas.TicketCreate(institution_id=1 + i % INSTITUTIONS, user_id=user.id) for i in range(tickets)
+        ])
+        # La moitié de l'historique passe dans tickets_archive
+        half = tickets // 2
+        db.query(models.Ticket).filter(models.Ticket.id <= half).update(
+            {"status": models.TicketStatus.COMPLETED}, synchronize_session=False
+        )
+        db.commit()
+        archive.archive_finished_tickets(db, cutoff=datetime.utcnow() + timedelta(days=1))
+        return user.id
+    finally:
+        db.close()
+
+
+def history_orm(db, user_id: int, limit: int) -> list:
+    """Version d'origine : entités ORM puis validation from_attributes"""
+    import models
+    import schemas
+
+    tickets = []
+    for model in (models.Ticket, models.TicketArchive):
+        tickets.extend(
+            db.query(model).filter(model.user_id == user_id).order_by(model.created_at.desc()).limit(limit).all()
+        )
+    tickets.sort(key=lambda ticket: ticket.created_at, reverse=True)
+    return [schemas.TicketResponse.model_validate(ticket) for ticket in tickets[:limit]]
+
+
+def history_projection(db, user_id: int, limit: int) -> list:
+    import crud_users
+
+    return crud_users.get_user_ticket_history(db, user_id, limit=limit).items
+
+
+def measure(function, user_id: int, limit: int, repeat: int) -> dict:
+    """Une session neuve par appel, comme une requête HTTP"""
+    from database import SessionLocal
+    from query_audit import track_queries
+
+    durations, queries, size = [], 0, 0
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            with track_queries() as log:
+                started = time.perf_counter()
+                responses = function(db, user_id, limit)
+                durations.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+        queries, size = log.total, len(responses)
+    return {
+        "tickets": size,
+        "mean_ms": round(statistics.mean(durations), 2),
+        "p50_ms": round(statistics.median(durations), 2),
+        "min_ms": round(min(durations), 2),
+        "sql_queries_per_call": queries,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # Base temporaire (à fixer avant d'importer database)
+    directory = tempfile.mkdtemp(prefix="queueflow-history-")
+    os.environ["QUEUEFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    user_id = seed(args.tickets)
+
+    orm = measure(history_orm, user_id, args.tickets, args.repeat)
+    projection = measure(history_projection, user_id, args.tickets, args.repeat)
+    print(json.dumps({
+        "tickets": args.tickets,
+        "repeat": args.repeat,
+        "orm": orm,
+        "projection": projection,
+        "speedup": round(orm["mean_ms"] / projection["mean_ms"], 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,21 +6,37 @@ CRUD = Create (Créer), Read (Lire), Update (Modifier), Delete (Supprimer)
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from sqlalchemy import case, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import re
+from datetime import date, datetime
 from typing import List, Optional
 
 import models
 import schemas
+import daily_counters
+import pagination
+import queue_events
+from institution_cache import institution_cache, CachedInstitution
+from queue_engine import waiting_queues, WaitingTicket
+from daily_counters import service_day_key
+from service_time import DEFAULT_SERVICE_TIME
+
+# Code affiché d'un ticket : lettre, institution (2+ chiffres), jour de
+# service (MMJJ), séquence (3+ chiffres)
+TICKET_CODE = re.compile(r"^([A-Z])(\d{2,})-(\d{2})(\d{2})-(\d{3,})$")
+
+# Plus grand entier stocké par SQLite (voir pagination.py)
+MAX_SQL_INTEGER = pagination.MAX_SQL_INTEGER
 
 
 # ========================================
 # OPÉRATIONS SUR LES INSTITUTIONS
 # ========================================
 
-def get_institutions(db: Session, skip: int = 0, limit: int = 100) -> List[models.Institution]:
+def get_institutions(db: Session, skip: int = 0, limit: int = 100) -> List[CachedInstitution]:
     """
-    Récupère toutes les institutions
+    Récupère toutes les institutions (depuis le cache)
 
     Args:
         db: Session de base de données
@@ -28,12 +44,35 @@ def get_institutions(db: Session, skip: int = 0, limit: int = 100) -> List[model
         limit: Nombre maximum d'éléments à retourner
 
     Returns:
-        Liste d'institutions
+        Liste d'institutions (copies en cache)
     """
-    return db.query(models.Institution).offset(skip).limit(limit).all()
+    return institution_cache.list(db, skip=skip, limit=limit)
 
 
-def get_institutions_by_type(db: Session, institution_type: models.InstitutionType) -> List[models.Institution]:
+def get_institutions_page(db: Session, cursor: Optional[str] = None, limit: int = 100) -> pagination.Page:
+    """
+    Récupère une page d'institutions, triées par id (depuis le cache)
+
+    Args:
+        db: Session de base de données
+        cursor: Curseur de la page précédente (None : première page)
+        limit: Nombre maximum d'éléments à retourner
+
+    Returns:
+        Page d'institutions et curseur de la suivante
+
+    Raises:
+        pagination.InvalidCursor: si le curseur est illisible
+    """
+    after_id = pagination.decode_cursor(cursor, int)[0] if cursor else None
+    institutions = institution_cache.after(db, after_id, limit + 1)
+    if len(institutions) <= limit:
+        return pagination.Page(institutions)
+    institutions = institutions[:limit]
+    return pagination.Page(institutions, pagination.encode_cursor(institutions[-1].id))
+
+
+def get_institutions_by_type(db: Session, institution_type: models.InstitutionType) -> List[CachedInstitution]:
     """
     Récupère les institutions par type (hospital, mairie, etc.)
 
@@ -42,27 +81,23 @@ def get_institutions_by_type(db: Session, institution_type: models.InstitutionTy
         institution_type: Type d'institution (enum)
 
     Returns:
-        Liste d'institutions du type demandé
+        Liste d'institutions du type demandé (copies en cache)
     """
-    return db.query(models.Institution).filter(
-        models.Institution.type == institution_type
-    ).all()
+    return institution_cache.by_type(db, institution_type)
 
 
-def get_institution_by_id(db: Session, institution_id: int) -> Optional[models.Institution]:
+def get_institution_by_id(db: Session, institution_id: int) -> Optional[CachedInstitution]:
     """
-    Récupère une institution par son ID
+    Récupère une institution par son ID (depuis le cache)
 
     Args:
         db: Session de base de données
         institution_id: ID de l'institution
 
     Returns:
-        L'institution ou None si non trouvée
+        L'institution (copie en cache) ou None si non trouvée
     """
-    return db.query(models.Institution).filter(
-        models.Institution.id == institution_id
-    ).first()
+    return institution_cache.get(db, institution_id)
 
 
 def create_institution(db: Session, institution: schemas.InstitutionCreate) -> models.Institution:
@@ -88,8 +123,12 @@ def create_institution(db: Session, institution: schemas.InstitutionCreate) -> m
     # Rafraîchir pour obtenir l'ID généré
     db.refresh(db_institution)
 
+    # Le cache sera rechargé à la prochaine lecture
+    institution_cache.invalidate()
+
     # Créer une queue pour cette institution
-    create_queue_for_institution(db, db_institution.id)
+    queue = create_queue_for_institution(db, db_institution.id)
+    waiting_queues.register(db_institution.id, db_institution.name, queue.average_service_time)
 
     return db_institution
 
@@ -113,7 +152,7 @@ def create_queue_for_institution(db: Session, institution_id: int) -> models.Que
         institution_id=institution_id,
         last_ticket_number=0,
         total_tickets_today=0,
-        average_service_time=3
+        average_service_time=DEFAULT_SERVICE_TIME
     )
     db.add(db_queue)
     db.commit()
@@ -148,36 +187,95 @@ def get_queue_info(db: Session, institution_id: int) -> Optional[schemas.QueueIn
     Returns:
         Informations de la queue (QueueInfo schema)
     """
-    queue = get_queue_by_institution(db, institution_id)
-    if not queue:
+    # Lecture depuis le moteur en mémoire (aucune requête SQL)
+    waiting_queues.ensure_loaded(db)
+    queue = waiting_queues.get(institution_id)
+    if queue is None:
         return None
 
-    # Compter le nombre de personnes en attente
-    people_waiting = db.query(models.Ticket).filter(
-        models.Ticket.institution_id == institution_id,
-        models.Ticket.status == models.TicketStatus.WAITING
-    ).count()
-
-    # Calculer le temps d'attente estimé
-    estimated_wait_time = people_waiting * queue.average_service_time
-
-    return schemas.QueueInfo(
-        institution_id=institution_id,
-        current_ticket_number=queue.current_ticket_number,
-        people_waiting=people_waiting,
-        estimated_wait_time=estimated_wait_time,
-        average_service_time=queue.average_service_time
-    )
+    # Personnes en attente et temps d'attente estimé
+    return queue.queue_info()
 
 
 # ========================================
 # OPÉRATIONS SUR LES TICKETS
 # ========================================
 
+def get_ticket_letter(db: Session, institution_id: int) -> str:
+    """
+    Retourne la lettre de préfixe des tickets d'une institution
+
+    Args:
+        db: Session de base de données
+        institution_id: ID de l'institution
+
+    Returns:
+        Lettre de préfixe (H, M, B, T ou A par défaut)
+    """
+    institution = institution_cache.get(db, institution_id)
+    return institution.ticket_letter if institution else "A"
+
+
+def allocate_ticket_sequence(db: Session, institution_id: int, count: int = 1):
+    """
+    Réserve le prochain numéro de la file en une seule requête atomique
+
+    UPDATE ... RETURNING incrémente le compteur et renvoie la nouvelle
+    valeur dans la même instruction : deux bornes concurrentes ne peuvent
+    jamais obtenir le même numéro. Le commit est laissé à l'appelant.
+
+    Le compteur repart de zéro au premier ticket d'un nouveau jour de
+    service (même instruction, sans job de remise à zéro).
+
+    Avec count > 1, un bloc contigu de numéros est réservé :
+    last_ticket_number - count + 1 ... last_ticket_number.
+
+    Args:
+        db: Session de base de données
+        institution_id: ID de l'institution
+        count: Nombre de numéros à réserver
+
+    Returns:
+        Ligne (last_ticket_number, average_service_time, service_day) de la queue
+    """
+    now = datetime.utcnow()
+    today = service_day_key(now.date())
+    same_day = models.Queue.service_day == today
+    statement = (
+        update(models.Queue)
+        .where(models.Queue.institution_id == institution_id)
+        .values(
+            last_ticket_number=case((same_day, models.Queue.last_ticket_number + count), else_=count),
+            total_tickets_today=case((same_day, models.Queue.total_tickets_today + count), else_=count),
+            service_day=today,
+            updated_at=now
+        )
+        .returning(models.Queue.last_ticket_number, models.Queue.average_service_time, models.Queue.service_day)
+    )
+    allocated = db.execute(statement).first()
+
+    if allocated is None:
+        # Si pas de queue, en créer une dans la transaction courante (sans
+        # commit : un lot reste annulable d'un bloc) puis réessayer
+        db.execute(
+            sqlite_insert(models.Queue)
+            .values(
+                institution_id=institution_id,
+                last_ticket_number=0,
+                total_tickets_today=0,
+                average_service_time=DEFAULT_SERVICE_TIME
+            )
+            .on_conflict_do_nothing(index_elements=[models.Queue.institution_id])
+        )
+        allocated = db.execute(statement).first()
+
+    return allocated
+
+
 def generate_ticket_number(db: Session, institution_id: int) -> str:
     """
     Génère un numéro de ticket unique
-    Format: A001, A002, B001, etc.
+    Format: H01-1018-001, M06-1018-002, B09-1019-001, etc.
 
     Args:
         db: Session de base de données
@@ -186,90 +284,307 @@ def generate_ticket_number(db: Session, institution_id: int) -> str:
     Returns:
         Numéro de ticket (string)
     """
-    queue = get_queue_by_institution(db, institution_id)
+    letter = get_ticket_letter(db, institution_id)
+    allocated = allocate_ticket_sequence(db, institution_id)
 
-    if not queue:
-        # Si pas de queue, en créer une
-        queue = create_queue_for_institution(db, institution_id)
+    db.commit()
 
-    # Incrémenter le dernier numéro
-    queue.last_ticket_number += 1
-    queue.total_tickets_today += 1
+    return format_ticket_number(letter, institution_id, allocated.service_day, allocated.last_ticket_number)
 
-    # Générer le numéro
-    # Lettre basée sur le type d'institution
-    institution = get_institution_by_id(db, institution_id)
-    letter_map = {
-        models.InstitutionType.HOSPITAL: "H",
-        models.InstitutionType.MAIRIE: "M",
-        models.InstitutionType.BANQUE: "B",
-        models.InstitutionType.TRANSPORT: "T"
-    }
-    letter = letter_map.get(institution.type, "A")
 
-    # Format: H001, H002, etc.
-    ticket_number = f"{letter}{queue.last_ticket_number:03d}"
+def format_ticket_number(letter: str, institution_id: int, service_day: int, sequence: int) -> str:
+    """
+    Format: H01-1018-001 (dérivé de l'identité du ticket)
 
-    db.commit()
-    db.refresh(queue)
+    Le jour de service (MMJJ) fait partie du code : un ticket resté en
+    attente la veille ne porte pas le même code que celui du jour.
+    """
+    return f"{letter}{institution_id:02d}-{service_day % 10000:04d}-{sequence:03d}"
 
-    return ticket_number
 
+def parse_ticket_number(ticket_number: str, today: Optional[date] = None):
+    """
+    Décode un numéro affiché
 
-def create_ticket(db: Session, ticket: schemas.TicketCreate) -> models.Ticket:
+    Le jour MMJJ désigne sa date la plus récente qui n'est pas dans le
+    futur : un code est unique sur un an (au-delà, l'identifiant reste
+    utilisable).
+
+    Returns:
+        (institution_id, jour de service AAAAMMJJ, séquence), ou None si
+        ce n'est pas un code H01-1018-007
     """
-    Crée un nouveau ticket
+    match = TICKET_CODE.match(ticket_number)
+    if match is None:
+        return None
+    institution_id, sequence = int(match.group(2)), int(match.group(5))
+    if institution_id > MAX_SQL_INTEGER or sequence > MAX_SQL_INTEGER:
+        return None
 
-    Args:
-        db: Session de base de données
-        ticket: Données du ticket (TicketCreate schema)
+    today = today or datetime.utcnow().date()
+    month, day = int(match.group(3)), int(match.group(4))
+    # Quatre ans au plus en arrière pour retrouver un 29 février
+    for year in range(today.year, today.year - 5, -1):
+        try:
+            service_day = date(year, month, day)
+        except ValueError:
+            continue
+        if service_day <= today:
+            return institution_id, service_day_key(service_day), sequence
+    return None
+
+
+def _insert_ticket(db: Session, ticket: schemas.TicketCreate):
+    """
+    Valide l'institution, réserve le numéro et insère le ticket
+
+    Tout se fait dans la transaction courante, sans commit :
+    1 UPDATE queue RETURNING, 1 INSERT, 1 upsert des compteurs du jour
+    (l'institution vient du cache).
+
+    Le ticket est identifié par (institution, jour de service, séquence) ;
+    queue_position reçoit aussi la séquence (ordre d'émission du jour).
+    Le rang réel dans la file (personnes devant) est calculé par le
+    moteur en mémoire.
 
     Returns:
-        Le ticket créé
+        (ticket créé, nom de l'institution, temps de service moyen)
     """
     # Vérifier que l'institution existe
-    institution = get_institution_by_id(db, ticket.institution_id)
+    institution = institution_cache.get(db, ticket.institution_id)
     if not institution:
         raise ValueError(f"Institution {ticket.institution_id} n'existe pas")
 
-    # Générer le numéro de ticket
-    ticket_number = generate_ticket_number(db, ticket.institution_id)
+    # Réserver le numéro (sans commit intermédiaire)
+    allocated = allocate_ticket_sequence(db, ticket.institution_id)
 
-    # Calculer la position dans la queue
-    queue_position = db.query(models.Ticket).filter(
-        models.Ticket.institution_id == ticket.institution_id,
-        models.Ticket.status == models.TicketStatus.WAITING
-    ).count() + 1
+    waiting_queues.ensure_loaded(db)
+    waiting_queues.register(ticket.institution_id, institution.name, allocated.average_service_time)
 
-    # Créer le ticket
     db_ticket = models.Ticket(
-        ticket_number=ticket_number,
+        service_day=allocated.service_day,
+        sequence=allocated.last_ticket_number,
+        ticket_number=format_ticket_number(
+            institution.ticket_letter, ticket.institution_id, allocated.service_day, allocated.last_ticket_number
+        ),
+        user_id=ticket.user_id,
         institution_id=ticket.institution_id,
         status=models.TicketStatus.WAITING,
-        queue_position=queue_position
+        queue_position=allocated.last_ticket_number
     )
-
     db.add(db_ticket)
+    db.flush()
+    daily_counters.record_created(db, {ticket.institution_id: 1}, db_ticket.created_at)
+
+    return db_ticket, institution.name, allocated.average_service_time
+
+
+def _as_waiting(db_ticket: models.Ticket) -> WaitingTicket:
+    """Copie légère d'un ticket pour la file en mémoire"""
+    return WaitingTicket(
+        db_ticket.id, db_ticket.ticket_number, db_ticket.institution_id, db_ticket.queue_position
+    )
+
+
+def create_ticket(db: Session, ticket: schemas.TicketCreate) -> models.Ticket:
+    """
+    Crée un nouveau ticket
+
+    Args:
+        db: Session de base de données
+        ticket: Données du ticket (TicketCreate schema)
+
+    Returns:
+        Le ticket créé
+    """
+    db_ticket, _, _ = _insert_ticket(db, ticket)
+    waiting = _as_waiting(db_ticket)
     db.commit()
+
+    # La file en mémoire n'est modifiée qu'après le commit
+    waiting_queues.push(waiting)
+    queue_events.notify_queue_changed(waiting.institution_id, "ticket_created", waiting.ticket_number)
     db.refresh(db_ticket)
 
     return db_ticket
 
 
+def issue_ticket(db: Session, ticket: schemas.TicketCreate) -> schemas.TicketStats:
+    """
+    Émet un ticket et calcule ses statistiques en une seule transaction
+
+    Chemin utilisé par POST /tickets : validation de l'institution,
+    réservation du numéro, insertion et statistiques partagent un seul
+    commit, avec un nombre de requêtes fixe (aucun rechargement du ticket,
+    aucun chargement paresseux de ticket.institution).
+
+    Args:
+        db: Session de base de données
+        ticket: Données du ticket (TicketCreate schema)
+
+    Returns:
+        Statistiques du ticket créé (TicketStats schema)
+    """
+    try:
+        db_ticket, institution_name, _ = _insert_ticket(db, ticket)
+        waiting = _as_waiting(db_ticket)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # La file en mémoire n'est modifiée qu'après le commit
+    waiting_queues.push(waiting)
+    queue_events.notify_queue_changed(waiting.institution_id, "ticket_created", waiting.ticket_number)
+
+    return _issued_stats(waiting, institution_name)
+
+
+def _issued_stats(waiting: WaitingTicket, institution_name: str) -> schemas.TicketStats:
+    """Statistiques d'un ticket qui vient d'être émis"""
+    stats = waiting_queues.get(waiting.institution_id).ticket_stats(waiting)
+    if stats is None:
+        # Déjà appelé par un opérateur entre-temps
+        stats = schemas.TicketStats(
+            ticket_number=waiting.ticket_number,
+            queue_position=1,
+            people_ahead=0,
+            estimated_wait_time=0,
+            institution_name=institution_name
+        )
+    return stats
+
+
+def issue_tickets(db: Session, tickets: List[schemas.TicketCreate]) -> List[schemas.TicketStats]:
+    """
+    Émet un lot de tickets (famille, borne qui renvoie un tampon...)
+
+    - institutions validées depuis le cache
+    - 1 UPDATE ... RETURNING par institution, qui réserve un bloc
+      contigu de numéros
+    - 1 INSERT groupé, 1 upsert des compteurs du jour, 1 seul commit
+
+    Le lot échoue entièrement si une institution n'existe pas.
+
+    Args:
+        db: Session de base de données
+        tickets: Liste de TicketCreate (l'ordre est conservé)
+
+    Returns:
+        Statistiques de chaque ticket, dans l'ordre de la demande
+    """
+    if not tickets:
+        return []
+
+    counts = {}
+    for ticket in tickets:
+        counts[ticket.institution_id] = counts.get(ticket.institution_id, 0) + 1
+
+    # Valider toutes les institutions
+    institutions = institution_cache.get_many(db, counts)
+    missing = sorted(set(counts) - set(institutions))
+    if missing:
+        raise ValueError(f"Institution(s) {', '.join(map(str, missing))} n'existe(nt) pas")
+
+    waiting_queues.ensure_loaded(db)
+
+    try:
+        # Réserver un bloc de numéros par institution
+        next_sequence, service_days = {}, {}
+        for institution_id, count in counts.items():
+            institution = institutions[institution_id]
+            allocated = allocate_ticket_sequence(db, institution_id, count=count)
+            next_sequence[institution_id] = allocated.last_ticket_number - count + 1
+            service_days[institution_id] = allocated.service_day
+            waiting_queues.register(institution_id, institution.name, allocated.average_service_time)
+
+        now = datetime.utcnow()
+        rows = []
+        for ticket in tickets:
+            sequence = next_sequence[ticket.institution_id]
+            next_sequence[ticket.institution_id] = sequence + 1
+            rows.append({
+                "service_day": service_days[ticket.institution_id],
+                "sequence": sequence,
+                "ticket_number": format_ticket_number(
+                    institutions[ticket.institution_id].ticket_letter, ticket.institution_id,
+                    service_days[ticket.institution_id], sequence
+                ),
+                "user_id": ticket.user_id,
+                "institution_id": ticket.institution_id,
+                "status": models.TicketStatus.WAITING,
+                "queue_position": sequence,
+                "created_at": now
+            })
+
+        # INSERT groupé ; les ids renvoyés sont rattachés par
+        # (institution, position), unique dans le lot
+        inserted = db.execute(
+            insert(models.Ticket).returning(
+                models.Ticket.id, models.Ticket.institution_id, models.Ticket.queue_position
+            ),
+            rows
+        ).all()
+        ids = {(row.institution_id, row.queue_position): row.id for row in inserted}
+        waiting = [
+            WaitingTicket(
+                ids[(row["institution_id"], row["queue_position"])],
+                row["ticket_number"], row["institution_id"], row["queue_position"]
+            )
+            for row in rows
+        ]
+        daily_counters.record_created(db, counts, now)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # File en mémoire, abonnés, puis statistiques en une passe
+    for entry in waiting:
+        waiting_queues.push(entry)
+    for institution_id in counts:
+        last = [entry for entry in waiting if entry.institution_id == institution_id][-1]
+        queue_events.notify_queue_changed(institution_id, "ticket_created", last.ticket_number)
+
+    return [_issued_stats(entry, institutions[entry.institution_id].name) for entry in waiting]
+
+
 def get_ticket_by_number(db: Session, ticket_number: str) -> Optional[models.Ticket]:
     """
-    Récupère un ticket par son numéro
+    Récupère un ticket par son numéro affiché ou son identifiant
+
+    Formes acceptées (toutes résolues par index, sur des clés entières
+    sauf la dernière) :
+    - "H01-1018-007" : institution 1, jour de service 18 octobre, séquence 7
+    - "1234"         : identifiant (clé primaire)
+    - "H01-007"      : numéro émis avant le jour dans le code
+    - "H007"         : ancien numéro, émis avant l'identité par jour
 
     Args:
         db: Session de base de données
-        ticket_number: Numéro du ticket
+        ticket_number: Numéro affiché ou identifiant du ticket
 
     Returns:
         Le ticket ou None
     """
+    if ticket_number.isdecimal():
+        ticket_id = int(ticket_number)
+        return db.get(models.Ticket, ticket_id) if ticket_id <= MAX_SQL_INTEGER else None
+
+    code = parse_ticket_number(ticket_number)
+    if code is not None:
+        institution_id, service_day, sequence = code
+        ticket = db.query(models.Ticket).filter(
+            models.Ticket.institution_id == institution_id,
+            models.Ticket.sequence == sequence,
+            models.Ticket.service_day == service_day
+        ).first()
+        # La lettre doit correspondre au type de l'institution
+        return ticket if ticket is not None and ticket.ticket_number == ticket_number else None
+
     return db.query(models.Ticket).filter(
         models.Ticket.ticket_number == ticket_number
-    ).first()
+    ).order_by(models.Ticket.id.desc()).first()
 
 
 def get_ticket_stats(db: Session, ticket_number: str) -> Optional[schemas.TicketStats]:
@@ -283,27 +598,36 @@ def get_ticket_stats(db: Session, ticket_number: str) -> Optional[schemas.Ticket
     Returns:
         Statistiques du ticket (TicketStats schema)
     """
+    # Ticket en attente : tout vient du moteur en mémoire
+    waiting_queues.ensure_loaded(db)
+    waiting = waiting_queues.find(ticket_number)
+    if waiting is not None:
+        stats = waiting_queues.get(waiting.institution_id).ticket_stats(waiting)
+        if stats is not None:
+            return stats
+
     ticket = get_ticket_by_number(db, ticket_number)
     if not ticket:
         return None
 
-    # Compter les personnes devant
-    people_ahead = db.query(models.Ticket).filter(
-        models.Ticket.institution_id == ticket.institution_id,
-        models.Ticket.status == models.TicketStatus.WAITING,
-        models.Ticket.queue_position < ticket.queue_position
-    ).count()
+    queue = waiting_queues.get(ticket.institution_id)
 
-    # Obtenir la queue pour le temps d'attente
-    queue = get_queue_by_institution(db, ticket.institution_id)
-    estimated_wait_time = people_ahead * queue.average_service_time if queue else 0
+    # Ticket en attente demandé par son identifiant (ou ancien numéro)
+    if queue is not None and ticket.status == models.TicketStatus.WAITING:
+        waiting = queue.get_by_id(ticket.id)
+        if waiting is not None:
+            stats = queue.ticket_stats(waiting)
+            if stats is not None:
+                return stats
+
+    # Ticket déjà appelé ou terminé : plus personne devant
 
     return schemas.TicketStats(
         ticket_number=ticket.ticket_number,
         queue_position=ticket.queue_position,
-        people_ahead=people_ahead,
-        estimated_wait_time=estimated_wait_time,
-        institution_name=ticket.institution.name
+        people_ahead=0,
+        estimated_wait_time=0,
+        institution_name=queue.institution_name if queue is not None else ticket.institution.name
     )
 
 
@@ -323,6 +647,7 @@ def update_ticket_status(db: Session, ticket_number: str, status: models.TicketS
     if not ticket:
         return None
 
+    previous_status, previous_completed_at = ticket.status, ticket.completed_at
     ticket.status = status
 
     # Mettre à jour les timestamps selon le statut
@@ -331,13 +656,29 @@ def update_ticket_status(db: Session, ticket_number: str, status: models.TicketS
     elif status == models.TicketStatus.COMPLETED:
         ticket.completed_at = datetime.utcnow()
 
+    daily_counters.record_status_change(db, ticket, previous_status, previous_completed_at)
+    waiting = _as_waiting(ticket)
+    called_at, completed_at, operator_id = ticket.called_at, ticket.completed_at, ticket.operator_id
     db.commit()
+
+    if status == models.TicketStatus.COMPLETED:
+        waiting_queues.record_service(waiting.institution_id, operator_id, called_at, completed_at)
+
+    # Répercuter l'entrée / la sortie de la file en mémoire
+    waiting_queues.ensure_loaded(db)
+    if previous_status == models.TicketStatus.WAITING and status != models.TicketStatus.WAITING:
+        waiting_queues.remove(waiting.institution_id, waiting.id)
+    elif previous_status != models.TicketStatus.WAITING and status == models.TicketStatus.WAITING:
+        waiting_queues.push(waiting)
+
+    queue_events.notify_queue_changed(waiting.institution_id, f"ticket_{status.value}", waiting.ticket_number)
+
     db.refresh(ticket)
 
     return ticket
 
 
-def get_waiting_tickets_by_institution(db: Session, institution_id: int) -> List[models.Ticket]:
+def get_waiting_tickets_by_institution(db: Session, institution_id: int) -> List[WaitingTicket]:
     """
     Récupère tous les tickets en attente pour une institution
 
@@ -346,9 +687,51 @@ def get_waiting_tickets_by_institution(db: Session, institution_id: int) -> List
         institution_id: ID de l'institution
 
     Returns:
-        Liste des tickets en attente, triés par position
+        Liste des tickets en attente (copies en mémoire), dans l'ordre de la file
     """
-    return db.query(models.Ticket).filter(
-        models.Ticket.institution_id == institution_id,
-        models.Ticket.status == models.TicketStatus.WAITING
-    ).order_by(models.Ticket.queue_position).all()
+    waiting_queues.ensure_loaded(db)
+    queue = waiting_queues.get(institution_id)
+    return queue.snapshot() if queue is not None else []
+
+
+# ========================================
+# RÉPONSES À PARTIR DE PROJECTIONS
+# ========================================
+
+# Colonnes de TicketResponse (communes à tickets et tickets_archive)
+TICKET_RESPONSE_COLUMNS = (
+    "id", "ticket_number", "service_day", "sequence", "user_id", "institution_id", "status",
+    "queue_position", "operator_id", "created_at", "called_at", "completed_at",
+)
+
+
+def ticket_columns(model=models.Ticket) -> list:
+    """Colonnes à sélectionner (ou RETURNING) pour construire un TicketResponse"""
+    return [getattr(model, column) for column in TICKET_RESPONSE_COLUMNS]
+
+
+def ticket_responses(db: Session, rows) -> List[schemas.TicketResponse]:
+    """
+    Construit des TicketResponse à partir de lignes projetées
+
+    Les lignes viennent de ticket_columns() : pas d'entité ORM, pas de
+    chargement paresseux de `institution`. Chaque institution vient du
+    cache et n'est convertie qu'une fois par appel.
+
+    Args:
+        db: Session de base de données (chargement du cache au besoin)
+        rows: Lignes contenant les colonnes TICKET_RESPONSE_COLUMNS
+
+    Returns:
+        Liste de TicketResponse, dans l'ordre des lignes
+    """
+    institutions = {}
+    responses = []
+    for row in rows:
+        institution = institutions.get(row.institution_id)
+        if institution is None:
+            institution = institutions[row.institution_id] = schemas.InstitutionResponse.model_validate(
+                institution_cache.get(db, row.institution_id), from_attributes=True
+            )
+        responses.append(schemas.TicketResponse(**row._mapping, institution=institution))
+    return responses
@@ -0,0 +1,235 @@
+"""
+crud_async.py - Opérations CRUD Asynchrones
+===========================================
+Versions `async` des fonctions de crud.py et crud_users.py, utilisées
+par les routes de main.py avec une AsyncSession.
+
+Chaque fonction exécute la fonction synchrone correspondante via
+AsyncSession.run_sync() : la logique SQL n'est écrite qu'une seule fois,
+et les accès à la base passent par le pilote aiosqlite sans bloquer de
+thread du serveur.
+
+Les fonctions qui renvoient des tickets les convertissent en
+TicketResponse dans ce même appel, car `ticket.institution` est chargé
+paresseusement et ne peut pas l'être en dehors de run_sync().
+"""
+
+import asyncio
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import crud_users
+import metrics
+import models
+import pagination
+import schemas
+from institution_cache import CachedInstitution
+
+# Émissions de tickets de cette boucle : une transaction à la fois, dans
+# l'ordre d'arrivée. SQLite n'a qu'un écrivain ; sans cette file, des
+# dizaines de connexions se disputent son verrou (attente de busy_timeout,
+# sans ordre) et une émission peut attendre au-delà du délai.
+#
+# Ce verrou ne protège que l'ordre et la latence, pas l'unicité : il ne
+# vaut que pour une boucle d'un processus, et crud.issue_ticket appelé
+# directement (scripts, benchmarks) ne le prend pas. L'unicité des numéros
+# vient de l'UPDATE ... RETURNING de crud.allocate_ticket_sequence (une
+# transaction d'écriture SQLite) et de l'index unique (institution,
+# séquence, jour). Un conflit sur cet index n'est pas réessayé : le
+# rollback annule aussi la réservation, une nouvelle tentative reprendrait
+# le même numéro. C'est une erreur à corriger, elle remonte telle quelle.
+# L'API suppose un seul processus par base (voir
+# queue_engine.acquire_process_lock).
+ticket_writes = asyncio.Lock()
+
+# Tentatives d'une écriture (émission, appel du prochain ticket) si la
+# base reste verrouillée
+CLAIM_RETRIES = 5
+CLAIM_RETRY_DELAY = 0.01  # secondes, doublé à chaque tentative
+
+
+async def _retry_write(db: AsyncSession, function, *args):
+    """
+    Exécute une écriture, réessayée CLAIM_RETRIES fois au plus si la base
+    reste verrouillée (busy_timeout expiré)
+
+    Le délai (croissant) est attendu ici (asyncio.sleep) et non dans
+    run_sync, qui bloquerait la boucle. La fonction doit annuler sa
+    transaction en cas d'échec (crud.issue_ticket, call_next_ticket...).
+    """
+    for attempt in range(CLAIM_RETRIES):
+        try:
+            return await db.run_sync(function, *args)
+        except OperationalError as e:
+            if "locked" not in str(e) or attempt == CLAIM_RETRIES - 1:
+                raise
+            await asyncio.sleep(CLAIM_RETRY_DELAY * 2 ** attempt)
+
+
+def _ticket_response(ticket: Optional[models.Ticket]) -> Optional[schemas.TicketResponse]:
+    """Convertit un ticket ORM en schéma (relations chargées ici)"""
+    if ticket is None:
+        return None
+    return schemas.TicketResponse.model_validate(ticket)
+
+
+def _with_ticket_response(function):
+    """Enveloppe une fonction CRUD pour convertir le ticket renvoyé"""
+    def wrapper(db, *args, **kwargs):
+        return _ticket_response(function(db, *args, **kwargs))
+    return wrapper
+
+
+# ========================================
+# INSTITUTIONS
+# ========================================
+
+async def get_institutions(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[CachedInstitution]:
+    return await db.run_sync(crud.get_institutions, skip=skip, limit=limit)
+
+
+async def get_institutions_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100) -> pagination.Page:
+    return await db.run_sync(crud.get_institutions_page, cursor=cursor, limit=limit)
+
+
+async def get_institutions_by_type(db: AsyncSession, institution_type: models.InstitutionType) -> List[CachedInstitution]:
+    return await db.run_sync(crud.get_institutions_by_type, institution_type)
+
+
+async def get_institution_by_id(db: AsyncSession, institution_id: int) -> Optional[CachedInstitution]:
+    return await db.run_sync(crud.get_institution_by_id, institution_id)
+
+
+async def create_institution(db: AsyncSession, institution: schemas.InstitutionCreate) -> models.Institution:
+    return await db.run_sync(crud.create_institution, institution)
+
+
+# ========================================
+# QUEUES
+# ========================================
+
+async def get_queue_by_institution(db: AsyncSession, institution_id: int) -> Optional[models.Queue]:
+    return await db.run_sync(crud.get_queue_by_institution, institution_id)
+
+
+async def get_queue_info(db: AsyncSession, institution_id: int) -> Optional[schemas.QueueInfo]:
+    return await db.run_sync(crud.get_queue_info, institution_id)
+
+
+# ========================================
+# TICKETS
+# ========================================
+
+async def issue_ticket(db: AsyncSession, ticket: schemas.TicketCreate) -> schemas.TicketStats:
+    async with ticket_writes:
+        return await _retry_write(db, crud.issue_ticket, ticket)
+
+
+async def issue_tickets(db: AsyncSession, tickets: List[schemas.TicketCreate]) -> List[schemas.TicketStats]:
+    async with ticket_writes:
+        return await _retry_write(db, crud.issue_tickets, tickets)
+
+
+async def get_ticket_by_number(db: AsyncSession, ticket_number: str) -> Optional[schemas.TicketResponse]:
+    return await db.run_sync(_with_ticket_response(crud.get_ticket_by_number), ticket_number)
+
+
+async def get_ticket_stats(db: AsyncSession, ticket_number: str) -> Optional[schemas.TicketStats]:
+    return await db.run_sync(crud.get_ticket_stats, ticket_number)
+
+
+async def update_ticket_status(db: AsyncSession, ticket_number: str, status: models.TicketStatus) -> Optional[schemas.TicketResponse]:
+    return await db.run_sync(_with_ticket_response(crud.update_ticket_status), ticket_number, status)
+
+
+async def get_waiting_tickets_by_institution(db: AsyncSession, institution_id: int):
+    return await db.run_sync(crud.get_waiting_tickets_by_institution, institution_id)
+
+
+# ========================================
+# UTILISATEURS ET AUTHENTIFICATION
+# ========================================
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
+    return await db.run_sync(crud_users.get_user_by_email, email)
+
+
+async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[models.User]:
+    return await db.run_sync(crud_users.get_user_by_id, user_id)
+
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User:
+    return await db.run_sync(crud_users.create_user, user)
+
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[models.User]:
+    return await db.run_sync(crud_users.authenticate_user, email, password)
+
+
+async def get_operators_by_institution(
+    db: AsyncSession, institution_id: int, cursor: Optional[str] = None, limit: int = 100
+) -> pagination.Page:
+    return await db.run_sync(crud_users.get_operators_by_institution, institution_id, cursor=cursor, limit=limit)
+
+
+async def get_all_operators(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100) -> pagination.Page:
+    return await db.run_sync(crud_users.get_all_operators, cursor=cursor, limit=limit)
+
+
+# ========================================
+# OPÉRATEURS
+# ========================================
+
+async def call_next_ticket(db: AsyncSession, institution_id: int, operator_id: int) -> Optional[schemas.TicketResponse]:
+    """
+    crud_users.call_next_ticket, réessayé si la base reste verrouillée
+
+    Sous forte concurrence, l'attente de busy_timeout peut expirer. On
+    réessaie alors quelques fois avec un délai croissant (_retry_write).
+    Une réservation échouée laisse la file en mémoire intacte.
+    """
+    return await _retry_write(db, crud_users.call_next_ticket, institution_id, operator_id)
+
+
+async def complete_ticket(db: AsyncSession, ticket_number: str, operator_id: int) -> Optional[schemas.TicketResponse]:
+    return await db.run_sync(_with_ticket_response(crud_users.complete_ticket), ticket_number, operator_id)
+
+
+async def mark_ticket_missed(db: AsyncSession, ticket_number: str) -> Optional[schemas.TicketResponse]:
+    return await db.run_sync(_with_ticket_response(crud_users.mark_ticket_missed), ticket_number)
+
+
+async def get_operator_stats(db: AsyncSession, operator_id: int) -> dict:
+    return await db.run_sync(crud_users.get_operator_stats, operator_id)
+
+
+# ========================================
+# ADMIN ET HISTORIQUE
+# ========================================
+
+async def get_admin_stats(db: AsyncSession) -> dict:
+    return await db.run_sync(crud_users.get_admin_stats)
+
+
+async def reconcile_daily_counters(db: AsyncSession, day: Optional[date] = None) -> dict:
+    return await db.run_sync(crud_users.reconcile_daily_counters, day)
+
+
+async def get_user_ticket_history(
+    db: AsyncSession, user_id: int, limit: int = 10, cursor: Optional[str] = None
+) -> pagination.Page:
+    return await db.run_sync(crud_users.get_user_ticket_history, user_id, limit=limit, cursor=cursor)
+
+
+# ========================================
+# MÉTRIQUES
+# ========================================
+
+async def render_metrics(db: AsyncSession) -> str:
+    """Jauges des files mises à jour, puis toutes les métriques (texte Prometheus)"""
+    await db.run_sync(metrics.collect_queues)
+    return metrics.registry.render()
@@ -5,12 +5,20 @@ Fonctions pour gérer les utilisateurs et l'authentification
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime
-from typing import List, Optional
+from sqlalchemy import case, func, tuple_, update
+from datetime import datetime, date as date_type
+from typing import Optional
 
 import models
 import schemas
+import crud
+import daily_counters
+import pagination
+import queue_events
+from daily_counters import day_bounds
+from institution_cache import institution_cache
+from queue_engine import waiting_queues
+from service_time import service_times
 
 
 # ========================================
@@ -89,80 +97,163 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[models
     return user
 
 
-def get_operators_by_institution(db: Session, institution_id: int) -> List[models.User]:
+def _operators_page(query, cursor: Optional[str], limit: int) -> pagination.Page:
+    """Page d'opérateurs triés par id : reprend après l'id du curseur"""
+    if cursor:
+        query = query.filter(models.User.id > pagination.decode_cursor(cursor, int)[0])
+    operators = query.order_by(models.User.id).limit(limit + 1).all()
+    if len(operators) <= limit:
+        return pagination.Page(operators)
+    operators = operators[:limit]
+    return pagination.Page(operators, pagination.encode_cursor(operators[-1].id))
+
+
+def get_operators_by_institution(
+    db: Session, institution_id: int, cursor: Optional[str] = None, limit: int = 100
+) -> pagination.Page:
     """
-    Récupère tous les opérateurs d'une institution
+    Récupère les opérateurs actifs d'une institution, par page
+
+    L'index (role, institution_id, is_active) se termine par l'id (rowid) :
+    une page est une simple reprise dans l'index, sans tri.
+
+    Raises:
+        pagination.InvalidCursor: si le curseur est illisible
     """
-    return db.query(models.User).filter(
+    query = db.query(models.User).filter(
         models.User.role == models.UserRole.OPERATOR,
         models.User.institution_id == institution_id,
         models.User.is_active == True
-    ).all()
+    )
+    return _operators_page(query, cursor, limit)
 
 
-def get_all_operators(db: Session) -> List[models.User]:
+def get_all_operators(db: Session, cursor: Optional[str] = None, limit: int = 100) -> pagination.Page:
     """
-    Récupère tous les opérateurs (pour admin)
+    Récupère les opérateurs actifs (pour admin), par page, via l'index
+    (role, is_active)
+
+    Raises:
+        pagination.InvalidCursor: si le curseur est illisible
     """
-    return db.query(models.User).filter(
+    query = db.query(models.User).filter(
         models.User.role == models.UserRole.OPERATOR,
         models.User.is_active == True
-    ).all()
+    )
+    return _operators_page(query, cursor, limit)
 
 
 # ========================================
 # OPÉRATIONS SPÉCIFIQUES AUX OPÉRATEURS
 # ========================================
 
-def call_next_ticket(db: Session, institution_id: int, operator_id: int) -> Optional[models.Ticket]:
+def call_next_ticket(db: Session, institution_id: int, operator_id: int) -> Optional[schemas.TicketResponse]:
     """
     Appelle le prochain ticket en attente pour une institution
-    """
-    # Trouver le premier ticket en attente
-    next_ticket = db.query(models.Ticket).filter(
-        models.Ticket.institution_id == institution_id,
-        models.Ticket.status == models.TicketStatus.WAITING
-    ).order_by(models.Ticket.queue_position).first()
 
-    if not next_ticket:
+    Le prochain ticket est retiré de la tête de la file en mémoire (pas
+    de recherche SQL, sous le verrou de la file : deux appels simultanés
+    obtiennent deux tickets différents) puis réservé par claim_ticket().
+    S'il n'était déjà plus en attente en base, on passe au suivant.
+    Chaque ticket est donc remis à un seul opérateur, avec une seule
+    écriture par appel. Si la réservation échoue (base verrouillée...),
+    le ticket est remis à sa place. La ligne de la table queues est mise
+    à jour en arrière-plan.
+
+    La réponse est construite à partir des colonnes renvoyées par
+    l'UPDATE (RETURNING), sans relire le ticket ni son institution.
+    """
+    waiting_queues.ensure_loaded(db)
+    queue = waiting_queues.get(institution_id)
+    if queue is None:
         return None
 
-    # Changer le statut à CALLED
-    next_ticket.status = models.TicketStatus.CALLED
-    next_ticket.called_at = datetime.utcnow()
-    next_ticket.operator_id = operator_id
+    while True:
+        # Premier ticket en attente (sa place est gardée pendant la réservation)
+        waiting = queue.pop()
+        if waiting is None:
+            return None
 
-    # Mettre à jour la queue
-    queue = db.query(models.Queue).filter(
-        models.Queue.institution_id == institution_id
-    ).first()
+        try:
+            claimed = claim_ticket(db, waiting.id, operator_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            queue.restore(waiting)
+            raise
 
-    if queue:
-        queue.current_ticket_number = next_ticket.ticket_number
-        queue.updated_at = datetime.utcnow()
+        # Réservé, ou déjà sorti de l'attente en base : il quitte la file
+        queue.release(waiting.id)
+        if claimed is not None:
+            break
 
-    db.commit()
-    db.refresh(next_ticket)
+    # Mettre à jour la queue (écriture différée) et prévenir les abonnés
+    waiting_queues.set_current(institution_id, waiting.ticket_number)
+    service_times.observe_wait((claimed.called_at - claimed.created_at).total_seconds() / 60)
+    queue_events.notify_queue_changed(institution_id, "ticket_called", waiting.ticket_number)
+
+    return crud.ticket_responses(db, [claimed])[0]
+
+
+def claim_ticket(db: Session, ticket_id: int, operator_id: int):
+    """
+    Réserve un ticket pour un opérateur, de façon atomique
 
-    return next_ticket
+    Un seul UPDATE conditionnel : le ticket passe à CALLED seulement s'il
+    est encore WAITING. SQLite sérialise les écritures, donc si deux
+    opérateurs (threads ou processus) visent le même ticket, un seul
+    UPDATE modifie la ligne ; l'autre ne renvoie rien.
+
+    Pas de commit ici.
+
+    Returns:
+        Ligne du ticket réservé (colonnes crud.TICKET_RESPONSE_COLUMNS),
+        ou None s'il n'était plus en attente
+    """
+    return db.execute(
+        update(models.Ticket)
+        .where(
+            models.Ticket.id == ticket_id,
+            models.Ticket.status == models.TicketStatus.WAITING
+        )
+        .values(
+            status=models.TicketStatus.CALLED,
+            called_at=datetime.utcnow(),
+            operator_id=operator_id
+        )
+        .returning(*crud.ticket_columns())
+        .execution_options(synchronize_session=False)
+    ).first()
 
 
 def complete_ticket(db: Session, ticket_number: str, operator_id: int) -> Optional[models.Ticket]:
     """
     Marque un ticket comme complété
+
+    ticket_number : numéro affiché (H01-1018-007) ou identifiant du ticket
     """
-    ticket = db.query(models.Ticket).filter(
-        models.Ticket.ticket_number == ticket_number
-    ).first()
+    ticket = crud.get_ticket_by_number(db, ticket_number)
 
     if not ticket:
         return None
 
+    previous_status, previous_completed_at = ticket.status, ticket.completed_at
+    was_waiting = previous_status == models.TicketStatus.WAITING
     ticket.status = models.TicketStatus.COMPLETED
     ticket.completed_at = datetime.utcnow()
     ticket.operator_id = operator_id
+    daily_counters.record_status_change(db, ticket, previous_status, previous_completed_at)
 
+    institution_id, ticket_id, code = ticket.institution_id, ticket.id, ticket.ticket_number
+    called_at, completed_at = ticket.called_at, ticket.completed_at
     db.commit()
+
+    if was_waiting:
+        waiting_queues.remove(institution_id, ticket_id)
+    # Nouvelle mesure du temps de service (institution et opérateur)
+    waiting_queues.record_service(institution_id, operator_id, called_at, completed_at)
+    queue_events.notify_queue_changed(institution_id, "ticket_completed", code)
+
     db.refresh(ticket)
 
     return ticket
@@ -171,17 +262,26 @@ def complete_ticket(db: Session, ticket_number: str, operator_id: int) -> Option
 def mark_ticket_missed(db: Session, ticket_number: str) -> Optional[models.Ticket]:
     """
     Marque un ticket comme manqué
+
+    ticket_number : numéro affiché (H01-1018-007) ou identifiant du ticket
     """
-    ticket = db.query(models.Ticket).filter(
-        models.Ticket.ticket_number == ticket_number
-    ).first()
+    ticket = crud.get_ticket_by_number(db, ticket_number)
 
     if not ticket:
         return None
 
+    previous_status = ticket.status
+    was_waiting = previous_status == models.TicketStatus.WAITING
     ticket.status = models.TicketStatus.MISSED
+    daily_counters.record_status_change(db, ticket, previous_status, ticket.completed_at)
 
+    institution_id, ticket_id, code = ticket.institution_id, ticket.id, ticket.ticket_number
     db.commit()
+
+    if was_waiting:
+        waiting_queues.remove(institution_id, ticket_id)
+    queue_events.notify_queue_changed(institution_id, "ticket_missed", code)
+
     db.refresh(ticket)
 
     return ticket
@@ -193,13 +293,15 @@ def get_operator_stats(db: Session, operator_id: int, date: datetime = None) ->
     """
     if date is None:
         date = datetime.utcnow().date()
+    day_start, day_end = day_bounds(date)
 
     # Tickets servis aujourd'hui
-    tickets_served = db.query(models.Ticket).filter(
+    tickets_served = db.query(func.count(models.Ticket.id)).filter(
         models.Ticket.operator_id == operator_id,
         models.Ticket.status == models.TicketStatus.COMPLETED,
-        func.date(models.Ticket.completed_at) == date
-    ).count()
+        models.Ticket.completed_at >= day_start,
+        models.Ticket.completed_at < day_end
+    ).scalar()
 
     # Ticket actuel
     current_ticket = db.query(models.Ticket).filter(
@@ -207,8 +309,17 @@ def get_operator_stats(db: Session, operator_id: int, date: datetime = None) ->
         models.Ticket.status.in_([models.TicketStatus.CALLED, models.TicketStatus.IN_SERVICE])
     ).first()
 
+    # Temps de service estimé de l'opérateur, sinon celui de son institution
+    average_service_time = service_times.operator(operator_id)
+    if average_service_time is None:
+        institution_id = current_ticket.institution_id if current_ticket else db.query(
+            models.User.institution_id
+        ).filter(models.User.id == operator_id).scalar()
+        average_service_time = service_times.institution(institution_id)
+
     return {
         "tickets_served_today": tickets_served,
+        "average_service_time": average_service_time,
         "current_ticket": current_ticket.ticket_number if current_ticket else None
     }
 
@@ -220,49 +331,86 @@ def get_operator_stats(db: Session, operator_id: int, date: datetime = None) ->
 def get_admin_stats(db: Session) -> dict:
     """
     Récupère les statistiques globales pour l'admin
-    """
-    today = datetime.utcnow().date()
-
-    total_institutions = db.query(models.Institution).count()
-    total_users = db.query(models.User).count()
-    total_operators = db.query(models.User).filter(
-        models.User.role == models.UserRole.OPERATOR
-    ).count()
 
-    total_tickets_today = db.query(models.Ticket).filter(
-        func.date(models.Ticket.created_at) == today
-    ).count()
-
-    tickets_waiting = db.query(models.Ticket).filter(
-        models.Ticket.status == models.TicketStatus.WAITING
-    ).count()
+    - tickets du jour : ligne globale de daily_counters (clé primaire)
+    - utilisateurs et opérateurs : un seul COUNT
+    - tickets en attente et institutions : en mémoire, sans SQL
+    """
+    counters = daily_counters.get_counters(db, datetime.utcnow().date())
 
-    tickets_completed = db.query(models.Ticket).filter(
-        models.Ticket.status == models.TicketStatus.COMPLETED,
-        func.date(models.Ticket.completed_at) == today
-    ).count()
+    total_users, total_operators = db.query(
+        func.count(models.User.id),
+        func.count(case((models.User.role == models.UserRole.OPERATOR, 1)))
+    ).one()
 
-    tickets_missed = db.query(models.Ticket).filter(
-        models.Ticket.status == models.TicketStatus.MISSED,
-        func.date(models.Ticket.created_at) == today
-    ).count()
+    waiting_queues.ensure_loaded(db)
 
     return {
-        "total_institutions": total_institutions,
+        "total_institutions": institution_cache.count(db),
         "total_users": total_users,
         "total_operators": total_operators,
-        "total_tickets_today": total_tickets_today,
-        "tickets_waiting": tickets_waiting,
-        "tickets_completed": tickets_completed,
-        "tickets_missed": tickets_missed,
-        "average_wait_time": 3  # À calculer dynamiquement
+        "total_tickets_today": counters["tickets_created"],
+        "tickets_waiting": waiting_queues.total_waiting(),
+        "tickets_completed": counters["tickets_completed"],
+        "tickets_missed": counters["tickets_missed"],
+        # Attente réelle récente (EWMA), sinon attente estimée des files
+        "average_wait_time": _average_wait_time()
     }
 
 
-def get_user_ticket_history(db: Session, user_id: int, limit: int = 10) -> List[models.Ticket]:
+def _average_wait_time() -> int:
+    """Attente moyenne : mesurée si des tickets ont été appelés, sinon estimée"""
+    measured = service_times.average_wait()
+    if measured is not None:
+        return measured
+    return waiting_queues.estimated_average_wait()
+
+
+def reconcile_daily_counters(db: Session, day: Optional[date_type] = None) -> dict:
+    """
+    Recalcule les compteurs d'un jour depuis la table tickets
+
+    À utiliser si les compteurs semblent faux (modification manuelle de
+    la base, import...). Par défaut : aujourd'hui.
+    """
+    if day is None:
+        day = datetime.utcnow().date()
+    return {"service_day": day, **daily_counters.rebuild(db, day)}
+
+
+def get_user_ticket_history(
+    db: Session, user_id: int, limit: int = 10, cursor: Optional[str] = None
+) -> pagination.Page:
     """
-    Récupère l'historique des tickets d'un utilisateur
+    Récupère l'historique des tickets d'un utilisateur, du plus récent au
+    plus ancien, par page
+
+    Lit les tickets récents (`tickets`) et archivés (`tickets_archive`,
+    voir archive.py) : au plus `limit` + 1 lignes par table, via l'index
+    (user_id, created_at) de chacune, puis fusion par date. L'ordre
+    (created_at, id) est total (l'archive garde l'id du ticket) : le
+    curseur reprend juste après la dernière ligne de la page précédente,
+    sans OFFSET.
+
+    Seules les colonnes de la réponse sont lues (pas d'entités ORM) et
+    les institutions viennent du cache : 2 requêtes quel que soit le
+    nombre de tickets.
+
+    Raises:
+        pagination.InvalidCursor: si le curseur est illisible
     """
-    return db.query(models.Ticket).filter(
-        models.Ticket.user_id == user_id
-    ).order_by(models.Ticket.created_at.desc()).limit(limit).all()
+    before = pagination.decode_cursor(cursor, datetime, int) if cursor else None
+    rows = []
+    for model in (models.Ticket, models.TicketArchive):
+        query = db.query(*crud.ticket_columns(model)).filter(model.user_id == user_id)
+        if before:
+            # Comparaison de tuples : plage dans l'index (user_id, created_at, id)
+            query = query.filter(tuple_(model.created_at, model.id) < tuple_(*before))
+        rows.extend(query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all())
+    rows.sort(key=lambda row: (row.created_at, row.id), reverse=True)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = pagination.encode_cursor(rows[-1].created_at, rows[-1].id)
+    return pagination.Page(crud.ticket_responses(db, rows), next_cursor)
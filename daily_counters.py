@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+daily_counters.py - Compteurs Journaliers de Tickets
+====================================================
+/admin/stats comptait les tickets du jour à chaque appel (plusieurs
+COUNT sur toute la table). Ces compteurs sont maintenant tenus à jour
+dans la table `daily_counters`, une ligne par jour et par institution,
+plus une ligne globale (institution_id = 0) :
+
+- création d'un ticket         -> tickets_created (jour de created_at)
+- passage à / sortie de COMPLETED -> tickets_completed (jour de completed_at)
+- passage à / sortie de MISSED    -> tickets_missed (jour de created_at)
+
+Chaque mise à jour est un seul INSERT ... ON CONFLICT DO UPDATE, exécuté
+dans la transaction qui modifie le ticket : compteurs et tickets sont
+validés (ou annulés) ensemble.
+
+En cas de doute (modification manuelle de la base, ancienne version de
+l'API), rebuild() recalcule les compteurs d'un jour depuis `tickets` et
+`tickets_archive` :
+
+    python daily_counters.py [AAAA-MM-JJ]
+"""
+
+import sys
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+
+# Ligne des compteurs toutes institutions confondues
+GLOBAL_INSTITUTION = 0
+
+COUNTER_COLUMNS = ("tickets_created", "tickets_completed", "tickets_missed")
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """
+    Début et fin (exclue) d'une journée
+
+    Filtrer avec `colonne >= début AND colonne < fin` permet d'utiliser
+    les index, contrairement à `func.date(colonne) == jour`.
+    """
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def service_day_key(day: date) -> int:
+    """Jour de service en entier compact AAAAMMJJ (clé des tickets)"""
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+# ========================================
+# MISE À JOUR (dans la transaction courante)
+# ========================================
+
+def _apply(db: Session, deltas: Dict[Tuple[date, int], Dict[str, int]]) -> None:
+    """
+    Ajoute des deltas aux compteurs (et à la ligne globale de chaque jour)
+
+    Un seul INSERT ... ON CONFLICT DO UPDATE pour toutes les lignes.
+
+    Args:
+        db: Session de base de données (pas de commit ici)
+        deltas: {(jour, institution_id): {colonne: delta}}
+    """
+    totals: Dict[Tuple[date, int], Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+    for (day, institution_id), changes in deltas.items():
+        for column, delta in changes.items():
+            totals[(day, institution_id)][column] += delta
+            totals[(day, GLOBAL_INSTITUTION)][column] += delta
+
+    rows = [
+        {"service_day": day, "institution_id": institution_id, **values}
+        for (day, institution_id), values in totals.items()
+        if any(values.values())
+    ]
+    if not rows:
+        return
+
+    statement = sqlite_insert(models.DailyCounter).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["service_day", "institution_id"],
+        set_={
+            column: getattr(models.DailyCounter, column) + getattr(statement.excluded, column)
+            for column in COUNTER_COLUMNS
+        }
+    )
+    db.execute(statement)
+
+
+def record_created(db: Session, counts: Dict[int, int], created_at: datetime) -> None:
+    """
+    Compte des tickets créés
+
+    Args:
+        db: Session de base de données (pas de commit ici)
+        counts: {institution_id: nombre de tickets créés}
+        created_at: Date de création des tickets
+    """
+    day = created_at.date()
+    _apply(db, {(day, institution_id): {"tickets_created": count} for institution_id, count in counts.items()})
+
+
+def record_status_change(db: Session, ticket: models.Ticket,
+                         previous_status: models.TicketStatus,
+                         previous_completed_at: Optional[datetime]) -> None:
+    """
+    Répercute un changement de statut sur les compteurs
+
+    À appeler après avoir modifié le ticket et avant le commit.
+
+    Args:
+        db: Session de base de données (pas de commit ici)
+        ticket: Ticket modifié (nouveau statut et timestamps)
+        previous_status: Statut avant la modification
+        previous_completed_at: completed_at avant la modification
+    """
+    deltas: Dict[Tuple[date, int], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    created_key = (ticket.created_at.date(), ticket.institution_id)
+
+    if previous_status == models.TicketStatus.COMPLETED and previous_completed_at is not None:
+        deltas[(previous_completed_at.date(), ticket.institution_id)]["tickets_completed"] -= 1
+    if ticket.status == models.TicketStatus.COMPLETED and ticket.completed_at is not None:
+        deltas[(ticket.completed_at.date(), ticket.institution_id)]["tickets_completed"] += 1
+
+    if previous_status == models.TicketStatus.MISSED:
+        deltas[created_key]["tickets_missed"] -= 1
+    if ticket.status == models.TicketStatus.MISSED:
+        deltas[created_key]["tickets_missed"] += 1
+
+    _apply(db, deltas)
+
+
+# ========================================
+# LECTURE
+# ========================================
+
+def get_counters(db: Session, day: date, institution_id: int = GLOBAL_INSTITUTION) -> Dict[str, int]:
+    """
+    Compteurs d'un jour (une lecture par clé primaire)
+
+    Args:
+        db: Session de base de données
+        day: Jour de service
+        institution_id: ID de l'institution, ou 0 pour le global
+
+    Returns:
+        {colonne: valeur}, à 0 si aucun ticket ce jour-là
+    """
+    row = db.get(models.DailyCounter, (day, institution_id))
+    return {column: (getattr(row, column) if row else 0) for column in COUNTER_COLUMNS}
+
+
+# ========================================
+# RÉCONCILIATION
+# ========================================
+
+def rebuild(db: Session, day: date) -> Dict[str, int]:
+    """
+    Recalcule les compteurs d'un jour depuis la table tickets
+
+    Les lignes du jour sont supprimées en premier : la transaction prend
+    ainsi le verrou d'écriture avant de compter, et aucun ticket ne peut
+    être émis entre le comptage et la réécriture.
+
+    Args:
+        db: Session de base de données (commit effectué ici)
+        day: Jour de service
+
+    Returns:
+        Compteurs globaux recalculés
+    """
+    start, end = day_bounds(day)
+
+    try:
+        db.query(models.DailyCounter).filter(
+            models.DailyCounter.service_day == day
+        ).delete(synchronize_session=False)
+
+        counts: Dict[int, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+
+        def queries(Ticket) -> dict:
+            return {
+                "tickets_created": [Ticket.created_at >= start, Ticket.created_at < end],
+                "tickets_completed": [
+                    Ticket.status == models.TicketStatus.COMPLETED,
+                    Ticket.completed_at >= start, Ticket.completed_at < end
+                ],
+                "tickets_missed": [
+                    Ticket.status == models.TicketStatus.MISSED,
+                    Ticket.created_at >= start, Ticket.created_at < end
+                ],
+            }
+        # Tickets récents et archivés (voir archive.py)
+        for model in (models.Ticket, models.TicketArchive):
+            for column, conditions in queries(model).items():
+                rows = db.query(model.institution_id, func.count(model.id)).filter(
+                    *conditions
+                ).group_by(model.institution_id)
+                for institution_id, count in rows:
+                    counts[institution_id][column] += count
+                    counts[GLOBAL_INSTITUTION][column] += count
+
+        for institution_id, values in counts.items():
+            db.add(models.DailyCounter(service_day=day, institution_id=institution_id, **values))
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return dict(counts.get(GLOBAL_INSTITUTION, dict.fromkeys(COUNTER_COLUMNS, 0)))
+
+
+if __name__ == '__main__':
+    from database import SessionLocal
+
+    target = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else datetime.utcnow().date()
+    session = SessionLocal()
+    try:
+        totals = rebuild(session, target)
+    finally:
+        session.close()
+    print(f'✅ Compteurs du {target.isoformat()} recalculés : {totals}')
@@ -4,22 +4,102 @@ database.py - Configuration de la Base de Données
 Ce fichier configure la connexion à SQLite et crée le moteur de BD.
 """
 
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+import metrics
+import query_audit
+
 # ========== URL DE LA BASE DE DONNÉES ==========
 # SQLite stocke tout dans un fichier .db
-SQLALCHEMY_DATABASE_URL = "sqlite:///./queueflow.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("QUEUEFLOW_DATABASE_URL", "sqlite:///./queueflow.db")
 # "./" signifie "dans le dossier actuel"
 
+# ========== PROFIL DU MOTEUR ==========
+# "production" : WAL + pragmas ci-dessous (par défaut)
+# "legacy"     : configuration d'origine (journal rollback, synchronous=FULL)
+DB_PROFILE = os.getenv("QUEUEFLOW_DB_PROFILE", "production")
+
+# Pragmas appliqués à chaque nouvelle connexion (profil "production")
+SQLITE_PRAGMAS = {
+    # WAL : les lectures ne bloquent plus les écritures (et inversement)
+    "journal_mode": os.getenv("QUEUEFLOW_DB_JOURNAL_MODE", "WAL"),
+    # Attendre un verrou au lieu d'échouer avec "database is locked"
+    "busy_timeout": int(os.getenv("QUEUEFLOW_DB_BUSY_TIMEOUT_MS", "5000")),
+    # NORMAL est sûr en WAL (pas de corruption, seule la dernière
+    # transaction peut être perdue en cas de coupure de courant)
+    "synchronous": os.getenv("QUEUEFLOW_DB_SYNCHRONOUS", "NORMAL"),
+    # Taille du cache en KiB quand la valeur est négative (-20000 = ~20 Mo)
+    "cache_size": int(os.getenv("QUEUEFLOW_DB_CACHE_SIZE", "-20000")),
+    # Lecture du fichier par mmap (256 Mo)
+    "mmap_size": int(os.getenv("QUEUEFLOW_DB_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Tables temporaires (tris, GROUP BY) en mémoire
+    "temp_store": os.getenv("QUEUEFLOW_DB_TEMP_STORE", "MEMORY"),
+}
+
+# Taille du pool : le threadpool de Starlette/uvicorn exécute au plus 40
+# routes synchrones en parallèle, chacune avec sa propre connexion
+DB_POOL_SIZE = int(os.getenv("QUEUEFLOW_DB_POOL_SIZE", "40"))
+DB_MAX_OVERFLOW = int(os.getenv("QUEUEFLOW_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("QUEUEFLOW_DB_POOL_TIMEOUT", "30"))
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict = SQLITE_PRAGMAS) -> None:
+    """Applique les pragmas SQLite sur une connexion DBAPI"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def create_sqlite_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = DB_PROFILE) -> Engine:
+    """
+    Crée un moteur SQLite selon un profil
+
+    Args:
+        url: URL de la base
+        profile: "production" (WAL, pragmas, pool dimensionné) ou "legacy"
+
+    Returns:
+        Le moteur SQLAlchemy
+    """
+    if profile == "legacy":
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    new_engine = create_engine(
+        url,
+        # check_same_thread=False : permet plusieurs connexions simultanées
+        # (nécessaire pour FastAPI qui est asynchrone)
+        connect_args={"check_same_thread": False},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+
+    @event.listens_for(new_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection)
+
+    return new_engine
+
+
+def instrument_engine(target: Engine) -> None:
+    """Compte et chronomètre les instructions SQL (voir metrics.py et query_audit.py)"""
+    event.listen(target, "before_cursor_execute", metrics.before_cursor_execute)
+    event.listen(target, "after_cursor_execute", metrics.after_cursor_execute)
+    event.listen(target, "after_cursor_execute", query_audit.after_cursor_execute)
+    event.listen(target, "handle_error", metrics.handle_error)
+
+
 # ========== CRÉATION DU MOTEUR ==========
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
-    # check_same_thread=False : permet plusieurs connexions simultanées
-    # (nécessaire pour FastAPI qui est asynchrone)
-)
+engine = create_sqlite_engine()
+instrument_engine(engine)
 
 # ========== SESSION LOCALE ==========
 SessionLocal = sessionmaker(
@@ -0,0 +1,96 @@
+"""
+database_async.py - Configuration Asynchrone de la Base de Données
+==================================================================
+Variante asynchrone de database.py, utilisée par les routes de main.py.
+
+Le pilote aiosqlite exécute les appels SQLite dans son propre thread :
+une route qui attend la base libère la boucle d'événements au lieu
+d'occuper un des 40 threads du threadpool de Starlette.
+
+database.py (moteur synchrone) reste disponible pour les scripts comme
+run.py ou migrations.py, et pour les tâches de fond.
+"""
+
+import os
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from database import (
+    SQLALCHEMY_DATABASE_URL,
+    DB_PROFILE,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    apply_sqlite_pragmas,
+    instrument_engine,
+)
+
+# ========== URL ASYNCHRONE ==========
+# Même fichier que le moteur synchrone, avec le pilote aiosqlite
+ASYNC_DATABASE_URL = os.getenv(
+    "QUEUEFLOW_ASYNC_DATABASE_URL",
+    SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+)
+
+# ========== CRÉATION DU MOTEUR ==========
+def create_async_sqlite_engine(url: str = ASYNC_DATABASE_URL, profile: str = DB_PROFILE) -> AsyncEngine:
+    """
+    Crée le moteur asynchrone selon un profil (voir database.create_sqlite_engine)
+
+    Le pool est choisi explicitement : avec sqlalchemy 2.0.36, une URL
+    fichier aiosqlite reçoit sinon un NullPool, qui refuse pool_size,
+    max_overflow et pool_timeout (TypeError dès l'import de main).
+
+    Args:
+        url: URL aiosqlite de la base
+        profile: "production" (WAL, pragmas, pool dimensionné) ou "legacy"
+
+    Returns:
+        Le moteur SQLAlchemy asynchrone
+    """
+    if profile == "legacy":
+        return create_async_engine(url)
+
+    new_engine = create_async_engine(
+        url,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+
+    # Mêmes pragmas (WAL, busy_timeout...) que le moteur synchrone
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection)
+
+    return new_engine
+
+
+async_engine = create_async_sqlite_engine()
+
+# Métriques SQL : mêmes événements, sur le moteur synchrone sous-jacent
+instrument_engine(async_engine.sync_engine)
+
+# ========== SESSION ASYNCHRONE ==========
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    # Les objets restent lisibles après commit sans nouvelle requête
+    # (un rechargement implicite est impossible hors de la session async)
+    expire_on_commit=False,
+)
+
+
+# ========== FONCTION POUR OBTENIR UNE SESSION ==========
+async def get_async_db():
+    """
+    Crée une session asynchrone pour une requête FastAPI
+
+    Même principe que database.get_db : la session est fermée quand la
+    requête est terminée.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,69 @@
+"""
+fast_json.py - Sérialisation Rapide des Routes de Lecture
+=========================================================
+Par défaut, FastAPI revalide chaque réponse contre `response_model`
+puis l'encode avec jsonable_encoder + json.dumps. Pour les routes de
+lecture les plus appelées (files, stats d'un ticket, institutions,
+historique), les données viennent déjà de schémas construits par l'API
+ou du cache des institutions : cette seconde validation ne sert à rien.
+
+Avec QUEUEFLOW_FAST_JSON=1, ces routes renvoient directement les octets
+JSON :
+
+- schémas Pydantic   -> pydantic_core.to_json (sérialiseur Rust du
+                        modèle, sans validation)
+- données simples    -> orjson (dataclasses du cache, dict...), ou
+                        pydantic_core.to_json si orjson n'est pas installé
+
+`response_model` reste déclaré sur les routes pour la documentation
+OpenAPI. Voir benchmarks/json_responses.py pour le gain mesuré : sur
+l'encodage seul, de 2x (/queue) à 24x (/institutions) selon la route,
+soit 5 à 85 µs par réponse. Une route n'utilise respond() que si ce
+benchmark la donne gagnante.
+"""
+
+import os
+from typing import Optional
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+try:
+    import orjson
+except ImportError:  # dépendance facultative
+    orjson = None
+
+# Mode rapide (désactivé par défaut)
+FAST_JSON = os.getenv("QUEUEFLOW_FAST_JSON", "0") == "1"
+
+
+def _is_model(value) -> bool:
+    if isinstance(value, (list, tuple)):
+        return bool(value) and isinstance(value[0], BaseModel)
+    return isinstance(value, BaseModel)
+
+
+def dumps(value) -> bytes:
+    """Encode une réponse en JSON, sans validation"""
+    if orjson is None or _is_model(value):
+        return to_json(value)
+    return orjson.dumps(value)
+
+
+def respond(value, headers: Optional[dict] = None):
+    """
+    Réponse d'une route de lecture
+
+    Args:
+        value: Schéma, liste de schémas ou données du cache (déjà sûres)
+        headers: En-têtes de la réponse rapide (ceux du chemin habituel
+            sont posés par la route sur la Response injectée)
+
+    Returns:
+        `value` tel quel (chemin FastAPI habituel), ou une Response JSON
+        déjà encodée en mode rapide
+    """
+    if not FAST_JSON:
+        return value
+    return Response(dumps(value), media_type="application/json", headers=headers)
@@ -0,0 +1,133 @@
+"""
+institution_cache.py - Cache des Institutions
+=============================================
+Les institutions ne changent presque jamais, mais elles sont lues à
+chaque création de ticket, à chaque /queue/{id} et à chaque liste
+d'institutions. Ce cache garde en mémoire une copie légère (détachée de
+toute session) de chaque institution, indexée par id et par type, ainsi
+que la lettre de préfixe de ses tickets.
+
+- chargé au démarrage (warm) puis à la demande (lecture traversante)
+- vidé par crud.create_institution et par toute future modification
+  (appeler institution_cache.invalidate())
+"""
+
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+import models
+
+# Lettre du numéro de ticket selon le type d'institution
+TICKET_LETTERS = {
+    models.InstitutionType.HOSPITAL: "H",
+    models.InstitutionType.MAIRIE: "M",
+    models.InstitutionType.BANQUE: "B",
+    models.InstitutionType.TRANSPORT: "T"
+}
+
+
+@dataclass(frozen=True)
+class CachedInstitution:
+    """Copie en lecture seule d'une ligne de la table institutions"""
+    id: int
+    name: str
+    type: models.InstitutionType
+    location: str
+    address: Optional[str]
+    phone: Optional[str]
+    created_at: datetime
+
+    @property
+    def ticket_letter(self) -> str:
+        return TICKET_LETTERS.get(self.type, "A")
+
+    @classmethod
+    def from_model(cls, institution: models.Institution) -> "CachedInstitution":
+        return cls(
+            id=institution.id,
+            name=institution.name,
+            type=institution.type,
+            location=institution.location,
+            address=institution.address,
+            phone=institution.phone,
+            created_at=institution.created_at
+        )
+
+
+class InstitutionCache:
+    """Institutions en mémoire, par id et par type"""
+
+    def __init__(self):
+        self._by_id: Dict[int, CachedInstitution] = {}
+        self._by_type: Dict[models.InstitutionType, List[CachedInstitution]] = {}
+        self._ordered: List[CachedInstitution] = []
+        self._ids: List[int] = []
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def warm(self, db: Session) -> None:
+        """Charge toutes les institutions (une requête)"""
+        institutions = [
+            CachedInstitution.from_model(institution)
+            for institution in db.query(models.Institution).order_by(models.Institution.id)
+        ]
+        by_type: Dict[models.InstitutionType, List[CachedInstitution]] = {}
+        for institution in institutions:
+            by_type.setdefault(institution.type, []).append(institution)
+
+        with self._lock:
+            self._by_id = {institution.id: institution for institution in institutions}
+            self._by_type = by_type
+            self._ordered = institutions
+            self._ids = [institution.id for institution in institutions]
+            self._loaded = True
+
+    def invalidate(self) -> None:
+        """Vide le cache ; il sera rechargé à la prochaine lecture"""
+        with self._lock:
+            self._loaded = False
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.warm(db)
+
+    def get(self, db: Session, institution_id: int) -> Optional[CachedInstitution]:
+        """Institution par id, ou None si elle n'existe pas"""
+        self._ensure_loaded(db)
+        return self._by_id.get(institution_id)
+
+    def get_many(self, db: Session, institution_ids) -> Dict[int, CachedInstitution]:
+        """Institutions existantes parmi une liste d'ids"""
+        self._ensure_loaded(db)
+        by_id = self._by_id
+        return {i: by_id[i] for i in institution_ids if i in by_id}
+
+    def by_type(self, db: Session, institution_type: models.InstitutionType) -> List[CachedInstitution]:
+        """Institutions d'un type"""
+        self._ensure_loaded(db)
+        return list(self._by_type.get(institution_type, ()))
+
+    def list(self, db: Session, skip: int = 0, limit: int = 100) -> List[CachedInstitution]:
+        """Institutions triées par id (pagination skip/limit)"""
+        self._ensure_loaded(db)
+        return self._ordered[skip:skip + limit]
+
+    def after(self, db: Session, after_id: Optional[int], limit: int = 100) -> List[CachedInstitution]:
+        """Institutions d'id strictement supérieur à `after_id` (pagination par curseur)"""
+        self._ensure_loaded(db)
+        with self._lock:
+            ordered, ids = self._ordered, self._ids
+        start = bisect_right(ids, after_id) if after_id is not None else 0
+        return ordered[start:start + limit]
+
+    def count(self, db: Session) -> int:
+        self._ensure_loaded(db)
+        return len(self._ordered)
+
+
+institution_cache = InstitutionCache()
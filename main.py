@@ -4,16 +4,33 @@ main.py - API FastAPI ÉTENDUE
 Version complète avec authentification et gestion multi-rôles
 """
 
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+import json
+
+from fastapi import FastAPI, Depends, HTTPException, Query, status, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from typing import List, Optional
 
 import models
 import schemas
 import crud
 import crud_users
+import crud_async
+import fast_json
+import metrics
+import migrations
+import pagination
+import query_audit
 from database import engine, get_db
+from database_async import get_async_db, async_engine, AsyncSessionLocal
+from institution_cache import institution_cache
+from queue_engine import waiting_queues, queue_writer, acquire_process_lock, ProcessLockError
+from wait_model import wait_model_refresher
+from archive import archive_scheduler
+from queue_events import hub, institution_topic, ticket_topic
 
 # ========================================
 # CRÉATION DE L'APPLICATION FASTAPI
@@ -35,13 +52,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER],
 )
 
+# Compteurs et durées des requêtes par route (GET /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+# Requêtes SQL répétées dans une même requête HTTP (N+1)
+app.add_middleware(query_audit.QueryAuditMiddleware)
+
 # ========================================
-# CRÉATION DES TABLES
+# CRÉATION DES TABLES ET INDEX
 # ========================================
 
-models.Base.metadata.create_all(bind=engine)
+migrations.upgrade(engine)
 
 
 # ========================================
@@ -51,6 +74,14 @@ models.Base.metadata.create_all(bind=engine)
 @app.on_event("startup")
 def startup_event():
     """Initialise la BD avec des données de test"""
+    # Files en mémoire : un seul processus par base (voir queue_engine.py)
+    if engine.url.database not in (None, "", ":memory:"):
+        try:
+            acquire_process_lock(engine.url.database)
+        except ProcessLockError as e:
+            print(f"❌ {e}")
+            raise
+
     db = next(get_db())
 
     existing_institutions = crud.get_institutions(db, limit=1)
@@ -115,13 +146,41 @@ def startup_event():
     else:
         print("✅ Base de données déjà initialisée")
 
+    # Charger les institutions et les files d'attente en mémoire
+    institution_cache.warm(db)
+    waiting_queues.rebuild(db)
+    # Compteurs du jour recalculés (tickets émis par une version précédente)
+    crud_users.reconcile_daily_counters(db)
+    queue_writer.start()
+    # Modèle d'attente historique, ajusté en arrière-plan
+    wait_model_refresher.start()
+    # Archivage des tickets terminés des jours précédents (puis chaque nuit)
+    archive_scheduler.start()
+    db.close()
+    print("✅ Files d'attente chargées en mémoire")
+
+
+@app.on_event("startup")
+async def bind_event_hub():
+    """Les abonnements temps réel sont servis par la boucle du serveur"""
+    hub.bind(asyncio.get_running_loop())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Écrit les dernières mises à jour des files d'attente"""
+    archive_scheduler.stop()
+    wait_model_refresher.stop()
+    queue_writer.stop()
+    await async_engine.dispose()
+
 
 # ========================================
 # ROUTE RACINE
 # ========================================
 
 @app.get("/", tags=["Root"])
-def root():
+async def root():
     return {
         "message": "Bienvenue sur QueueFlow API Extended",
         "version": "2.0.0",
@@ -135,14 +194,14 @@ def root():
 # ========================================
 
 @app.post("/auth/signup", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED, tags=["Auth"])
-def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def signup(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Créer un nouveau compte utilisateur
 
     Par défaut, le rôle est "citizen"
     """
     try:
-        db_user = crud_users.create_user(db, user)
+        db_user = await crud_async.create_user(db, user)
         return db_user
     except ValueError as e:
         raise HTTPException(
@@ -152,13 +211,13 @@ def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
 
 @app.post("/auth/login", response_model=schemas.UserWithToken, tags=["Auth"])
-def login(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
     """
     Se connecter avec email et mot de passe
 
     Retourne les informations utilisateur
     """
-    user = crud_users.authenticate_user(db, credentials.email, credentials.password)
+    user = await crud_async.authenticate_user(db, credentials.email, credentials.password)
 
     if not user:
         raise HTTPException(
@@ -173,13 +232,13 @@ def login(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
 
 
 @app.get("/auth/me", response_model=schemas.UserResponse, tags=["Auth"])
-def get_current_user(user_id: int, db: Session = Depends(get_db)):
+async def get_current_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Récupère les informations de l'utilisateur connecté
 
     En production, user_id serait extrait du token JWT
     """
-    user = crud_users.get_user_by_id(db, user_id)
+    user = await crud_async.get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -193,29 +252,54 @@ def get_current_user(user_id: int, db: Session = Depends(get_db)):
 # ========================================
 
 @app.get("/institutions", response_model=List[schemas.InstitutionResponse], tags=["Institutions"])
-def list_institutions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Liste toutes les institutions"""
-    institutions = crud.get_institutions(db, skip=skip, limit=limit)
-    return institutions
+async def list_institutions(
+    response: Response,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    skip: Optional[int] = Query(None, ge=0, deprecated=True),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Liste les institutions, par page (curseur suivant dans X-Next-Cursor)
+
+    `skip` (pagination par décalage) reste accepté le temps que les
+    clients passent au curseur ; la réponse porte alors `Deprecation: true`.
+    """
+    if skip is not None:
+        if cursor is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="skip et cursor ne peuvent pas être combinés : utiliser cursor"
+            )
+        institutions = await crud_async.get_institutions(db, skip=skip, limit=limit)
+        headers = {"Deprecation": "true"}
+        response.headers.update(headers)
+        return fast_json.respond(institutions, headers=headers)
+
+    try:
+        page = await crud_async.get_institutions_page(db, cursor=cursor, limit=limit)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return fast_json.respond(page.items, headers=pagination.next_cursor_headers(response, page))
 
 
 @app.get("/institutions/type/{institution_type}", response_model=List[schemas.InstitutionResponse], tags=["Institutions"])
-def list_institutions_by_type(institution_type: models.InstitutionType, db: Session = Depends(get_db)):
+async def list_institutions_by_type(institution_type: models.InstitutionType, db: AsyncSession = Depends(get_async_db)):
     """Liste les institutions par type"""
-    institutions = crud.get_institutions_by_type(db, institution_type)
-    return institutions
+    institutions = await crud_async.get_institutions_by_type(db, institution_type)
+    return fast_json.respond(institutions)
 
 
 @app.get("/institutions/{institution_id}", response_model=schemas.InstitutionResponse, tags=["Institutions"])
-def get_institution(institution_id: int, db: Session = Depends(get_db)):
+async def get_institution(institution_id: int, db: AsyncSession = Depends(get_async_db)):
     """Récupère une institution par ID"""
-    institution = crud.get_institution_by_id(db, institution_id)
+    institution = await crud_async.get_institution_by_id(db, institution_id)
     if institution is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Institution {institution_id} non trouvée"
         )
-    return institution
+    return fast_json.respond(institution)
 
 
 # ========================================
@@ -223,16 +307,40 @@ def get_institution(institution_id: int, db: Session = Depends(get_db)):
 # ========================================
 
 @app.post("/tickets", response_model=schemas.TicketStats, status_code=status.HTTP_201_CREATED, tags=["Tickets"])
-def create_new_ticket(ticket: schemas.TicketCreate, db: Session = Depends(get_db)):
+async def create_new_ticket(ticket: schemas.TicketCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Créer un nouveau ticket
 
     Si user_id est fourni, le ticket est lié à l'utilisateur
     """
     try:
-        db_ticket = crud.create_ticket(db, ticket)
-        ticket_stats = crud.get_ticket_stats(db, db_ticket.ticket_number)
-        return ticket_stats
+        return await crud_async.issue_ticket(db, ticket)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+# Nombre maximum de tickets par lot
+MAX_BATCH_SIZE = 100
+
+
+@app.post("/tickets/batch", response_model=List[schemas.TicketStats], status_code=status.HTTP_201_CREATED, tags=["Tickets"])
+async def create_ticket_batch(tickets: List[schemas.TicketCreate], db: AsyncSession = Depends(get_async_db)):
+    """
+    Créer plusieurs tickets en une fois (famille, lot d'une borne)
+
+    Les numéros de chaque institution sont contigus ; si une institution
+    est invalide, aucun ticket n'est créé
+    """
+    if len(tickets) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Un lot contient au maximum {MAX_BATCH_SIZE} tickets"
+        )
+    try:
+        return await crud_async.issue_tickets(db, tickets)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -241,34 +349,43 @@ def create_new_ticket(ticket: schemas.TicketCreate, db: Session = Depends(get_db
 
 
 @app.get("/tickets/{ticket_number}", response_model=schemas.TicketResponse, tags=["Tickets"])
-def get_ticket_info(ticket_number: str, db: Session = Depends(get_db)):
-    """Récupère les informations complètes d'un ticket"""
-    ticket = crud.get_ticket_by_number(db, ticket_number)
+async def get_ticket_info(ticket_number: str, db: AsyncSession = Depends(get_async_db)):
+    """Récupère les informations complètes d'un ticket (numéro affiché H01-1018-007 ou identifiant)"""
+    ticket = await crud_async.get_ticket_by_number(db, ticket_number)
     if not ticket:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Ticket {ticket_number} non trouvé"
         )
-    return ticket
+    return fast_json.respond(ticket)
 
 
 @app.get("/tickets/{ticket_number}/stats", response_model=schemas.TicketStats, tags=["Tickets"])
-def get_ticket_statistics(ticket_number: str, db: Session = Depends(get_db)):
+async def get_ticket_statistics(ticket_number: str, db: AsyncSession = Depends(get_async_db)):
     """Récupère les statistiques d'un ticket"""
-    ticket_stats = crud.get_ticket_stats(db, ticket_number)
+    ticket_stats = await crud_async.get_ticket_stats(db, ticket_number)
     if not ticket_stats:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Ticket {ticket_number} non trouvé"
         )
-    return ticket_stats
+    return fast_json.respond(ticket_stats)
 
 
 @app.get("/users/{user_id}/tickets", response_model=List[schemas.TicketResponse], tags=["Tickets"])
-def get_user_tickets(user_id: int, db: Session = Depends(get_db)):
-    """Récupère l'historique des tickets d'un utilisateur"""
-    tickets = crud_users.get_user_ticket_history(db, user_id)
-    return tickets
+async def get_user_tickets(
+    user_id: int,
+    response: Response,
+    limit: int = Query(10, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Récupère l'historique des tickets d'un utilisateur, du plus récent au plus ancien, par page"""
+    try:
+        page = await crud_async.get_user_ticket_history(db, user_id, limit=limit, cursor=cursor)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return fast_json.respond(page.items, headers=pagination.next_cursor_headers(response, page))
 
 
 # ========================================
@@ -276,13 +393,13 @@ def get_user_tickets(user_id: int, db: Session = Depends(get_db)):
 # ========================================
 
 @app.post("/operator/next-ticket", response_model=schemas.NextTicketResponse, tags=["Operator"])
-def call_next_ticket_route(institution_id: int, operator_id: int, db: Session = Depends(get_db)):
+async def call_next_ticket_route(institution_id: int, operator_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Appelle le prochain ticket en attente
 
     Utilisé par les opérateurs pour appeler les patients/clients
     """
-    ticket = crud_users.call_next_ticket(db, institution_id, operator_id)
+    ticket = await crud_async.call_next_ticket(db, institution_id, operator_id)
 
     if not ticket:
         return {
@@ -297,9 +414,9 @@ def call_next_ticket_route(institution_id: int, operator_id: int, db: Session =
 
 
 @app.put("/operator/complete-ticket/{ticket_number}", response_model=schemas.TicketResponse, tags=["Operator"])
-def complete_ticket_route(ticket_number: str, operator_id: int, db: Session = Depends(get_db)):
+async def complete_ticket_route(ticket_number: str, operator_id: int, db: AsyncSession = Depends(get_async_db)):
     """Marque un ticket comme complété"""
-    ticket = crud_users.complete_ticket(db, ticket_number, operator_id)
+    ticket = await crud_async.complete_ticket(db, ticket_number, operator_id)
 
     if not ticket:
         raise HTTPException(
@@ -311,9 +428,9 @@ def complete_ticket_route(ticket_number: str, operator_id: int, db: Session = De
 
 
 @app.put("/operator/miss-ticket/{ticket_number}", response_model=schemas.TicketResponse, tags=["Operator"])
-def miss_ticket_route(ticket_number: str, db: Session = Depends(get_db)):
+async def miss_ticket_route(ticket_number: str, db: AsyncSession = Depends(get_async_db)):
     """Marque un ticket comme manqué"""
-    ticket = crud_users.mark_ticket_missed(db, ticket_number)
+    ticket = await crud_async.mark_ticket_missed(db, ticket_number)
 
     if not ticket:
         raise HTTPException(
@@ -325,22 +442,22 @@ def miss_ticket_route(ticket_number: str, db: Session = Depends(get_db)):
 
 
 @app.get("/operator/{operator_id}/stats", response_model=schemas.OperatorStats, tags=["Operator"])
-def get_operator_statistics(operator_id: int, db: Session = Depends(get_db)):
+async def get_operator_statistics(operator_id: int, db: AsyncSession = Depends(get_async_db)):
     """Récupère les statistiques d'un opérateur"""
-    operator = crud_users.get_user_by_id(db, operator_id)
+    operator = await crud_async.get_user_by_id(db, operator_id)
     if not operator:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Opérateur non trouvé"
         )
 
-    stats = crud_users.get_operator_stats(db, operator_id)
+    stats = await crud_async.get_operator_stats(db, operator_id)
 
     return {
         "user_id": operator_id,
         "name": operator.name,
         "tickets_served_today": stats["tickets_served_today"],
-        "average_service_time": 3,
+        "average_service_time": stats["average_service_time"],
         "current_ticket": stats["current_ticket"]
     }
 
@@ -350,24 +467,50 @@ def get_operator_statistics(operator_id: int, db: Session = Depends(get_db)):
 # ========================================
 
 @app.get("/admin/stats", response_model=schemas.AdminStats, tags=["Admin"])
-def get_admin_statistics(db: Session = Depends(get_db)):
+async def get_admin_statistics(db: AsyncSession = Depends(get_async_db)):
     """Récupère les statistiques globales du système"""
-    stats = crud_users.get_admin_stats(db)
+    stats = await crud_async.get_admin_stats(db)
     return stats
 
 
+@app.post("/admin/stats/reconcile", response_model=schemas.DailyCountersResponse, tags=["Admin"])
+async def reconcile_admin_statistics(day: Optional[date] = None, db: AsyncSession = Depends(get_async_db)):
+    """Recalcule les compteurs d'un jour (aujourd'hui par défaut) depuis les tickets"""
+    counters = await crud_async.reconcile_daily_counters(db, day)
+    return counters
+
+
 @app.get("/admin/operators", response_model=List[schemas.UserResponse], tags=["Admin"])
-def list_operators(db: Session = Depends(get_db)):
-    """Liste tous les opérateurs"""
-    operators = crud_users.get_all_operators(db)
-    return operators
+async def list_operators(
+    response: Response,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Liste les opérateurs, par page"""
+    try:
+        page = await crud_async.get_all_operators(db, cursor=cursor, limit=limit)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    pagination.next_cursor_headers(response, page)
+    return page.items
 
 
 @app.get("/admin/institutions/{institution_id}/operators", response_model=List[schemas.UserResponse], tags=["Admin"])
-def list_institution_operators(institution_id: int, db: Session = Depends(get_db)):
-    """Liste les opérateurs d'une institution"""
-    operators = crud_users.get_operators_by_institution(db, institution_id)
-    return operators
+async def list_institution_operators(
+    institution_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Liste les opérateurs d'une institution, par page"""
+    try:
+        page = await crud_async.get_operators_by_institution(db, institution_id, cursor=cursor, limit=limit)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    pagination.next_cursor_headers(response, page)
+    return page.items
 
 
 # ========================================
@@ -375,29 +518,29 @@ def list_institution_operators(institution_id: int, db: Session = Depends(get_db
 # ========================================
 
 @app.get("/queue/{institution_id}", response_model=schemas.QueueInfo, tags=["Queues"])
-def get_institution_queue_info(institution_id: int, db: Session = Depends(get_db)):
+async def get_institution_queue_info(institution_id: int, db: AsyncSession = Depends(get_async_db)):
     """Récupère les informations de la file d'attente"""
-    institution = crud.get_institution_by_id(db, institution_id)
+    institution = await crud_async.get_institution_by_id(db, institution_id)
     if not institution:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Institution {institution_id} non trouvée"
         )
 
-    queue_info = crud.get_queue_info(db, institution_id)
-    if not queue_info:
+    queue_info = await crud_async.get_queue_info(db, institution_id)
+    if queue_info is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"File d'attente non trouvée"
         )
 
-    return queue_info
+    return fast_json.respond(queue_info)
 
 
 @app.get("/queue/details/{institution_id}", response_model=schemas.QueueResponse, tags=["Queues"])
-def get_queue_details(institution_id: int, db: Session = Depends(get_db)):
+async def get_queue_details(institution_id: int, db: AsyncSession = Depends(get_async_db)):
     """Récupère les détails complets de la queue"""
-    queue = crud.get_queue_by_institution(db, institution_id)
+    queue = await crud_async.get_queue_by_institution(db, institution_id)
     if not queue:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -406,12 +549,154 @@ def get_queue_details(institution_id: int, db: Session = Depends(get_db)):
     return queue
 
 
+# ========================================
+# ROUTES TEMPS RÉEL (WebSocket / SSE)
+# ========================================
+# Chaque abonné reçoit d'abord l'état actuel ("snapshot"), puis un
+# message à chaque changement de la file (voir queue_events.py).
+
+# Intervalle des commentaires keep-alive SSE (secondes)
+SSE_KEEPALIVE = 15
+
+
+async def queue_snapshot(institution_id: int):
+    """Premier message d'un abonné à une file, ou None si inconnue"""
+    async with AsyncSessionLocal() as db:
+        queue_info = await crud_async.get_queue_info(db, institution_id)
+    if queue_info is None:
+        return None
+    return {"event": "snapshot", "ticket_number": None, "queue": queue_info.model_dump()}
+
+
+async def ticket_snapshot(ticket_number: str):
+    """
+    Premier message d'un abonné à un ticket, ou None si inconnu
+
+    ticket_number peut être le numéro affiché ou l'identifiant : les
+    abonnements se font toujours sur le numéro affiché (voir queue_events).
+
+    Returns:
+        (numéro affiché, message), ou None
+    """
+    async with AsyncSessionLocal() as db:
+        if waiting_queues.find(ticket_number) is None:
+            ticket = await crud_async.get_ticket_by_number(db, ticket_number)
+            if ticket is None:
+                return None
+            if ticket.status != models.TicketStatus.WAITING:
+                return ticket.ticket_number, {"event": "snapshot", "status": ticket.status.value, "stats": None}
+            ticket_number = ticket.ticket_number
+        stats = await crud_async.get_ticket_stats(db, ticket_number)
+    if stats is None:
+        return None
+    return ticket_number, {"event": "snapshot", "status": "waiting", "stats": stats.model_dump()}
+
+
+async def stream_websocket(websocket: WebSocket, topic: str, snapshot: dict):
+    """Transmet les messages d'un topic jusqu'à la déconnexion du client"""
+    inbox = hub.subscribe(topic)
+
+    async def forward():
+        while True:
+            await websocket.send_json(await inbox.get())
+
+    sender = asyncio.create_task(forward())
+    try:
+        await websocket.send_json(snapshot)
+        while True:
+            # Les messages du client sont ignorés ; receive_text() sert à
+            # détecter la déconnexion
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        hub.unsubscribe(topic, inbox)
+
+
+async def stream_sse(request: Request, topic: str, snapshot: dict):
+    """Générateur Server-Sent Events pour un topic"""
+    inbox = hub.subscribe(topic)
+    try:
+        yield f"data: {json.dumps(snapshot)}\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(inbox.get(), timeout=SSE_KEEPALIVE)
+                yield f"data: {json.dumps(message)}\n\n"
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+    finally:
+        hub.unsubscribe(topic, inbox)
+
+
+@app.websocket("/ws/queue/{institution_id}")
+async def queue_websocket(websocket: WebSocket, institution_id: int):
+    """Mises à jour en direct de la file d'une institution"""
+    await websocket.accept()
+    snapshot = await queue_snapshot(institution_id)
+    if snapshot is None:
+        await websocket.close(code=4404, reason=f"File d'attente {institution_id} non trouvée")
+        return
+    await stream_websocket(websocket, institution_topic(institution_id), snapshot)
+
+
+@app.websocket("/ws/tickets/{ticket_number}")
+async def ticket_websocket(websocket: WebSocket, ticket_number: str):
+    """Mises à jour en direct de la position d'un ticket (numéro affiché ou identifiant)"""
+    await websocket.accept()
+    resolved = await ticket_snapshot(ticket_number)
+    if resolved is None:
+        await websocket.close(code=4404, reason=f"Ticket {ticket_number} non trouvé")
+        return
+    code, snapshot = resolved
+    await stream_websocket(websocket, ticket_topic(code), snapshot)
+
+
+@app.get("/queue/{institution_id}/events", tags=["Queues"])
+async def queue_events_stream(institution_id: int, request: Request):
+    """Mises à jour de la file d'une institution (Server-Sent Events)"""
+    snapshot = await queue_snapshot(institution_id)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File d'attente non trouvée"
+        )
+    return StreamingResponse(
+        stream_sse(request, institution_topic(institution_id), snapshot),
+        media_type="text/event-stream"
+    )
+
+
+@app.get("/tickets/{ticket_number}/events", tags=["Tickets"])
+async def ticket_events_stream(ticket_number: str, request: Request):
+    """Mises à jour de la position d'un ticket (Server-Sent Events)"""
+    resolved = await ticket_snapshot(ticket_number)
+    if resolved is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Ticket {ticket_number} non trouvé"
+        )
+    code, snapshot = resolved
+    return StreamingResponse(
+        stream_sse(request, ticket_topic(code), snapshot),
+        media_type="text/event-stream"
+    )
+
+
 # ========================================
 # HEALTH & STATS
 # ========================================
 
+@app.get("/metrics", tags=["Health"])
+async def metrics_endpoint(db: AsyncSession = Depends(get_async_db)):
+    """Métriques de l'API au format texte Prometheus (voir metrics.py)"""
+    return Response(await crud_async.render_metrics(db), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/health", tags=["Health"])
-def health_check():
+async def health_check():
     """Vérifie que l'API fonctionne"""
     return {
         "status": "healthy",
@@ -0,0 +1,309 @@
+"""
+metrics.py - Métriques de l'API (format texte Prometheus)
+=========================================================
+Exposées par GET /metrics, sans dépendance externe :
+
+- requêtes HTTP par route : compteur, histogramme des durées, requêtes
+  en cours (MetricsMiddleware, ajouté dans main.py)
+- requêtes SQL par type d'instruction : compteur, histogramme des
+  durées, erreurs (événements du moteur, branchés dans database.py et
+  database_async.py)
+- état des files : tickets en attente, attente estimée, temps de service
+  (moteur en mémoire) et tickets du jour (table daily_counters), relus à
+  chaque collecte sans aucun COUNT
+
+Les routes sont étiquetées par leur gabarit (/tickets/{ticket_number}),
+jamais par le chemin réel : le nombre de séries reste borné.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.routing import Match
+
+# Limites (secondes) des histogrammes
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# Route des requêtes qui ne correspondent à aucune route déclarée
+UNMATCHED_ROUTE = "<unmatched>"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ========================================
+# TYPES DE MÉTRIQUES
+# ========================================
+
+class Metric:
+    """Famille de séries, une par combinaison de valeurs d'étiquettes"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def replace(self, values: Dict[tuple, float]) -> None:
+        """Remplace toutes les séries (institutions supprimées comprises)"""
+        with self._lock:
+            self._values = dict(values)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets=HTTP_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # étiquettes -> [comptes par intervalle (+Inf en dernier), somme]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = []
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Ensemble des métriques exposées par /metrics"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "queueflow_http_requests_total", "Requêtes HTTP traitées", ("method", "route", "status")
+))
+http_duration = registry.register(Histogram(
+    "queueflow_http_request_duration_seconds", "Durée des requêtes HTTP", ("method", "route"), HTTP_BUCKETS
+))
+http_in_flight = registry.register(Gauge(
+    "queueflow_http_requests_in_flight", "Requêtes HTTP en cours", ("method", "route")
+))
+
+db_queries = registry.register(Counter(
+    "queueflow_db_queries_total", "Instructions SQL exécutées", ("operation",)
+))
+db_duration = registry.register(Histogram(
+    "queueflow_db_query_duration_seconds", "Durée des instructions SQL", ("operation",), DB_BUCKETS
+))
+db_errors = registry.register(Counter(
+    "queueflow_db_errors_total", "Instructions SQL en erreur", ("operation",)
+))
+
+queue_waiting = registry.register(Gauge(
+    "queueflow_queue_waiting_tickets", "Tickets en attente", ("institution_id",)
+))
+queue_estimated_wait = registry.register(Gauge(
+    "queueflow_queue_estimated_wait_minutes", "Attente estimée du dernier arrivé", ("institution_id",)
+))
+queue_service_time = registry.register(Gauge(
+    "queueflow_queue_average_service_minutes", "Temps de service moyen estimé", ("institution_id",)
+))
+tickets_today = registry.register(Gauge(
+    "queueflow_tickets_today", "Tickets du jour par issue (created, completed, missed)", ("institution_id", "kind")
+))
+
+
+# ========================================
+# HTTP
+# ========================================
+
+def route_template(scope: dict) -> str:
+    """Gabarit de la route qui traitera la requête"""
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : compteur, durée et requêtes en cours par route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        labels = (method, route_template(scope))
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_flight.inc(labels)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_duration.observe(labels, time.perf_counter() - started)
+            http_in_flight.dec(labels)
+            http_requests.inc((*labels, str(status_code)))
+
+
+# ========================================
+# SQL
+# ========================================
+
+def statement_operation(statement: str) -> str:
+    """Premier mot-clé de l'instruction : SELECT, INSERT, UPDATE..."""
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA") else "OTHER"
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["metrics_started"].pop()
+    operation = statement_operation(statement)
+    db_queries.inc((operation,))
+    db_duration.observe((operation,), time.perf_counter() - started)
+
+
+def handle_error(exception_context) -> None:
+    started = exception_context.connection.info.get("metrics_started") if exception_context.connection else None
+    if started:
+        started.pop()
+    db_errors.inc((statement_operation(exception_context.statement or ""),))
+
+
+# ========================================
+# FILES D'ATTENTE (collectées à chaque lecture de /metrics)
+# ========================================
+
+def collect_queues(db: Session) -> None:
+    """
+    Met à jour les jauges des files
+
+    Tickets en attente, attente estimée et temps de service viennent du
+    moteur en mémoire ; les tickets du jour de la table daily_counters
+    (une lecture de quelques lignes par clé primaire).
+    """
+    # Imports différés : database.py importe ce module
+    import models
+    from queue_engine import waiting_queues
+
+    waiting, estimated, service = {}, {}, {}
+    for queue in waiting_queues.all():
+        labels = (str(queue.institution_id),)
+        people = len(queue)
+        waiting[labels] = people
+        estimated[labels] = queue.estimate_wait(people)
+        service[labels] = queue.average_service_time
+    queue_waiting.replace(waiting)
+    queue_estimated_wait.replace(estimated)
+    queue_service_time.replace(service)
+
+    today = {}
+    rows = db.query(models.DailyCounter).filter(
+        models.DailyCounter.service_day == datetime.utcnow().date()
+    )
+    for row in rows:
+        institution = str(row.institution_id)
+        today[(institution, "created")] = row.tickets_created
+        today[(institution, "completed")] = row.tickets_completed
+        today[(institution, "missed")] = row.tickets_missed
+    tickets_today.replace(today)
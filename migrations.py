@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+migrations.py - Mise à Jour du Schéma d'une Base Existante
+==========================================================
+Base.metadata.create_all() crée les tables manquantes, mais ne touche
+pas aux tables qui existent déjà : les nouveaux index et colonnes
+déclarés dans models.py ne sont donc pas ajoutés à un queueflow.db
+existant.
+
+Ce script applique ces changements. Il est idempotent et appelé au
+démarrage de l'API ; il peut aussi être lancé à la main :
+
+    python migrations.py
+"""
+
+from sqlalchemy.engine import Connection, Engine
+
+import models  # noqa: F401 (enregistre les modèles sur Base.metadata)
+from database import engine, Base
+
+
+def create_missing_indexes(bind: Engine) -> list:
+    """
+    Crée les index déclarés sur les modèles qui n'existent pas encore
+
+    Returns:
+        Noms des index créés
+    """
+    created = []
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {
+                row[0] for row in connection.exec_driver_sql(
+                    "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?",
+                    (table.name,)
+                )
+            }
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=connection)
+                    created.append(index.name)
+        if created:
+            # Mettre à jour les statistiques pour le planificateur de requêtes
+            connection.exec_driver_sql("ANALYZE")
+    return created
+
+
+# Index retirés de models.py : plus aucune requête ne les utilise, ils ne
+# coûtaient plus que des écritures (émission, appel d'un ticket)
+OBSOLETE_INDEXES = (
+    "ix_tickets_institution_status_position",  # files lues en mémoire (queue_engine.py)
+    "ix_tickets_waiting",
+)
+
+
+def drop_obsolete_indexes(bind: Engine) -> list:
+    """
+    Supprime les index de OBSOLETE_INDEXES encore présents
+
+    Returns:
+        Noms des index supprimés
+    """
+    dropped = []
+    with bind.begin() as connection:
+        for name in OBSOLETE_INDEXES:
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+            ).first()
+            if exists:
+                connection.exec_driver_sql(f"DROP INDEX {name}")
+                dropped.append(f"- {name}")
+    return dropped
+
+
+def _columns(connection: Connection, table: str) -> set:
+    return {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def _table_sql(connection: Connection, table: str) -> str:
+    return connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).scalar() or ""
+
+
+def rebuild_tickets_table(bind: Engine) -> list:
+    """
+    Recrée `tickets` selon models.Ticket
+
+    - identité (institution, jour de service, séquence) : SQLite ne sait
+      ni ajouter une colonne NOT NULL sans défaut ni retirer la contrainte
+      UNIQUE de ticket_number. La séquence des tickets existants est leur
+      rang d'émission dans le jour et l'institution.
+    - AUTOINCREMENT : sans lui, SQLite redonne les id des tickets archivés
+      (tickets_archive garde l'id d'origine, le prochain archivage échoue).
+      Le compteur repart après le plus grand id, archives comprises.
+
+    Les tickets existants gardent leur id et leur numéro affiché.
+
+    Returns:
+        Changements appliqués (vide si la table est déjà à jour)
+    """
+    with bind.begin() as connection:
+        has_identity = "service_day" in _columns(connection, "tickets")
+        has_autoincrement = "AUTOINCREMENT" in _table_sql(connection, "tickets").upper()
+        if has_identity and has_autoincrement:
+            return []
+
+        connection.exec_driver_sql("ALTER TABLE tickets RENAME TO tickets_old")
+        # Les index suivent la table renommée : libérer leurs noms
+        indexes = [
+            row[0] for row in connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tickets_old' AND sql IS NOT NULL"
+            )
+        ]
+        for name in indexes:
+            connection.exec_driver_sql(f"DROP INDEX {name}")
+
+        models.Ticket.__table__.create(bind=connection)
+        if has_identity:
+            columns = ", ".join(column.name for column in models.Ticket.__table__.columns)
+            connection.exec_driver_sql(f"INSERT INTO tickets ({columns}) SELECT {columns} FROM tickets_old")
+        else:
+            columns = [
+                "id", "ticket_number", "user_id", "institution_id", "status", "queue_position",
+                "operator_id", "created_at", "called_at", "completed_at",
+            ]
+            connection.exec_driver_sql(f"""
+                INSERT INTO tickets ({", ".join(columns)}, service_day, sequence)
+                SELECT {", ".join(columns)},
+                       CAST(strftime('%Y%m%d', created_at) AS INTEGER),
+                       ROW_NUMBER() OVER (PARTITION BY institution_id, date(created_at) ORDER BY id)
+                FROM tickets_old
+            """)
+        connection.exec_driver_sql("DROP TABLE tickets_old")
+
+        last_id = connection.exec_driver_sql(
+            "SELECT MAX(id) FROM (SELECT id FROM tickets UNION ALL SELECT id FROM tickets_archive)"
+        ).scalar() or 0
+        connection.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'tickets'")
+        connection.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('tickets', ?)", (last_id,))
+
+    changes = [] if has_identity else ["tickets (service_day, sequence)"]
+    return changes + ([] if has_autoincrement else ["tickets (AUTOINCREMENT)"])
+
+
+def add_missing_columns(bind: Engine) -> list:
+    """
+    Ajoute les colonnes facultatives (NULL permis) qui manquent
+
+    Les nouvelles colonnes sont remplies à partir des données existantes :
+    jour de service des tickets archivés, dernière séquence émise par
+    chaque queue (les numéros du jour continuent au lieu de repartir à 1).
+
+    Returns:
+        Colonnes ajoutées ("table.colonne")
+    """
+    added = []
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = _columns(connection, table.name)
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    type_ = column.type.compile(dialect=connection.dialect)
+                    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {type_}")
+                    added.append(f"{table.name}.{column.name}")
+
+        if "tickets_archive.service_day" in added:
+            connection.exec_driver_sql(
+                "UPDATE tickets_archive SET service_day = CAST(strftime('%Y%m%d', created_at) AS INTEGER)"
+            )
+        if "queues.service_day" in added:
+            connection.exec_driver_sql("""
+                UPDATE queues SET
+                    service_day = (SELECT MAX(service_day) FROM tickets WHERE tickets.institution_id = queues.institution_id),
+                    last_ticket_number = COALESCE((
+                        SELECT MAX(sequence) FROM tickets
+                        WHERE tickets.institution_id = queues.institution_id
+                          AND tickets.service_day = (SELECT MAX(service_day) FROM tickets t
+                                                     WHERE t.institution_id = queues.institution_id)
+                    ), 0)
+            """)
+    return added
+
+
+def upgrade(bind: Engine = engine) -> list:
+    """
+    Applique toutes les migrations sur la base
+
+    Returns:
+        Liste des changements appliqués
+    """
+    Base.metadata.create_all(bind=bind)
+    changes = rebuild_tickets_table(bind)
+    changes += add_missing_columns(bind)
+    changes += drop_obsolete_indexes(bind)
+    return changes + create_missing_indexes(bind)
+
+
+if __name__ == '__main__':
+    print('='*60)
+    print('🛠️  MIGRATION DE LA BASE DE DONNÉES')
+    print('='*60)
+    changes = upgrade()
+    for change in changes:
+        print(f'✅ {change}')
+    if not changes:
+        print('✅ Base déjà à jour')
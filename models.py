@@ -5,7 +5,7 @@ Version étendue avec gestion des utilisateurs et rôles
 Relations corrigées avec foreign_keys explicites
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -73,6 +73,12 @@ class User(Base):
         foreign_keys="Ticket.user_id"
     )
 
+    # Index : listes d'opérateurs (par institution ou globale)
+    __table_args__ = (
+        Index("ix_users_role_institution_active", "role", "institution_id", "is_active"),
+        Index("ix_users_role_active", "role", "is_active"),
+    )
+
 
 # ========== TABLE INSTITUTION ==========
 class Institution(Base):
@@ -98,7 +104,15 @@ class Ticket(Base):
     __tablename__ = "tickets"
 
     id = Column(Integer, primary_key=True, index=True)
-    ticket_number = Column(String, unique=True, nullable=False)
+
+    # Identité du ticket : (institution, jour de service, séquence du jour)
+    # La séquence repart à 1 chaque jour dans chaque institution
+    service_day = Column(Integer, nullable=False)  # AAAAMMJJ (UTC)
+    sequence = Column(Integer, nullable=False)
+
+    # Code affiché, dérivé de l'identité : H01-1018-007 (lettre du type,
+    # institution, jour MMJJ, séquence). Unique d'un jour à l'autre sur un an.
+    ticket_number = Column(String, nullable=False)
 
     # Lien avec l'utilisateur qui a créé le ticket
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -130,6 +144,68 @@ class Ticket(Base):
         foreign_keys=[operator_id]
     )
 
+    # Index des requêtes fréquentes (voir migrations.py pour les BD existantes)
+    __table_args__ = (
+        # Identité du ticket (clés entières) : un numéro affiché donne
+        # (institution, séquence), le jour le plus récent est pris en tête
+        Index("ux_tickets_institution_sequence_day", "institution_id", "sequence", "service_day", unique=True),
+        # Anciens numéros (H001...) émis avant l'identité par jour
+        Index("ix_tickets_number", "ticket_number"),
+        # (les files d'attente sont lues en mémoire, voir queue_engine.py :
+        # pas d'index sur (institution, statut, position))
+        # Rechargement des files au démarrage : tickets en attente par ordre d'émission
+        Index("ix_tickets_status_id", "status", "id"),
+        # Statistiques opérateur : servis aujourd'hui, ticket courant
+        Index("ix_tickets_operator_status_completed", "operator_id", "status", "completed_at"),
+        # Historique d'un utilisateur
+        Index("ix_tickets_user_created", "user_id", "created_at"),
+        # Statistiques admin
+        Index("ix_tickets_created", "created_at"),
+        Index("ix_tickets_status_created", "status", "created_at"),
+        Index("ix_tickets_status_completed", "status", "completed_at"),
+        # AUTOINCREMENT : un id archivé (tickets_archive le garde) n'est
+        # jamais redonné à un nouveau ticket
+        {"sqlite_autoincrement": True},
+    )
+
+
+# ========== TABLE TICKETS_ARCHIVE (Tickets terminés) ==========
+class TicketArchive(Base):
+    """
+    Tickets terminés (complétés, annulés, manqués) des jours précédents
+
+    Déplacés depuis `tickets` chaque jour par archive.py : la table
+    `tickets` ne contient plus que les tickets du jour et ceux encore
+    en cours, et ses requêtes ne dépendent plus de l'historique.
+    Mêmes colonnes que Ticket (l'id d'origine est conservé).
+    """
+    __tablename__ = "tickets_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    service_day = Column(Integer, nullable=True)
+    sequence = Column(Integer, nullable=True)
+    ticket_number = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    institution_id = Column(Integer, ForeignKey("institutions.id"), nullable=False)
+    status = Column(Enum(TicketStatus), nullable=False)
+    queue_position = Column(Integer, nullable=False)
+    operator_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    called_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relation en lecture seule (TicketResponse affiche l'institution)
+    institution = relationship("Institution", viewonly=True)
+
+    __table_args__ = (
+        # Historique d'un utilisateur
+        Index("ix_tickets_archive_user_created", "user_id", "created_at"),
+        # Recalcul des compteurs et modèle d'attente (fenêtre de dates)
+        Index("ix_tickets_archive_created", "created_at"),
+        Index("ix_tickets_archive_completed", "completed_at"),
+    )
+
 
 # ========== TABLE QUEUE (File d'attente) ==========
 class Queue(Base):
@@ -139,7 +215,33 @@ class Queue(Base):
     id = Column(Integer, primary_key=True, index=True)
     institution_id = Column(Integer, ForeignKey("institutions.id"), nullable=False, unique=True)
     current_ticket_number = Column(String, nullable=True)
+    # Dernière séquence émise, pour le jour service_day (AAAAMMJJ)
     last_ticket_number = Column(Integer, default=0)
+    service_day = Column(Integer, nullable=True)
     total_tickets_today = Column(Integer, default=0)
     average_service_time = Column(Integer, default=3)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ========== TABLE DAILY_COUNTERS (Compteurs du jour) ==========
+class DailyCounter(Base):
+    """
+    Compteurs de tickets par jour et par institution
+
+    Tenus à jour dans la même transaction que la création et les
+    changements de statut des tickets (voir daily_counters.py) ;
+    /admin/stats lit une seule ligne au lieu de compter les tickets.
+    """
+    __tablename__ = "daily_counters"
+
+    # Jour de service (UTC, comme created_at / completed_at)
+    service_day = Column(Date, primary_key=True)
+    # 0 = toutes institutions confondues (ligne globale)
+    institution_id = Column(Integer, primary_key=True, autoincrement=False)
+
+    # Tickets créés ce jour-là
+    tickets_created = Column(Integer, nullable=False, default=0)
+    # Tickets complétés ce jour-là (completed_at)
+    tickets_completed = Column(Integer, nullable=False, default=0)
+    # Tickets créés ce jour-là et actuellement manqués
+    tickets_missed = Column(Integer, nullable=False, default=0)
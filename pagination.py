@@ -0,0 +1,105 @@
+"""
+pagination.py - Pagination par Curseur
+======================================
+Les listes longues (institutions, historique d'un utilisateur,
+opérateurs) sont paginées par clé ("keyset") plutôt que par OFFSET :
+chaque page reprend juste après la dernière ligne de la précédente,
+via l'index qui donne l'ordre de la liste. Une page lointaine coûte
+donc autant que la première, et une ligne ajoutée entre deux pages ne
+décale pas les suivantes.
+
+Le curseur est opaque pour les clients : les valeurs de la clé de tri
+de la dernière ligne ((created_at, id) ou id), en JSON encodé en
+base64 url-safe. Les routes le renvoient dans l'en-tête X-Next-Cursor
+(absent sur la dernière page) ; le corps reste une liste.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+# En-tête HTTP portant le curseur de la page suivante
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Taille maximale d'une page
+MAX_PAGE_SIZE = 500
+
+# Entiers stockés par SQLite (INTEGER signé sur 64 bits) : au-delà, le
+# pilote lève OverflowError (erreur 500) au lieu de ne rien trouver
+MIN_SQL_INTEGER = -2 ** 63
+MAX_SQL_INTEGER = 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    """Curseur illisible (tronqué, modifié ou d'une autre liste)"""
+
+
+class Page(NamedTuple):
+    """Une page de résultats et le curseur de la suivante (None : dernière page)"""
+    items: List[Any]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(*values) -> str:
+    """
+    Curseur opaque à partir des valeurs de la clé de tri
+
+    Args:
+        values: Clé de la dernière ligne de la page (datetime ou int)
+
+    Returns:
+        Chaîne base64 url-safe, sans remplissage
+    """
+    raw = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> Tuple:
+    """
+    Valeurs de la clé de tri contenues dans un curseur
+
+    Args:
+        cursor: Curseur reçu du client
+        types: Type attendu de chaque valeur (datetime ou int)
+
+    Raises:
+        InvalidCursor: si le curseur ne correspond pas à ces types, ou
+            si un entier sort de la plage de SQLite
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        decoded = []
+        for value, expected in zip(values, types):
+            if expected is datetime:
+                decoded.append(datetime.fromisoformat(value))
+            elif isinstance(value, expected) and not isinstance(value, bool):
+                if expected is int and not MIN_SQL_INTEGER <= value <= MAX_SQL_INTEGER:
+                    raise ValueError
+                decoded.append(value)
+            else:
+                raise ValueError
+        return tuple(decoded)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor(f"Curseur de pagination invalide : {cursor}") from None
+
+
+def next_cursor_headers(response, page: Page) -> Optional[dict]:
+    """
+    Pose l'en-tête X-Next-Cursor sur la Response injectée dans une route
+
+    Returns:
+        Les en-têtes posés (None sur la dernière page), à reprendre pour
+        une Response construite directement (fast_json.respond)
+    """
+    if page.next_cursor is None:
+        return None
+    headers = {NEXT_CURSOR_HEADER: page.next_cursor}
+    response.headers.update(headers)
+    return headers
@@ -0,0 +1,156 @@
+"""
+query_audit.py - Requêtes SQL par Requête HTTP
+==============================================
+Chaque instruction SQL exécutée pendant une requête HTTP est comptée et
+réduite à sa "forme" (valeurs remplacées par ?, listes IN (...) et
+VALUES (...) repliées) :
+
+    SELECT institutions.id, ... FROM institutions WHERE institutions.id = ?
+
+Quand une même forme revient QUERY_REPEAT_THRESHOLD fois ou plus dans
+une requête, un avertissement est affiché : c'est presque toujours une
+boucle qui charge un objet à la fois (N+1, relation chargée
+paresseusement...).
+
+Le suivi passe par une ContextVar : il suit la requête dans run_sync()
+et dans le threadpool, et ignore les tâches de fond (QueueWriter...).
+
+query_budget() vérifie un nombre maximal de requêtes SQL autour d'un
+bloc de code (scripts de vérification, tests), y compris les requêtes
+HTTP traitées pendant le bloc, même par TestClient dans un autre thread :
+
+    with query_budget(4, "POST /tickets"):
+        client.post("/tickets", json={"institution_id": 1})
+"""
+
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from metrics import route_template
+
+# Répétitions d'une même forme à partir desquelles on avertit (0 = jamais)
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUEUEFLOW_QUERY_REPEAT_THRESHOLD", "5"))
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"IN \((?:\?(?:, )?)+\)", re.IGNORECASE)
+_VALUES = re.compile(r"VALUES (?:\((?:\?(?:, )?)+\)(?:, )?)+", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Forme d'une instruction : mêmes requêtes, valeurs différentes -> même forme"""
+    shape = _SPACES.sub(" ", statement).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    return _VALUES.sub("VALUES (?)", shape)
+
+
+class QueryLog:
+    """Instructions SQL exécutées pendant une requête (ou un bloc de code)"""
+
+    def __init__(self):
+        self.total = 0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str) -> None:
+        self.total += 1
+        self.shapes[fingerprint(statement)] += 1
+
+    def merge(self, other: "QueryLog") -> None:
+        self.total += other.total
+        self.shapes.update(other.shapes)
+
+    def repeated(self, threshold: int = QUERY_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """Formes exécutées au moins `threshold` fois, les plus fréquentes d'abord"""
+        if threshold <= 0:
+            return []
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def summary(self, limit: int = 5) -> str:
+        lines = [f"{self.total} requêtes SQL"]
+        lines += [f"  {count}× {shape[:200]}" for shape, count in self.shapes.most_common(limit)]
+        return "\n".join(lines)
+
+
+_current: ContextVar[Optional[QueryLog]] = ContextVar("queueflow_query_log", default=None)
+
+# Budgets actifs : reçoivent les requêtes SQL de chaque requête HTTP terminée
+_budgets: List[QueryLog] = []
+_budgets_lock = threading.Lock()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Événement du moteur (branché dans database.py)"""
+    log = _current.get()
+    if log is not None:
+        log.record(statement)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryLog]:
+    """Compte les instructions SQL exécutées dans le bloc"""
+    log = QueryLog()
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Plus de requêtes SQL que le budget fixé"""
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "") -> Iterator[QueryLog]:
+    """
+    Échoue si le bloc exécute plus de `max_queries` instructions SQL
+
+    Args:
+        max_queries: Nombre maximal d'instructions
+        label: Nom du bloc (route...) dans le message d'erreur
+
+    Raises:
+        QueryBudgetExceeded: avec les formes les plus fréquentes
+    """
+    with track_queries() as log:
+        with _budgets_lock:
+            _budgets.append(log)
+        try:
+            yield log
+        finally:
+            with _budgets_lock:
+                _budgets.remove(log)
+    if log.total > max_queries:
+        raise QueryBudgetExceeded(f"{label or 'bloc'} : budget de {max_queries} dépassé, {log.summary()}")
+
+
+class QueryAuditMiddleware:
+    """Middleware ASGI : suivi des requêtes SQL de chaque requête HTTP"""
+
+    def __init__(self, app, threshold: int = QUERY_REPEAT_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as log:
+            await self.app(scope, receive, send)
+
+        with _budgets_lock:
+            for budget in _budgets:
+                budget.merge(log)
+
+        for shape, count in log.repeated(self.threshold):
+            print(f"⚠️  {scope['method']} {route_template(scope)} : {count}× la même requête SQL "
+                  f"({log.total} au total), N+1 probable : {shape[:200]}")
@@ -0,0 +1,570 @@
+"""
+queue_engine.py - Moteur de Files d'Attente en Mémoire
+======================================================
+Ce fichier garde en mémoire, pour chaque institution, la liste ordonnée
+des tickets en attente (WAITING). Les lectures de l'état des files
+(personnes en attente, position d'un ticket, prochain ticket) ne passent
+plus par SQLite.
+
+- prochain ticket : O(1) amorti
+- rang d'un ticket : O(log n) (arbre de Fenwick)
+- longueur de la file : O(1)
+
+La base reste la source de vérité au démarrage : rebuild() recharge les
+files depuis les tables `queues` et `tickets`. Les champs dérivés de la
+table `queues` (ticket courant, temps de service estimé, date de mise à
+jour) sont ensuite écrits en arrière-plan par QueueWriter.
+
+L'état est propre au processus : deux processus sur la même base
+auraient chacun leurs files, et l'un ignorerait les tickets émis par
+l'autre. L'API sert donc chaque base depuis un seul processus (un seul
+worker uvicorn) : acquire_process_lock() refuse de démarrer un second
+processus sur la même base.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from database import SessionLocal
+from service_time import DEFAULT_SERVICE_TIME, service_times
+from wait_model import wait_model
+
+
+# ========================================
+# TICKET EN ATTENTE (copie légère)
+# ========================================
+
+@dataclass(frozen=True)
+class WaitingTicket:
+    """Ticket en attente tel que gardé en mémoire"""
+    id: int
+    ticket_number: str
+    institution_id: int
+    queue_position: int
+
+
+# ========================================
+# INDEX DE RANG (ARBRE DE FENWICK)
+# ========================================
+
+class FenwickTree:
+    """
+    Arbre de Fenwick (Binary Indexed Tree) sur des positions 1..n
+
+    Chaque position vaut 1 (ticket en attente) ou 0 (ticket sorti de la
+    file). prefix(i) compte les tickets encore en attente jusqu'à i :
+    mise à jour et requête en O(log n).
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._tree = [0] * (capacity + 1)
+
+    @property
+    def capacity(self) -> int:
+        return len(self._tree) - 1
+
+    def add(self, index: int, delta: int) -> None:
+        tree = self._tree
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        tree = self._tree
+        total = 0
+        while index > 0:
+            total += tree[index]
+            index -= index & -index
+        return total
+
+    @classmethod
+    def from_flags(cls, flags: List[int], capacity: int) -> "FenwickTree":
+        """Construit l'arbre en O(n) à partir de flags 0/1 (positions 1..len)"""
+        fenwick = cls(capacity)
+        tree = fenwick._tree
+        tree[1:len(flags) + 1] = flags
+        for index in range(1, len(tree)):
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        return fenwick
+
+
+# ========================================
+# FILE D'ATTENTE D'UNE INSTITUTION
+# ========================================
+
+class InstitutionQueue:
+    """
+    Tickets en attente d'une institution, dans l'ordre d'émission
+
+    Chaque ticket reçoit une séquence d'émission locale (1, 2, 3...).
+    Un arbre de Fenwick indexé par cette séquence donne le nombre exact
+    de personnes devant un ticket, même quand des tickets sont annulés,
+    manqués ou servis dans le désordre. Un ticket remis en attente
+    reçoit une nouvelle séquence : il repart en fin de file.
+
+    Un ticket retiré par pop() garde sa séquence jusqu'à release() :
+    restore() le remet exactement à sa place si sa réservation échoue.
+    """
+
+    def __init__(self, institution_id: int, institution_name: str,
+                 average_service_time: int = DEFAULT_SERVICE_TIME, current_ticket_number: Optional[str] = None):
+        self.institution_id = institution_id
+        self.institution_name = institution_name
+        self.average_service_time = average_service_time
+        self.current_ticket_number = current_ticket_number
+        self.lock = threading.RLock()
+
+        self._rank = FenwickTree()
+        self._slots: List[Optional[int]] = [None]  # séquence -> id (None = sorti)
+        self._head = 1                             # plus petite séquence possiblement en attente
+        self._seq: Dict[int, int] = {}             # id -> séquence
+        self._held: Dict[int, Tuple[int, WaitingTicket]] = {}  # id -> (séquence, ticket) retiré par pop()
+        self._tickets: Dict[int, WaitingTicket] = {}
+        self._by_number: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def push(self, ticket: WaitingTicket) -> None:
+        """Ajoute un ticket en fin de file"""
+        with self.lock:
+            if ticket.id in self._tickets:
+                return
+            seq = len(self._slots)
+            if seq > self._rank.capacity:
+                self._rebuild_index(max(64, 2 * len(self._tickets) + 1, seq))
+                seq = len(self._slots)
+            self._slots.append(ticket.id)
+            self._rank.add(seq, 1)
+            self._seq[ticket.id] = seq
+            self._tickets[ticket.id] = ticket
+            self._by_number[ticket.ticket_number] = ticket.id
+
+    def peek(self) -> Optional[WaitingTicket]:
+        """Retourne le prochain ticket sans le retirer"""
+        with self.lock:
+            slots = self._slots
+            # Avancer la tête au-delà des tickets sortis (coût amorti O(1))
+            while self._head < len(slots) and slots[self._head] is None:
+                self._head += 1
+            if self._head >= len(slots):
+                return None
+            return self._tickets[slots[self._head]]
+
+    def pop(self) -> Optional[WaitingTicket]:
+        """
+        Retire et retourne le prochain ticket
+
+        Sa place est gardée jusqu'à release() (réservation validée) ou
+        restore() (réservation échouée).
+        """
+        with self.lock:
+            ticket = self.peek()
+            if ticket is not None:
+                self._held[ticket.id] = (self._seq[ticket.id], ticket)
+                self._discard(ticket)
+            return ticket
+
+    def restore(self, ticket: WaitingTicket) -> None:
+        """Remet un ticket retiré par pop() à sa place d'origine"""
+        with self.lock:
+            held = self._held.pop(ticket.id, None)
+            if held is None or ticket.id in self._tickets:
+                return
+            seq = held[0]
+            self._slots[seq] = ticket.id
+            self._rank.add(seq, 1)
+            self._seq[ticket.id] = seq
+            self._tickets[ticket.id] = ticket
+            self._by_number[ticket.ticket_number] = ticket.id
+            self._head = min(self._head, seq)
+
+    def release(self, ticket_id: int) -> None:
+        """Libère la place d'un ticket retiré par pop() (il a quitté la file)"""
+        with self.lock:
+            self._held.pop(ticket_id, None)
+
+    def remove(self, ticket_id: int) -> Optional[WaitingTicket]:
+        """Retire un ticket quel que soit son rang (annulé, manqué, servi...)"""
+        with self.lock:
+            ticket = self._tickets.get(ticket_id)
+            if ticket is not None:
+                self._discard(ticket)
+            return ticket
+
+    def rank(self, ticket_id: int) -> Optional[int]:
+        """Nombre de tickets encore en attente devant ce ticket (O(log n))"""
+        with self.lock:
+            seq = self._seq.get(ticket_id)
+            if seq is None:
+                return None
+            return self._rank.prefix(seq - 1)
+
+    def get(self, ticket_number: str) -> Optional[WaitingTicket]:
+        """Retourne un ticket en attente par son numéro"""
+        with self.lock:
+            ticket_id = self._by_number.get(ticket_number)
+            return self._tickets.get(ticket_id) if ticket_id is not None else None
+
+    def get_by_id(self, ticket_id: int) -> Optional[WaitingTicket]:
+        """Retourne un ticket en attente par son identifiant"""
+        with self.lock:
+            return self._tickets.get(ticket_id)
+
+    def snapshot(self) -> List[WaitingTicket]:
+        """Copie ordonnée des tickets en attente"""
+        with self.lock:
+            return [self._tickets[i] for i in self._slots[self._head:] if i is not None]
+
+    def estimate_wait(self, people_ahead: int) -> int:
+        """Attente estimée (minutes) : modèle historique, sinon temps de service en direct"""
+        return wait_model.estimate_wait(self.institution_id, people_ahead, self.average_service_time)
+
+    def queue_info(self) -> schemas.QueueInfo:
+        """État de la file (QueueInfo schema), sans requête SQL"""
+        people_waiting = len(self)
+        return schemas.QueueInfo(
+            institution_id=self.institution_id,
+            current_ticket_number=self.current_ticket_number,
+            people_waiting=people_waiting,
+            estimated_wait_time=self.estimate_wait(people_waiting),
+            average_service_time=self.average_service_time
+        )
+
+    def ticket_stats(self, ticket: WaitingTicket) -> Optional[schemas.TicketStats]:
+        """Statistiques d'un ticket en attente (TicketStats schema)"""
+        people_ahead = self.rank(ticket.id)
+        if people_ahead is None:
+            return None
+        return schemas.TicketStats(
+            ticket_number=ticket.ticket_number,
+            queue_position=people_ahead + 1,
+            people_ahead=people_ahead,
+            estimated_wait_time=self.estimate_wait(people_ahead),
+            institution_name=self.institution_name
+        )
+
+    def _discard(self, ticket: WaitingTicket) -> None:
+        seq = self._seq.pop(ticket.id)
+        self._slots[seq] = None
+        self._rank.add(seq, -1)
+        del self._tickets[ticket.id]
+        # Un numéro peut revenir d'un jour à l'autre : ne retirer que le sien
+        if self._by_number.get(ticket.ticket_number) == ticket.id:
+            del self._by_number[ticket.ticket_number]
+
+    def _rebuild_index(self, capacity: int) -> None:
+        """
+        Renumérote les tickets en attente à partir de 1 et reconstruit
+        l'arbre (O(n), amorti par le doublement de capacité)
+
+        Les places des tickets retirés par pop() sont conservées (vides).
+        """
+        held_at = {seq: ticket_id for ticket_id, (seq, _) in self._held.items()}
+        start = min([self._head, *held_at])
+        live, held = [], {}
+        for seq in range(start, len(self._slots)):
+            ticket_id = self._slots[seq]
+            if ticket_id is None and seq in held_at:
+                held[held_at[seq]] = (len(live) + 1, self._held[held_at[seq]][1])
+            elif ticket_id is None:
+                continue
+            live.append(ticket_id)
+        self._slots = [None] + live
+        self._head = 1
+        self._seq = {ticket_id: seq for seq, ticket_id in enumerate(live, start=1) if ticket_id is not None}
+        self._held = held
+        self._rank = FenwickTree.from_flags([0 if ticket_id is None else 1 for ticket_id in live], capacity)
+
+
+# ========================================
+# MOTEUR : TOUTES LES INSTITUTIONS
+# ========================================
+
+class QueueEngine:
+    """Registre des files d'attente en mémoire, une par institution"""
+
+    def __init__(self):
+        self._queues: Dict[int, InstitutionQueue] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def rebuild(self, db: Session) -> None:
+        """
+        Recharge toutes les files depuis la base
+
+        Appelé au démarrage de l'API : une requête pour les institutions
+        et leurs queues, une pour les tickets en attente.
+        """
+        rows = db.query(
+            models.Institution.id,
+            models.Institution.name,
+            models.Queue.average_service_time,
+            models.Queue.current_ticket_number
+        ).outerjoin(
+            models.Queue, models.Queue.institution_id == models.Institution.id
+        ).all()
+
+        queues = {
+            row.id: InstitutionQueue(
+                row.id, row.name,
+                average_service_time=row.average_service_time or DEFAULT_SERVICE_TIME,
+                current_ticket_number=row.current_ticket_number
+            )
+            for row in rows
+        }
+        for queue in queues.values():
+            service_times.seed(queue.institution_id, queue.average_service_time)
+
+        waiting = db.query(
+            models.Ticket.id,
+            models.Ticket.ticket_number,
+            models.Ticket.institution_id,
+            models.Ticket.queue_position
+        ).filter(
+            models.Ticket.status == models.TicketStatus.WAITING
+        ).order_by(models.Ticket.id)
+
+        for row in waiting:
+            queue = queues.get(row.institution_id)
+            if queue is not None:
+                queue.push(WaitingTicket(row.id, row.ticket_number, row.institution_id, row.queue_position))
+
+        with self._lock:
+            self._queues = queues
+            self.loaded = True
+
+    def ensure_loaded(self, db: Session) -> None:
+        """Charge les files au premier usage (scripts, tests)"""
+        if not self.loaded:
+            self.rebuild(db)
+
+    def register(self, institution_id: int, institution_name: str,
+                 average_service_time: int = DEFAULT_SERVICE_TIME) -> None:
+        """Déclare la file d'une nouvelle institution"""
+        service_times.seed(institution_id, average_service_time)
+        with self._lock:
+            if institution_id not in self._queues:
+                self._queues[institution_id] = InstitutionQueue(
+                    institution_id, institution_name, average_service_time
+                )
+
+    def get(self, institution_id: int) -> Optional[InstitutionQueue]:
+        """File d'une institution, ou None si inconnue"""
+        return self._queues.get(institution_id)
+
+    def all(self) -> List[InstitutionQueue]:
+        """Toutes les files (copie de la liste)"""
+        return list(self._queues.values())
+
+    def total_waiting(self) -> int:
+        """Nombre de tickets en attente, toutes files confondues"""
+        return sum(len(queue) for queue in list(self._queues.values()))
+
+    def estimated_average_wait(self) -> int:
+        """
+        Attente estimée moyenne des tickets en attente (minutes)
+
+        Dans une file de n tickets, le ticket au rang r attend
+        r * temps de service : la somme vaut temps * n(n-1)/2.
+        """
+        total_wait, total_waiting = 0, 0
+        for queue in list(self._queues.values()):
+            n = len(queue)
+            total_wait += queue.average_service_time * n * (n - 1) // 2
+            total_waiting += n
+        return round(total_wait / total_waiting) if total_waiting else 0
+
+    def find(self, ticket_number: str) -> Optional[WaitingTicket]:
+        """Cherche un ticket en attente dans toutes les files"""
+        for queue in list(self._queues.values()):
+            ticket = queue.get(ticket_number)
+            if ticket is not None:
+                return ticket
+        return None
+
+    def push(self, ticket: WaitingTicket) -> None:
+        queue = self._queues.get(ticket.institution_id)
+        if queue is not None:
+            queue.push(ticket)
+
+    def remove(self, institution_id: int, ticket_id: int) -> Optional[WaitingTicket]:
+        queue = self._queues.get(institution_id)
+        return queue.remove(ticket_id) if queue is not None else None
+
+    def set_current(self, institution_id: int, ticket_number: str) -> None:
+        """Met à jour le ticket appelé et planifie son écriture en base"""
+        queue = self._queues.get(institution_id)
+        if queue is not None:
+            queue.current_ticket_number = ticket_number
+        queue_writer.schedule(institution_id, current_ticket_number=ticket_number)
+
+    def record_service(self, institution_id: int, operator_id: Optional[int],
+                       called_at: Optional[datetime], completed_at: Optional[datetime]) -> None:
+        """
+        Mesure un service terminé et met à jour le temps de service estimé
+
+        La nouvelle estimation est utilisée immédiatement pour les temps
+        d'attente, et écrite en base en arrière-plan si elle a changé.
+        """
+        if called_at is None or completed_at is None:
+            return
+        minutes = service_times.observe_service(
+            institution_id, operator_id, (completed_at - called_at).total_seconds() / 60
+        )
+        if minutes is None:
+            return
+        queue = self._queues.get(institution_id)
+        if queue is not None:
+            queue.average_service_time = minutes
+        queue_writer.schedule(institution_id, average_service_time=minutes)
+
+
+# ========================================
+# ÉCRITURE DIFFÉRÉE DE LA TABLE QUEUES
+# ========================================
+
+class QueueWriter:
+    """
+    Écrit en arrière-plan les changements de la table `queues`
+
+    Les mises à jour d'une même institution sont fusionnées : seule la
+    dernière valeur de chaque colonne est écrite, en une transaction par
+    vidage.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._pending: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Démarre le thread d'écriture (idempotent)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="queue-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Arrête le thread après un dernier vidage"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def schedule(self, institution_id: int, **values) -> None:
+        """Planifie la mise à jour de colonnes de la queue d'une institution"""
+        with self._lock:
+            self._pending.setdefault(institution_id, {}).update(values)
+        self.start()
+        self._wakeup.set()
+
+    def flush(self) -> None:
+        """Écrit immédiatement toutes les mises à jour en attente"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            for institution_id, values in pending.items():
+                db.execute(
+                    update(models.Queue)
+                    .where(models.Queue.institution_id == institution_id)
+                    .values(updated_at=now, **values)
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Remettre les valeurs non écrites (sans écraser les plus récentes)
+            with self._lock:
+                for institution_id, values in pending.items():
+                    merged = dict(values)
+                    merged.update(self._pending.get(institution_id, {}))
+                    self._pending[institution_id] = merged
+            raise
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            # Laisser les mises à jour rapprochées se regrouper
+            self._stopped.wait(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Erreur écriture des queues: {e}")
+
+
+# ========================================
+# UN SEUL PROCESSUS PAR BASE
+# ========================================
+
+class ProcessLockError(RuntimeError):
+    """Un autre processus sert déjà cette base"""
+
+
+_process_lock = None
+
+
+def acquire_process_lock(database_path: str) -> None:
+    """
+    Verrou exclusif sur `<base>.lock`, gardé jusqu'à la fin du processus
+
+    Un second processus (worker uvicorn, autre instance de l'API) sur la
+    même base est refusé au démarrage. Le système libère le verrou quand
+    le processus se termine, même brutalement. Idempotent dans un même
+    processus (redémarrages de l'application dans les tests).
+
+    Args:
+        database_path: Chemin du fichier SQLite
+
+    Raises:
+        ProcessLockError: si le verrou est déjà pris par un autre processus
+    """
+    global _process_lock
+    if _process_lock is not None:
+        return
+
+    path = f"{os.path.abspath(database_path)}.lock"
+    handle = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        raise ProcessLockError(
+            f"{database_path} est déjà servie par un autre processus : les files d'attente sont "
+            f"en mémoire, lancer l'API avec un seul worker par base"
+        ) from None
+    _process_lock = handle
+
+
+# Instances partagées par l'API
+queue_writer = QueueWriter()
+waiting_queues = QueueEngine()
@@ -0,0 +1,143 @@
+"""
+queue_events.py - Diffusion des Changements de File d'Attente
+=============================================================
+Au lieu de redemander /queue/{id} ou /tickets/{numéro}/stats en boucle,
+les clients s'abonnent (WebSocket ou SSE, voir main.py) et reçoivent un
+message à chaque changement de la file :
+
+- topic "institution:{id}" : QueueInfo de l'institution
+- topic "ticket:{numéro}"  : TicketStats du ticket (+ son statut)
+
+La diffusion se fait dans le processus : un changement est calculé une
+seule fois (depuis le moteur en mémoire, sans SQL), puis copié dans la
+boîte de chaque abonné. N abonnés = 1 calcul, pas N requêtes.
+"""
+
+import asyncio
+import threading
+from typing import Dict, Optional, Set
+
+from queue_engine import waiting_queues
+
+# Messages gardés par abonné lent ; au-delà, les plus anciens sont jetés
+# (chaque message contient l'état complet, seul le dernier compte)
+SUBSCRIBER_BUFFER = 16
+
+
+def institution_topic(institution_id: int) -> str:
+    return f"institution:{institution_id}"
+
+
+def ticket_topic(ticket_number: str) -> str:
+    return f"ticket:{ticket_number}"
+
+
+class QueueEventHub:
+    """
+    Abonnements et diffusion des messages, dans la boucle asyncio
+
+    publish() peut être appelé depuis n'importe quel thread (routes,
+    tâches de fond) : la distribution est confiée à la boucle avec
+    call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Associe le hub à la boucle du serveur (au démarrage)"""
+        self._loop = loop
+
+    def subscribe(self, topic: str) -> asyncio.Queue:
+        """Crée la boîte de réception d'un nouvel abonné"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        inbox = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(inbox)
+        return inbox
+
+    def unsubscribe(self, topic: str, inbox: asyncio.Queue) -> None:
+        with self._lock:
+            inboxes = self._subscribers.get(topic)
+            if inboxes is not None:
+                inboxes.discard(inbox)
+                if not inboxes:
+                    del self._subscribers[topic]
+
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self._subscribers
+
+    def ticket_topics(self) -> list:
+        """Numéros de tickets ayant au moins un abonné"""
+        with self._lock:
+            return [topic[len("ticket:"):] for topic in self._subscribers if topic.startswith("ticket:")]
+
+    def publish(self, topic: str, message: dict) -> None:
+        """Envoie un message à tous les abonnés d'un topic"""
+        if self._loop is None or not self.has_subscribers(topic):
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, topic, message)
+        except RuntimeError:
+            # Boucle fermée (arrêt du serveur)
+            pass
+
+    def _deliver(self, topic: str, message: dict) -> None:
+        with self._lock:
+            inboxes = list(self._subscribers.get(topic, ()))
+        for inbox in inboxes:
+            if inbox.full():
+                inbox.get_nowait()
+            inbox.put_nowait(message)
+
+
+hub = QueueEventHub()
+
+
+def notify_queue_changed(institution_id: int, event: str, ticket_number: Optional[str] = None) -> None:
+    """
+    Diffuse l'état d'une file après un changement (création, appel...)
+
+    Appelé par crud.py / crud_users.py après le commit. Ne fait rien s'il
+    n'y a aucun abonné.
+    """
+    queue = waiting_queues.get(institution_id)
+    if queue is None:
+        return
+
+    topic = institution_topic(institution_id)
+    if hub.has_subscribers(topic):
+        hub.publish(topic, {
+            "event": event,
+            "ticket_number": ticket_number,
+            "queue": queue.queue_info().model_dump(),
+        })
+
+    # Un nouveau ticket se place en fin de file : le rang des autres
+    # tickets ne change pas
+    numbers = [ticket_number] if event == "ticket_created" else hub.ticket_topics()
+
+    # Tickets suivis : un calcul de rang par ticket, quel que soit le
+    # nombre d'abonnés à ce ticket
+    for number in numbers:
+        if not hub.has_subscribers(ticket_topic(number)):
+            continue
+        waiting = queue.get(number)
+        if waiting is not None:
+            stats = queue.ticket_stats(waiting)
+            if stats is not None:
+                hub.publish(ticket_topic(number), {
+                    "event": event,
+                    "status": "waiting",
+                    "stats": stats.model_dump(),
+                })
+        elif number == ticket_number:
+            # Le ticket vient de quitter la file (appelé, servi, manqué...)
+            hub.publish(ticket_topic(number), {
+                "event": event,
+                "status": event[len("ticket_"):] if event.startswith("ticket_") else event,
+                "stats": None,
+            })
@@ -4,8 +4,9 @@ QueueFlow Backend - Script de Lancement
 Avec création automatique des utilisateurs par défaut
 """
 import uvicorn
-from database import engine, Base, SessionLocal
+from database import engine, SessionLocal
 from models import User, Institution, Ticket
+import migrations
 
 def create_default_users():
     """Créer les utilisateurs par défaut : Admin + 12 Opérateurs"""
@@ -91,8 +92,8 @@ if __name__ == '__main__':
 
     # Créer les tables
     print('\n📊 Création des tables de la base de données...')
-    Base.metadata.create_all(bind=engine)
-    print('✅ Tables créées avec succès')
+    migrations.upgrade(engine)
+    print('✅ Tables et index créés avec succès')
 
     # Créer les utilisateurs par défaut
     create_default_users()
@@ -5,7 +5,7 @@ Version étendue avec authentification et gestion utilisateurs
 """
 
 from pydantic import BaseModel, Field, EmailStr
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
 from models import InstitutionType, TicketStatus, UserRole
 
@@ -98,6 +98,8 @@ class TicketResponse(BaseModel):
     """Schéma pour renvoyer un ticket complet"""
     id: int
     ticket_number: str
+    service_day: Optional[int] = None  # AAAAMMJJ (absent sur les anciens tickets archivés)
+    sequence: Optional[int] = None     # numéro du jour dans l'institution
     user_id: Optional[int]
     institution_id: int
     status: TicketStatus
@@ -185,6 +187,14 @@ class AdminStats(BaseModel):
     average_wait_time: int
 
 
+class DailyCountersResponse(BaseModel):
+    """Compteurs de tickets d'une journée (toutes institutions)"""
+    service_day: date
+    tickets_created: int
+    tickets_completed: int
+    tickets_missed: int
+
+
 class InstitutionList(BaseModel):
     """Liste d'institutions par type"""
     institutions: List[InstitutionResponse]
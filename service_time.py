@@ -0,0 +1,122 @@
+"""
+service_time.py - Estimation du Temps de Service
+================================================
+Le temps de service moyen était fixé à 3 minutes pour toutes les
+institutions. Il est maintenant estimé en continu à partir des tickets
+servis : à chaque complete_ticket, la durée called_at -> completed_at
+met à jour une moyenne mobile exponentielle (EWMA) :
+
+    estimation = estimation + alpha * (durée - estimation)
+
+- une estimation par institution (utilisée pour les temps d'attente)
+- une estimation par opérateur (statistiques de l'opérateur)
+- une estimation globale du temps d'attente réel (created_at -> called_at)
+
+Chaque mise à jour coûte O(1), sans relire l'historique. Les estimations
+par institution sont écrites dans `queues.average_service_time` par
+QueueWriter (queue_engine.py) et relues au démarrage ; les autres sont
+gardées en mémoire seulement.
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+# Temps de service (minutes) d'une institution sans historique
+DEFAULT_SERVICE_TIME = int(os.getenv("QUEUEFLOW_DEFAULT_SERVICE_TIME", "3"))
+
+# Poids d'une nouvelle mesure (0.2 : les ~10 derniers tickets comptent le plus)
+SERVICE_TIME_ALPHA = float(os.getenv("QUEUEFLOW_SERVICE_TIME_ALPHA", "0.2"))
+
+# Mesures ignorées au-delà (ticket oublié ouvert, horloge faussée...)
+MAX_SAMPLE_MINUTES = float(os.getenv("QUEUEFLOW_MAX_SERVICE_MINUTES", "240"))
+
+
+class Ewma:
+    """Moyenne mobile exponentielle d'une durée en minutes"""
+
+    __slots__ = ("value", "samples")
+
+    def __init__(self, value: Optional[float] = None):
+        self.value = value
+        self.samples = 0
+
+    def update(self, sample: float, alpha: float) -> float:
+        if self.value is None:
+            self.value = sample
+        else:
+            self.value += alpha * (sample - self.value)
+        self.samples += 1
+        return self.value
+
+
+def to_minutes(value: Optional[float]) -> int:
+    """Arrondit une estimation en minutes entières (au moins 1)"""
+    if value is None:
+        return DEFAULT_SERVICE_TIME
+    return max(1, int(round(value)))
+
+
+class ServiceTimeEstimator:
+    """Estimations en mémoire, par institution et par opérateur"""
+
+    def __init__(self, alpha: float = SERVICE_TIME_ALPHA):
+        self.alpha = alpha
+        self._institutions: Dict[int, Ewma] = {}
+        self._operators: Dict[int, Ewma] = {}
+        self._wait = Ewma()
+        self._lock = threading.Lock()
+
+    def seed(self, institution_id: int, minutes: int) -> None:
+        """Point de départ d'une institution (valeur lue dans `queues`)"""
+        with self._lock:
+            if institution_id not in self._institutions:
+                self._institutions[institution_id] = Ewma(float(minutes))
+
+    def observe_service(self, institution_id: int, operator_id: Optional[int], minutes: float) -> Optional[int]:
+        """
+        Enregistre la durée d'un service
+
+        Args:
+            institution_id: ID de l'institution
+            operator_id: ID de l'opérateur (ou None)
+            minutes: Durée called_at -> completed_at
+
+        Returns:
+            La nouvelle estimation de l'institution (minutes entières) si
+            elle a changé, sinon None
+        """
+        if not 0 <= minutes <= MAX_SAMPLE_MINUTES:
+            return None
+
+        with self._lock:
+            estimate = self._institutions.setdefault(institution_id, Ewma())
+            before = to_minutes(estimate.value)
+            after = to_minutes(estimate.update(minutes, self.alpha))
+            if operator_id is not None:
+                self._operators.setdefault(operator_id, Ewma()).update(minutes, self.alpha)
+
+        return after if after != before else None
+
+    def observe_wait(self, minutes: float) -> None:
+        """Enregistre l'attente réelle d'un ticket (created_at -> called_at)"""
+        if 0 <= minutes <= MAX_SAMPLE_MINUTES:
+            with self._lock:
+                self._wait.update(minutes, self.alpha)
+
+    def institution(self, institution_id: int) -> int:
+        estimate = self._institutions.get(institution_id)
+        return to_minutes(estimate.value if estimate else None)
+
+    def operator(self, operator_id: int) -> Optional[int]:
+        """Estimation d'un opérateur, ou None s'il n'a encore rien servi"""
+        estimate = self._operators.get(operator_id)
+        return to_minutes(estimate.value) if estimate else None
+
+    def average_wait(self) -> Optional[int]:
+        """Attente moyenne récente, ou None sans mesure"""
+        value = self._wait.value
+        return max(0, int(round(value))) if value is not None else None
+
+
+service_times = ServiceTimeEstimator()
@@ -0,0 +1,130 @@
+"""
+tests/conftest.py - Configuration Commune des Tests
+===================================================
+Les tests tournent sur une base SQLite temporaire (un fichier, pour que
+plusieurs connexions et plusieurs threads la partagent vraiment), créée
+avant tout import de database.py.
+
+    python -m pytest -q
+"""
+
+import importlib.util
+import os
+import tempfile
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_directory = tempfile.mkdtemp(prefix="queueflow-tests-")
+os.environ["QUEUEFLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(_directory, 'tests.db')}"
+
+import pytest  # noqa: E402
+
+import migrations  # noqa: E402
+import query_audit  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+
+migrations.upgrade(engine)
+
+# Requêtes SQL maximales par route (voir query_audit.py), caches froids
+# compris : institution et opérateur lus une fois puis mis en cache
+ROUTE_QUERY_BUDGETS = {
+    "POST /tickets": 4,                 # institution, compteur de la queue, ticket, compteurs du jour
+    "GET /queue/{institution_id}": 0,   # file en mémoire
+    "POST /operator/next-ticket": 2,    # opérateur, réservation (UPDATE ... RETURNING)
+    "GET /users/{user_id}/tickets": 2,  # tickets récents, tickets archivés
+}
+
+
+@pytest.fixture
+def db():
+    """Session synchrone sur la base de test"""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Client HTTP de l'API (démarrage et arrêt de l'application compris)"""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Vérifie le budget de requêtes SQL d'une route (ROUTE_QUERY_BUDGETS)
+
+        with query_budget("POST /tickets"):
+            client.post("/tickets", json={"institution_id": 1})
+    """
+    def within(route: str):
+        return query_audit.query_budget(ROUTE_QUERY_BUDGETS[route], route)
+
+    return within
+
+
+@pytest.fixture
+def institution_id(db):
+    """Institution neuve : file vide, numérotation à partir de 1"""
+    import crud
+    import models
+    import schemas
+
+    institution = crud.create_institution(db, schemas.InstitutionCreate(
+        name=f"Banque {uuid.uuid4().hex[:8]}", type=models.InstitutionType.BANQUE, location="Dakar"
+    ))
+    return institution.id
+
+
+@pytest.fixture
+def operator_id(db, institution_id):
+    """Opérateur de l'institution `institution_id`"""
+    import crud_users
+    import models
+    import schemas
+
+    operator = crud_users.create_user(db, schemas.UserCreate(
+        name="Opérateur", email=f"operator{institution_id}@queueflow.sn", password="operator123",
+        role=models.UserRole.OPERATOR, institution_id=institution_id
+    ))
+    return operator.id
+
+
+@pytest.fixture(scope="session")
+def backend(tmp_path_factory):
+    """QueueFlow-Backend/main.py sur une base temporaire (module distinct du main de l'API)"""
+    from fastapi.testclient import TestClient
+
+    variables = {
+        "DATABASE_URL": f"sqlite:///{tmp_path_factory.mktemp('backend') / 'backend.db'}",
+        # Hash des comptes de test : coût minimal
+        "ARGON2_TIME_COST": "1",
+        "ARGON2_MEMORY_COST": "1024",
+        "ARGON2_PARALLELISM": "1",
+    }
+    saved = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        spec = importlib.util.spec_from_file_location(
+            "queueflow_backend_main", os.path.join(ROOT, "QueueFlow-Backend", "main.py")
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    with TestClient(module.app) as client:
+        yield module, client
+    module.engine.dispose()
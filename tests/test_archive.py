@@ -0,0 +1,68 @@
+"""
+Archivage des tickets terminés : archive.archive_finished_tickets
+"""
+
+import os
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.schema import CreateTable
+
+import archive
+import crud
+import migrations
+import models
+import schemas
+
+# Tickets du test datés d'un jour passé : seul ce jour est archivé
+PAST = datetime(2020, 1, 1, 9, 0)
+CUTOFF = datetime(2020, 1, 2)
+
+
+def issue_and_finish(db, institution_id: int) -> int:
+    ticket = crud.create_ticket(db, schemas.TicketCreate(institution_id=institution_id))
+    crud.update_ticket_status(db, ticket.ticket_number, models.TicketStatus.COMPLETED)
+    ticket = db.get(models.Ticket, ticket.id)
+    ticket.created_at = ticket.completed_at = PAST
+    db.commit()
+    return ticket.id
+
+
+def test_archived_ids_are_not_reused(db, institution_id):
+    # Deux cycles émission + archivage : le dernier id archivé ne doit
+    # pas être redonné (sinon tickets_archive.id est en double)
+    first = issue_and_finish(db, institution_id)
+    assert archive.archive_finished_tickets(db, CUTOFF) >= 1
+
+    second = issue_and_finish(db, institution_id)
+    assert second > first
+    assert archive.archive_finished_tickets(db, CUTOFF) >= 1
+
+    archived = {row.id for row in db.query(models.TicketArchive.id).filter(
+        models.TicketArchive.institution_id == institution_id
+    )}
+    assert archived == {first, second}
+
+
+def test_migration_adds_autoincrement_after_archived_ids(tmp_path):
+    bind = create_engine(f"sqlite:///{os.path.join(tmp_path, 'old.db')}")
+    migrations.upgrade(bind)
+    # Table d'avant le correctif : clé primaire sans AUTOINCREMENT
+    old_table = str(CreateTable(models.Ticket.__table__).compile(bind)).replace(" AUTOINCREMENT", "")
+    with bind.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE tickets")
+        connection.exec_driver_sql(old_table)
+        connection.exec_driver_sql(
+            "INSERT INTO tickets_archive (id, ticket_number, institution_id, status, queue_position, created_at) "
+            "VALUES (41, 'H01-007', 1, 'COMPLETED', 1, '2020-01-01 09:00:00')"
+        )
+
+    assert "tickets (AUTOINCREMENT)" in migrations.upgrade(bind)
+    assert migrations.upgrade(bind) == []
+    with bind.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO tickets (service_day, sequence, ticket_number, institution_id, status, queue_position) "
+            "VALUES (20200102, 1, 'H01-0102-001', 1, 'WAITING', 1)"
+        )
+        assert connection.exec_driver_sql("SELECT MAX(id) FROM tickets").scalar() == 42
+    bind.dispose()
@@ -0,0 +1,52 @@
+"""
+QueueFlow-Backend : routes réservées et cache token -> utilisateur
+"""
+
+from sqlalchemy import event
+
+
+def login(client, email: str, password: str) -> dict:
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+def test_reserved_routes_require_a_token(backend):
+    _, client = backend
+    assert client.get("/api/admin/stats").status_code == 401
+    assert client.put("/api/tickets/1/call").status_code == 401
+    assert client.get("/api/admin/stats", headers={"Authorization": "Bearer abc"}).status_code == 401
+
+
+def test_operator_cannot_reach_admin_routes(backend):
+    _, client = backend
+    headers = login(client, "operator@ledantec.sn", "operator123")
+    assert client.get("/api/admin/stats", headers=headers).status_code == 403
+    # Ticket inexistant : le rôle est accepté, la route répond 404
+    assert client.put("/api/tickets/999999/call", headers=headers).status_code == 404
+
+
+def test_cached_principal_skips_the_user_lookup(backend):
+    module, client = backend
+    headers = login(client, "admin@queueflow.com", "admin123")
+    module.principal_cache.clear()
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(module.engine, "before_cursor_execute", record)
+    try:
+        assert client.get("/api/admin/stats", headers=headers).status_code == 200
+        first = list(statements)
+        statements.clear()
+        assert client.get("/api/admin/stats", headers=headers).status_code == 200
+        second = list(statements)
+    finally:
+        event.remove(module.engine, "before_cursor_execute", record)
+
+    user_lookup = [statement for statement in first if "WHERE users.id = " in statement]
+    assert len(user_lookup) == 1
+    assert not [statement for statement in second if "WHERE users.id = " in statement]
+    assert len(second) == len(first) - 1
@@ -0,0 +1,29 @@
+"""
+QueueFlow-Backend : GET /api/tickets (curseur)
+"""
+
+import base64
+
+import pytest
+
+
+def ticket_cursor(created_at: str, ticket_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at}|{ticket_id}".encode()).decode()
+
+
+@pytest.mark.parametrize("cursor", [
+    "pas-un-curseur",
+    ticket_cursor("2026-10-18T09:00:00", "abc"),
+    ticket_cursor("2026-10-18T09:00:00", str(2 ** 63)),
+    ticket_cursor("2026-10-18T09:00:00", str(-2 ** 63 - 1)),
+])
+def test_invalid_cursor_is_rejected(backend, cursor):
+    _, client = backend
+    assert client.get("/api/tickets", params={"cursor": cursor}).status_code == 400
+    assert client.get("/api/tickets", params={"cursor": cursor, "export": True}).status_code == 400
+
+
+def test_cursor_at_the_integer_bound_is_accepted(backend):
+    _, client = backend
+    response = client.get("/api/tickets", params={"cursor": ticket_cursor("2026-10-18T09:00:00", str(2 ** 63 - 1))})
+    assert response.status_code == 200
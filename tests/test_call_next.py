@@ -0,0 +1,107 @@
+"""
+Appel du prochain ticket : crud_users.call_next_ticket
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import crud
+import crud_async
+import crud_users
+import schemas
+from database_async import AsyncSessionLocal
+from query_audit import track_queries
+from queue_engine import waiting_queues
+
+
+def waiting_numbers(institution_id: int) -> list:
+    return [ticket.ticket_number for ticket in waiting_queues.get(institution_id).snapshot()]
+
+
+def test_tickets_are_called_in_order(db, institution_id, operator_id):
+    issued = [stats.ticket_number for stats in crud.issue_tickets(db, [
+        schemas.TicketCreate(institution_id=institution_id) for _ in range(3)
+    ])]
+
+    called = [crud_users.call_next_ticket(db, institution_id, operator_id).ticket_number for _ in range(3)]
+
+    assert called == issued
+    assert crud_users.call_next_ticket(db, institution_id, operator_id) is None
+
+
+def test_failed_claim_keeps_ticket_at_the_head(db, institution_id, operator_id, monkeypatch):
+    issued = [stats.ticket_number for stats in crud.issue_tickets(db, [
+        schemas.TicketCreate(institution_id=institution_id) for _ in range(3)
+    ])]
+
+    def failing_claim(db, ticket_id, operator_id):
+        raise RuntimeError("base indisponible")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(crud_users, "claim_ticket", failing_claim)
+        with pytest.raises(RuntimeError):
+            crud_users.call_next_ticket(db, institution_id, operator_id)
+
+    assert waiting_numbers(institution_id) == issued
+    assert crud_users.call_next_ticket(db, institution_id, operator_id).ticket_number == issued[0]
+
+
+def test_ticket_taken_elsewhere_is_skipped(db, institution_id, operator_id):
+    issued = [stats.ticket_number for stats in crud.issue_tickets(db, [
+        schemas.TicketCreate(institution_id=institution_id) for _ in range(2)
+    ])]
+    # Réservé par une autre session, la file en mémoire ne le sait pas encore
+    first = crud.get_ticket_by_number(db, issued[0])
+    crud_users.claim_ticket(db, first.id, operator_id)
+    db.commit()
+
+    assert crud_users.call_next_ticket(db, institution_id, operator_id).ticket_number == issued[1]
+    assert waiting_numbers(institution_id) == []
+
+
+def test_locked_database_is_retried_without_losing_the_head(client, db, institution_id, operator_id, monkeypatch):
+    issued = [stats.ticket_number for stats in crud.issue_tickets(db, [
+        schemas.TicketCreate(institution_id=institution_id) for _ in range(2)
+    ])]
+    claim_ticket = crud_users.claim_ticket
+    attempts = []
+
+    def locked_once(db, ticket_id, operator_id):
+        attempts.append(ticket_id)
+        if len(attempts) == 1:
+            raise OperationalError("UPDATE tickets", {}, Exception("database is locked"))
+        return claim_ticket(db, ticket_id, operator_id)
+
+    async def call_next():
+        async with AsyncSessionLocal() as session:
+            return await crud_async.call_next_ticket(session, institution_id, operator_id)
+
+    monkeypatch.setattr(crud_users, "claim_ticket", locked_once)
+    ticket = client.portal.call(call_next)
+
+    assert ticket.ticket_number == issued[0]
+    assert len(attempts) == 2
+    assert waiting_numbers(institution_id) == issued[1:]
+
+
+def test_concurrent_calls_claim_distinct_tickets_with_one_write_each(client, db, institution_id, operator_id):
+    callers = 50
+    crud.issue_tickets(db, [schemas.TicketCreate(institution_id=institution_id) for _ in range(callers)])
+
+    async def call_next():
+        async with AsyncSessionLocal() as session:
+            return await crud_async.call_next_ticket(session, institution_id, operator_id)
+
+    async def call_all():
+        with track_queries() as log:
+            tickets = await asyncio.gather(*(call_next() for _ in range(callers)))
+        return tickets, log
+
+    tickets, log = client.portal.call(call_all)
+
+    assert len({ticket.id for ticket in tickets}) == callers
+    claims = sum(count for shape, count in log.shapes.items() if shape.startswith("UPDATE tickets SET status"))
+    assert claims == callers
+    assert waiting_numbers(institution_id) == []
@@ -0,0 +1,34 @@
+"""
+Moteur asynchrone : database_async.create_async_sqlite_engine
+"""
+
+import asyncio
+import os
+
+from sqlalchemy import text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from database import DB_POOL_SIZE
+from database_async import ASYNC_DATABASE_URL, create_async_sqlite_engine
+
+
+def test_file_url_gets_a_sized_queue_pool(tmp_path):
+    # Sans poolclass explicite, sqlalchemy 2.0.36 choisit un NullPool et
+    # refuse pool_size : la création même du moteur est le test
+    url = f"sqlite+aiosqlite:///{os.path.join(tmp_path, 'pool.db')}"
+    engine = create_async_sqlite_engine(url, profile="production")
+
+    async def journal_mode():
+        async with engine.connect() as connection:
+            mode = (await connection.execute(text("PRAGMA journal_mode"))).scalar()
+        await engine.dispose()
+        return mode
+
+    assert isinstance(engine.pool, AsyncAdaptedQueuePool)
+    assert engine.pool.size() == DB_POOL_SIZE
+    assert asyncio.run(journal_mode()).lower() == "wal"
+
+
+def test_legacy_profile_keeps_default_pool():
+    engine = create_async_sqlite_engine(ASYNC_DATABASE_URL, profile="legacy")
+    assert not isinstance(engine.pool, AsyncAdaptedQueuePool)
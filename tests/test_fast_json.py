@@ -0,0 +1,34 @@
+"""
+Mode rapide des routes de lecture : fast_json.respond
+"""
+
+import pytest
+
+import crud
+import fast_json
+import schemas
+
+
+@pytest.fixture
+def ticket_number(db, institution_id):
+    return crud.create_ticket(db, schemas.TicketCreate(institution_id=institution_id)).ticket_number
+
+
+@pytest.mark.parametrize("url", [
+    "/institutions",
+    "/institutions/type/banque",
+    "/institutions/{institution_id}",
+    "/queue/{institution_id}",
+    "/tickets/{ticket_number}",
+    "/tickets/{ticket_number}/stats",
+])
+def test_fast_path_returns_the_same_json(client, monkeypatch, institution_id, ticket_number, url):
+    url = url.format(institution_id=institution_id, ticket_number=ticket_number)
+    monkeypatch.setattr(fast_json, "FAST_JSON", False)
+    standard = client.get(url)
+    monkeypatch.setattr(fast_json, "FAST_JSON", True)
+    fast = client.get(url)
+
+    assert standard.status_code == fast.status_code == 200
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == standard.json()
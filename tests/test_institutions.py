@@ -0,0 +1,37 @@
+"""
+Liste des institutions : GET /institutions (curseur, et skip déprécié)
+"""
+
+
+def all_pages(client, limit: int) -> list:
+    ids, params = [], {"limit": limit}
+    while True:
+        response = client.get("/institutions", params=params)
+        assert response.status_code == 200
+        ids += [institution["id"] for institution in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+        params = {"limit": limit, "cursor": cursor}
+
+
+def test_cursor_pages_cover_every_institution(client, institution_id):
+    ids = all_pages(client, limit=5)
+    assert ids == sorted(set(ids))
+    assert institution_id in ids
+
+
+def test_deprecated_skip_still_pages(client, institution_id):
+    ids = all_pages(client, limit=5)
+
+    response = client.get("/institutions", params={"skip": 5, "limit": 5})
+
+    assert response.status_code == 200
+    assert response.headers["Deprecation"] == "true"
+    assert [institution["id"] for institution in response.json()] == ids[5:10]
+
+
+def test_skip_and_cursor_are_exclusive(client):
+    cursor = client.get("/institutions", params={"limit": 1}).headers["X-Next-Cursor"]
+    response = client.get("/institutions", params={"skip": 1, "cursor": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,30 @@
+"""
+Mise à jour du schéma d'une base existante : migrations.upgrade
+"""
+
+import os
+
+from sqlalchemy import create_engine
+
+import migrations
+
+
+def test_obsolete_ticket_indexes_are_dropped(tmp_path):
+    bind = create_engine(f"sqlite:///{os.path.join(tmp_path, 'old.db')}")
+    migrations.upgrade(bind)
+    # Base créée avant leur retrait de models.py
+    with bind.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE INDEX ix_tickets_institution_status_position ON tickets (institution_id, status, queue_position)"
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX ix_tickets_waiting ON tickets (institution_id, queue_position) WHERE status = 'WAITING'"
+        )
+
+    changes = migrations.upgrade(bind)
+    assert {f"- {name}" for name in migrations.OBSOLETE_INDEXES} <= set(changes)
+    with bind.begin() as connection:
+        names = {row[0] for row in connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert names.isdisjoint(migrations.OBSOLETE_INDEXES)
+    assert migrations.upgrade(bind) == []
+    bind.dispose()
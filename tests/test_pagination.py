@@ -0,0 +1,23 @@
+"""
+Pagination par curseur : pagination.decode_cursor
+"""
+
+import pytest
+
+import pagination
+
+
+@pytest.mark.parametrize("path, key", [
+    ("/institutions", [2 ** 63]),
+    ("/admin/operators", [2 ** 63]),
+    ("/admin/institutions/1/operators", [-2 ** 63 - 1]),
+    ("/users/1/tickets", ["2026-10-18T09:00:00", 10 ** 23]),
+])
+def test_out_of_range_cursor_is_rejected(client, path, key):
+    # Entier hors de la plage de SQLite : 400, pas d'OverflowError (500)
+    assert client.get(path, params={"cursor": pagination.encode_cursor(*key)}).status_code == 400
+
+
+def test_sql_integer_bounds_are_accepted():
+    for value in (pagination.MIN_SQL_INTEGER, pagination.MAX_SQL_INTEGER):
+        assert pagination.decode_cursor(pagination.encode_cursor(value), int) == (value,)
@@ -0,0 +1,27 @@
+"""
+Un seul processus par base : queue_engine.acquire_process_lock
+"""
+
+import os
+import subprocess
+import sys
+
+from database import engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_second_process_on_same_database_is_refused(client):
+    # L'application des tests détient le verrou ; un autre processus doit être refusé
+    result = subprocess.run(
+        [sys.executable, "-c", f"import queue_engine; queue_engine.acquire_process_lock({engine.url.database!r})"],
+        cwd=ROOT, env=os.environ.copy(), capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode != 0
+    assert "ProcessLockError" in result.stderr
+
+
+def test_lock_is_reentrant_in_same_process(client):
+    import queue_engine
+
+    queue_engine.acquire_process_lock(engine.url.database)
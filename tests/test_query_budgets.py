@@ -0,0 +1,58 @@
+"""
+Requêtes SQL par route : budgets de tests/conftest.py (ROUTE_QUERY_BUDGETS)
+"""
+
+import pytest
+
+import crud
+import crud_users
+import schemas
+
+
+@pytest.fixture
+def user_id(db, institution_id):
+    citizen = crud_users.create_user(db, schemas.UserCreate(
+        name="Citoyen", email=f"budget-citoyen{institution_id}@queueflow.sn", password="citoyen123"
+    ))
+    crud.issue_tickets(db, [
+        schemas.TicketCreate(institution_id=institution_id, user_id=citizen.id) for _ in range(3)
+    ])
+    return citizen.id
+
+
+def test_create_ticket(client, query_budget, institution_id):
+    with query_budget("POST /tickets"):
+        response = client.post("/tickets", json={"institution_id": institution_id})
+    assert response.status_code == 201
+
+
+def test_queue_info(client, query_budget, institution_id):
+    client.post("/tickets", json={"institution_id": institution_id})
+    with query_budget("GET /queue/{institution_id}"):
+        response = client.get(f"/queue/{institution_id}")
+    assert response.json()["people_waiting"] == 1
+
+
+def test_call_next_ticket(client, query_budget, institution_id, operator_id):
+    client.post("/tickets", json={"institution_id": institution_id})
+    with query_budget("POST /operator/next-ticket"):
+        response = client.post(
+            "/operator/next-ticket", params={"institution_id": institution_id, "operator_id": operator_id}
+        )
+    assert response.json()["ticket"] is not None
+
+
+def test_user_tickets(client, query_budget, user_id):
+    with query_budget("GET /users/{user_id}/tickets"):
+        first = client.get(f"/users/{user_id}/tickets", params={"limit": 2})
+    with query_budget("GET /users/{user_id}/tickets"):
+        second = client.get(
+            f"/users/{user_id}/tickets", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]}
+        )
+    assert len(first.json()) + len(second.json()) == 3
+
+
+def test_budget_is_enforced(client, query_budget, institution_id):
+    with pytest.raises(AssertionError, match="GET /queue"):
+        with query_budget("GET /queue/{institution_id}"):
+            client.post("/tickets", json={"institution_id": institution_id})
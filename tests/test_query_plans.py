@@ -0,0 +1,164 @@
+"""
+Plans d'exécution des requêtes : aucune lecture complète d'une table
+====================================================================
+Chaque scénario appelle des fonctions de crud (et des tâches de fond)
+en enregistrant les instructions SQL exécutées, puis passe chacune par
+EXPLAIN QUERY PLAN. Le test échoue sur un "SCAN <table>" (lecture de
+toute la table ou de tout un index) ou un "USE TEMP B-TREE" (tri sans
+index), sauf exception déclarée dans ALLOWED avec sa raison.
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+import archive
+import crud
+import crud_users
+import daily_counters
+import metrics
+import models
+import schemas
+from database import engine
+from institution_cache import institution_cache
+from queue_engine import waiting_queues
+
+# Lectures complètes acceptées : (début du plan, début de l'instruction) -> raison
+ALLOWED = {
+    ("SCAN institutions", "SELECT institutions.id AS institutions_id, institutions.name AS institutions_name, institutions.type"):
+        "cache des institutions : toutes les lignes, une fois (quelques dizaines)",
+    ("SCAN institutions", "SELECT institutions.id AS institutions_id, institutions.name AS institutions_name, queues.average_service_time"):
+        "rechargement des files : toutes les institutions, une fois au démarrage",
+    ("SCAN queues", "UPDATE queues SET total_tickets_today"):
+        "remise à zéro quotidienne : une ligne par institution, une fois par jour",
+    ("SCAN users USING COVERING INDEX", "SELECT count(users.id)"):
+        "statistiques admin : compte tous les utilisateurs, sur l'index seul",
+    ("USE TEMP B-TREE FOR GROUP BY", "SELECT tickets.institution_id"):
+        "statistiques du jour : regroupe les seuls tickets de la plage lue par index",
+    ("USE TEMP B-TREE FOR GROUP BY", "SELECT tickets_archive.institution_id"):
+        "statistiques du jour : regroupe les seules lignes de la plage lue par index",
+    ("USE TEMP B-TREE FOR ORDER BY", "SELECT tickets.id FROM tickets WHERE tickets.status IN"):
+        "archivage : trie les tickets terminés, lus par (status, created_at), qui quittent la table lot après lot",
+}
+
+_PROBLEM = re.compile(r"^(?:SCAN \w+|USE TEMP B-TREE)")
+
+
+@contextmanager
+def captured_statements():
+    """Instructions de lecture / modification exécutées dans le bloc"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        keyword = statement.lstrip().split(None, 1)[0].upper()
+        if keyword in ("SELECT", "UPDATE", "DELETE", "WITH") and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def full_scans(statements) -> list:
+    """(détail du plan, instruction) des lectures complètes non autorisées"""
+    problems = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            sql = " ".join(statement.split())
+            for row in plan:
+                detail = row[-1]
+                if _PROBLEM.match(detail) is None:
+                    continue
+                if any(detail.startswith(plan_start) and sql.startswith(sql_start) for plan_start, sql_start in ALLOWED):
+                    continue
+                problems.append((detail, sql[:300]))
+    return problems
+
+
+@pytest.fixture
+def ticket_data(db, institution_id):
+    """Une institution avec des tickets à tous les stades, un opérateur et un citoyen"""
+    operator = crud_users.create_user(db, schemas.UserCreate(
+        name="Opérateur", email=f"operator{institution_id}@queueflow.sn", password="operator123",
+        role=models.UserRole.OPERATOR, institution_id=institution_id
+    ))
+    citizen = crud_users.create_user(db, schemas.UserCreate(
+        name="Citoyen", email=f"citoyen{institution_id}@queueflow.sn", password="citoyen123"
+    ))
+    issued = crud.issue_tickets(db, [
+        schemas.TicketCreate(institution_id=institution_id, user_id=citizen.id) for _ in range(6)
+    ])
+    return {
+        "institution_id": institution_id,
+        "operator_id": operator.id,
+        "user_id": citizen.id,
+        "numbers": [stats.ticket_number for stats in issued],
+    }
+
+
+def scenario_tickets(db, data):
+    first, second = data["numbers"][:2]
+    ticket = crud.get_ticket_by_number(db, first)
+    crud.create_ticket(db, schemas.TicketCreate(institution_id=data["institution_id"]))
+    crud.issue_ticket(db, schemas.TicketCreate(institution_id=data["institution_id"]))
+    crud.get_ticket_by_number(db, str(ticket.id))
+    crud.get_ticket_by_number(db, "H001")
+    crud.get_ticket_stats(db, first)
+    crud.get_ticket_stats(db, str(ticket.id))
+    crud.update_ticket_status(db, second, models.TicketStatus.CANCELLED)
+    crud.get_ticket_stats(db, second)
+    crud.get_queue_by_institution(db, data["institution_id"])
+    crud.get_queue_info(db, data["institution_id"])
+    crud.get_waiting_tickets_by_institution(db, data["institution_id"])
+
+
+def scenario_operators(db, data):
+    operator_id = data["operator_id"]
+    called = crud_users.call_next_ticket(db, data["institution_id"], operator_id)
+    crud_users.get_operator_stats(db, operator_id)
+    crud_users.complete_ticket(db, called.ticket_number, operator_id)
+    called = crud_users.call_next_ticket(db, data["institution_id"], operator_id)
+    crud_users.mark_ticket_missed(db, called.ticket_number)
+    crud_users.get_operator_stats(db, operator_id)
+    page = crud_users.get_operators_by_institution(db, data["institution_id"], limit=1)
+    crud_users.get_operators_by_institution(db, data["institution_id"], cursor=page.next_cursor or None, limit=1)
+    page = crud_users.get_all_operators(db, limit=1)
+    crud_users.get_all_operators(db, cursor=page.next_cursor, limit=1)
+
+
+def scenario_users(db, data):
+    user = crud_users.get_user_by_id(db, data["user_id"])
+    crud_users.get_user_by_email(db, user.email)
+    crud_users.authenticate_user(db, user.email, "citoyen123")
+    page = crud_users.get_user_ticket_history(db, data["user_id"], limit=2)
+    crud_users.get_user_ticket_history(db, data["user_id"], limit=2, cursor=page.next_cursor)
+
+
+def scenario_admin(db, data):
+    crud_users.get_admin_stats(db)
+    crud_users.reconcile_daily_counters(db)
+    daily_counters.get_counters(db, datetime.utcnow().date(), data["institution_id"])
+    metrics.collect_queues(db)
+
+
+def scenario_background(db, data):
+    institution_cache.warm(db)
+    waiting_queues.rebuild(db)
+    archive.archive_finished_tickets(db, cutoff=datetime.utcnow() + timedelta(days=1))
+    archive.rollover(db, datetime.utcnow() + timedelta(days=1))
+
+
+@pytest.mark.parametrize("scenario", [
+    scenario_tickets, scenario_operators, scenario_users, scenario_admin, scenario_background,
+], ids=lambda scenario: scenario.__name__)
+def test_queries_do_not_scan_tables(db, ticket_data, scenario):
+    with captured_statements() as statements:
+        scenario(db, ticket_data)
+    assert statements
+    assert full_scans(statements) == []
@@ -0,0 +1,104 @@
+"""
+File en mémoire : queue_engine.InstitutionQueue
+"""
+
+import random
+
+from queue_engine import InstitutionQueue, WaitingTicket
+
+
+def make_queue(count: int) -> InstitutionQueue:
+    queue = InstitutionQueue(1, "Banque")
+    for n in range(1, count + 1):
+        queue.push(WaitingTicket(n, f"B01-{n:03d}", 1, n))
+    return queue
+
+
+def ids(queue: InstitutionQueue) -> list:
+    return [ticket.id for ticket in queue.snapshot()]
+
+
+def test_restore_puts_tickets_back_in_their_places():
+    queue = make_queue(4)
+    first, second = queue.pop(), queue.pop()
+    assert ids(queue) == [3, 4]
+
+    queue.restore(second)
+    queue.restore(first)
+
+    assert ids(queue) == [1, 2, 3, 4]
+    assert [queue.rank(n) for n in (1, 2, 3, 4)] == [0, 1, 2, 3]
+
+
+def test_restore_after_index_rebuild():
+    queue = make_queue(3)
+    first = queue.pop()
+    # Assez de tickets pour dépasser la capacité de l'arbre et renuméroter
+    for n in range(4, 200):
+        queue.push(WaitingTicket(n, f"B01-{n:03d}", 1, n))
+
+    queue.restore(first)
+
+    assert ids(queue) == list(range(1, 200))
+    assert queue.rank(1) == 0 and queue.rank(2) == 1 and queue.rank(199) == 198
+
+
+def test_released_ticket_leaves_the_queue():
+    queue = make_queue(2)
+    first = queue.pop()
+    queue.release(first.id)
+    queue.restore(first)
+
+    assert ids(queue) == [2]
+    assert queue.peek().id == 2
+
+
+def assert_ranks_match_snapshot(queue: InstitutionQueue) -> None:
+    """Personnes devant chaque ticket = son index dans la file"""
+    for index, ticket in enumerate(queue.snapshot()):
+        assert queue.rank(ticket.id) == index, ticket.id
+    assert len(queue.snapshot()) == len(queue)
+
+
+def test_ranks_after_removals_from_the_middle():
+    queue = make_queue(300)
+
+    # Tickets annulés au milieu de la file, par tranches
+    for n in range(100, 150):
+        queue.remove(n)
+    assert_ranks_match_snapshot(queue)
+    assert queue.rank(99) == 98 and queue.rank(150) == 99
+
+    # Puis dans le désordre, tête et queue comprises
+    remaining = ids(queue)
+    shuffled = random.Random(4).sample(remaining, 120)
+    for n in shuffled:
+        queue.remove(n)
+        assert queue.rank(n) is None
+    assert ids(queue) == [n for n in remaining if n not in set(shuffled)]
+    assert_ranks_match_snapshot(queue)
+
+    # Nouveaux tickets (renumérotation de l'arbre au-delà de sa capacité)
+    for n in range(301, 500):
+        queue.push(WaitingTicket(n, f"B01-{n:03d}", 1, n))
+    assert_ranks_match_snapshot(queue)
+
+
+def test_ranks_after_hold_and_restore_among_removals():
+    queue = make_queue(40)
+    for n in (5, 12, 13, 30):
+        queue.remove(n)
+
+    # Deux appels en cours : le premier échoue (restore), le second aboutit
+    first, second = queue.pop(), queue.pop()
+    assert_ranks_match_snapshot(queue)
+    assert queue.rank(3) == 0
+
+    queue.remove(20)
+    queue.restore(first)
+    queue.release(second.id)
+
+    assert ids(queue)[0] == first.id
+    assert second.id not in ids(queue)
+    assert_ranks_match_snapshot(queue)
+    assert queue.ticket_stats(queue.get_by_id(40)).people_ahead == len(queue) - 1
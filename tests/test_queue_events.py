@@ -0,0 +1,63 @@
+"""
+Temps réel : abonnement à la file d'une institution (WebSocket et SSE)
+"""
+
+import asyncio
+import json
+
+import crud_async
+import main
+import schemas
+from database_async import AsyncSessionLocal
+
+
+def test_websocket_on_empty_queue_receives_first_ticket(client, institution_id):
+    with client.websocket_connect(f"/ws/queue/{institution_id}") as websocket:
+        snapshot = websocket.receive_json()
+        assert snapshot["event"] == "snapshot"
+        assert snapshot["queue"]["people_waiting"] == 0
+
+        ticket = client.post("/tickets", json={"institution_id": institution_id}).json()
+
+        message = websocket.receive_json()
+        assert message["event"] == "ticket_created"
+        assert message["ticket_number"] == ticket["ticket_number"]
+        assert message["queue"]["people_waiting"] == 1
+
+
+class ConnectedRequest:
+    """Client SSE toujours connecté"""
+
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def test_sse_on_empty_queue_receives_first_ticket(client, institution_id):
+    # Le TestClient attend la fin d'une réponse en flux : le flux SSE est
+    # lu directement, dans la boucle de l'application
+    async def scenario():
+        response = await main.queue_events_stream(institution_id, ConnectedRequest())
+        events = response.body_iterator
+        try:
+            snapshot = await asyncio.wait_for(events.__anext__(), timeout=5)
+            async with AsyncSessionLocal() as db:
+                ticket = await crud_async.issue_ticket(db, schemas.TicketCreate(institution_id=institution_id))
+            message = await asyncio.wait_for(events.__anext__(), timeout=5)
+        finally:
+            await events.aclose()
+        return snapshot, ticket, message
+
+    snapshot, ticket, message = client.portal.call(scenario)
+
+    snapshot = json.loads(snapshot[len("data: "):])
+    assert snapshot["event"] == "snapshot"
+    assert snapshot["queue"]["people_waiting"] == 0
+
+    message = json.loads(message[len("data: "):])
+    assert message["event"] == "ticket_created"
+    assert message["ticket_number"] == ticket.ticket_number
+    assert message["queue"]["people_waiting"] == 1
+
+
+def test_unknown_queue_is_refused(client):
+    assert client.get("/queue/999999/events").status_code == 404
@@ -0,0 +1,19 @@
+"""
+État des files : GET /queue/{institution_id}
+"""
+
+
+def test_empty_queue_is_found(client, institution_id):
+    response = client.get(f"/queue/{institution_id}")
+    assert response.status_code == 200
+    assert response.json()["people_waiting"] == 0
+
+
+def test_queue_counts_waiting_tickets(client, institution_id):
+    for _ in range(2):
+        assert client.post("/tickets", json={"institution_id": institution_id}).status_code == 201
+    assert client.get(f"/queue/{institution_id}").json()["people_waiting"] == 2
+
+
+def test_unknown_institution_is_not_found(client):
+    assert client.get("/queue/999999").status_code == 404
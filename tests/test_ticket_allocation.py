@@ -0,0 +1,135 @@
+"""
+Numérotation des tickets : crud.allocate_ticket_sequence sous concurrence
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+import crud
+import main
+import models
+import schemas
+from database import SessionLocal
+from query_audit import query_budget, track_queries
+
+TICKETS = 2000
+CONCURRENCY = 200  # requêtes en vol (au-delà de la taille du pool)
+
+
+def issue(institution_id: int) -> tuple:
+    """Une borne : sa propre session, comme une requête HTTP"""
+    db = SessionLocal()
+    try:
+        ticket = crud.create_ticket(db, schemas.TicketCreate(institution_id=institution_id))
+        return ticket.service_day, ticket.sequence, ticket.ticket_number
+    finally:
+        db.close()
+
+
+def test_concurrent_post_tickets_get_unique_gap_free_numbers(client, db, institution_id):
+    # Route de production (async, aiosqlite), dans la boucle de l'application
+    async def post_tickets():
+        slots = asyncio.Semaphore(CONCURRENCY)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://queueflow") as http:
+            async def post():
+                async with slots:
+                    return await http.post("/tickets", json={"institution_id": institution_id})
+            return await asyncio.gather(*(post() for _ in range(TICKETS)))
+
+    with query_budget(4 * TICKETS, "POST /tickets") as log:
+        responses = client.portal.call(post_tickets)
+
+    assert [response.status_code for response in responses] == [201] * TICKETS
+    numbers = [response.json()["ticket_number"] for response in responses]
+    assert len(set(numbers)) == TICKETS
+
+    tickets = db.query(models.Ticket.service_day, models.Ticket.sequence).filter(
+        models.Ticket.institution_id == institution_id
+    ).all()
+    assert sorted(sequence for _, sequence in tickets) == list(range(1, TICKETS + 1))
+    assert len({day for day, _ in tickets}) == 1
+
+    # Aucune nouvelle tentative : une réservation et une insertion par ticket
+    reserved = sum(count for shape, count in log.shapes.items() if shape.startswith("UPDATE queues SET last_ticket_number"))
+    inserted = sum(count for shape, count in log.shapes.items() if shape.startswith("INSERT INTO tickets"))
+    assert (reserved, inserted) == (TICKETS, TICKETS)
+
+
+def test_issue_from_two_sessions_without_the_async_lock(db, institution_id):
+    # crud.issue_ticket direct (scripts) : pas de verrou asyncio, deux
+    # sessions en parallèle ; l'UPDATE ... RETURNING suffit à l'unicité
+    per_session = 100
+
+    def issue_many(_) -> tuple:
+        session = SessionLocal()
+        try:
+            # Journal propre au thread (le suivi des requêtes suit le contexte)
+            with track_queries() as log:
+                numbers = [
+                    crud.issue_ticket(session, schemas.TicketCreate(institution_id=institution_id)).ticket_number
+                    for _ in range(per_session)
+                ]
+            return numbers, log
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(issue_many, range(2)))
+
+    numbers = [number for batch, _ in results for number in batch]
+    assert len(set(numbers)) == 2 * per_session
+    sequences = db.query(models.Ticket.sequence).filter(models.Ticket.institution_id == institution_id).all()
+    assert sorted(sequence for sequence, in sequences) == list(range(1, 2 * per_session + 1))
+
+    # Aucune nouvelle tentative : une réservation et une insertion par ticket
+    for _, log in results:
+        reserved = sum(count for shape, count in log.shapes.items() if shape.startswith("UPDATE queues SET last_ticket_number"))
+        inserted = sum(count for shape, count in log.shapes.items() if shape.startswith("INSERT INTO tickets"))
+        assert (reserved, inserted) == (per_session, per_session)
+
+
+def test_numbering_restarts_on_new_service_day(db, institution_id):
+    for _ in range(3):
+        issue(institution_id)
+
+    # Les tickets d'hier : le compteur de la queue date de la veille
+    queue = crud.get_queue_by_institution(db, institution_id)
+    today = queue.service_day
+    db.query(models.Ticket).filter(models.Ticket.institution_id == institution_id).update(
+        {"service_day": today - 1}, synchronize_session=False
+    )
+    queue.service_day = today - 1
+    db.commit()
+
+    day, sequence, number = issue(institution_id)
+    assert (day, sequence) == (today, 1)
+    assert number.endswith("-001")
+
+    db.expire_all()
+    queue = crud.get_queue_by_institution(db, institution_id)
+    assert (queue.service_day, queue.last_ticket_number, queue.total_tickets_today) == (today, 1, 1)
+
+
+def test_failed_batch_does_not_leave_a_new_queue_behind(db, institution_id, monkeypatch):
+    # Institution sans ligne queues : la première émission la crée
+    db.query(models.Queue).filter(models.Queue.institution_id == institution_id).delete()
+    db.commit()
+
+    def failing_counters(*args, **kwargs):
+        raise RuntimeError("échec après l'insertion")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(crud.daily_counters, "record_created", failing_counters)
+        with pytest.raises(RuntimeError):
+            crud.issue_tickets(db, [schemas.TicketCreate(institution_id=institution_id) for _ in range(3)])
+
+    assert crud.get_queue_by_institution(db, institution_id) is None
+    assert db.query(models.Ticket).filter(models.Ticket.institution_id == institution_id).count() == 0
+
+    stats = crud.issue_tickets(db, [schemas.TicketCreate(institution_id=institution_id) for _ in range(3)])
+    assert [ticket.queue_position for ticket in stats] == [1, 2, 3]
+    assert crud.get_queue_by_institution(db, institution_id).last_ticket_number == 3
@@ -0,0 +1,45 @@
+"""
+Recherche d'un ticket : numéro affiché ou identifiant
+"""
+
+from datetime import date
+
+import pytest
+
+import crud
+
+HUGE = "9" * 23
+
+
+@pytest.mark.parametrize("path", [
+    f"/tickets/{HUGE}",
+    f"/tickets/{HUGE}/stats",
+    f"/tickets/H{HUGE}-001",
+    f"/tickets/H{HUGE}-1018-001",
+    f"/tickets/H{HUGE}-1018-001/stats",
+    f"/tickets/H01-1018-{HUGE}/stats",
+    "/tickets/H01-1399-001",
+    f"/tickets/{HUGE}/events",
+])
+def test_out_of_range_numbers_are_not_found(client, path):
+    assert client.get(path).status_code == 404
+
+
+@pytest.mark.parametrize("path", [
+    f"/operator/complete-ticket/{HUGE}",
+    f"/operator/miss-ticket/H{HUGE}-001",
+    f"/operator/miss-ticket/H{HUGE}-1018-001",
+])
+def test_out_of_range_numbers_cannot_be_updated(client, path):
+    assert client.put(path, params={"operator_id": 1}).status_code == 404
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("H01-1018-007", (1, 20261018, 7)),
+    ("H01-1231-007", (1, 20251231, 7)),   # jour MMJJ à venir : l'an dernier
+    ("H01-0229-007", (1, 20240229, 7)),   # dernier 29 février passé
+    ("H01-1399-007", None),
+    ("H01-007", None),                    # ancien format : recherche par texte
+])
+def test_ticket_code_resolves_most_recent_service_day(code, expected):
+    assert crud.parse_ticket_number(code, today=date(2026, 10, 18)) == expected
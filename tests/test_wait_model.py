@@ -0,0 +1,38 @@
+"""
+Historique du modèle d'attente : wait_model.load_history
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import crud
+import models
+import schemas
+import wait_model
+
+
+def test_history_is_read_in_typed_columns(db, institution_id):
+    since = datetime.utcnow() - timedelta(minutes=1)
+    served = crud.create_ticket(db, schemas.TicketCreate(institution_id=institution_id))
+    crud.create_ticket(db, schemas.TicketCreate(institution_id=institution_id))
+    crud.update_ticket_status(db, served.ticket_number, models.TicketStatus.CALLED)
+    crud.update_ticket_status(db, served.ticket_number, models.TicketStatus.COMPLETED)
+
+    history = wait_model.load_history(db, since)
+    mine = history.institution_id == institution_id
+
+    assert history.institution_id.dtype == np.int64
+    assert history.operator_id.dtype == np.int64
+    assert history.completed_at.dtype == np.dtype("datetime64[us]")
+    assert mine.sum() == 2
+    # Sans opérateur : -1 ; seul le ticket complété a des dates de service
+    assert (history.operator_id[mine] == -1).all()
+    assert np.isnat(history.completed_at[mine]).sum() == 1
+    assert (history.completed_at[mine] >= history.called_at[mine]).sum() == 1
+
+
+def test_empty_window_gives_empty_columns(db):
+    history = wait_model.load_history(db, datetime(2000, 1, 1), datetime(2000, 1, 2))
+    assert len(history) == 0
+    assert history.called_at.dtype == np.dtype("datetime64[us]")
@@ -0,0 +1,310 @@
+"""
+wait_model.py - Prédiction du Temps d'Attente
+=============================================
+L'attente d'un ticket était estimée par `personnes devant * temps de
+service moyen`, comme si un seul guichet était ouvert et que le rythme
+ne changeait jamais dans la journée.
+
+Ce module ajuste, à partir de l'historique des tickets, un modèle par
+institution, jour de la semaine et heure (UTC) :
+
+- temps de service moyen (called_at -> completed_at)
+- nombre moyen d'opérateurs actifs pendant cette heure
+
+La capacité d'un créneau (tickets servis par minute) vaut
+opérateurs / temps de service. L'attente est obtenue en consommant la
+file créneau par créneau à partir de maintenant ; un créneau sans assez
+d'historique utilise le temps de service estimé en direct
+(service_time.py) avec un seul guichet. Les tickets créés après un
+ticket passent derrière lui : les arrivées n'entrent pas dans son
+attente et ne sont pas modélisées.
+
+L'historique est lu en colonnes (une requête, sans objets ORM) et ajusté
+avec NumPy. Le modèle est gardé en mémoire et recalculé en arrière-plan
+par WaitModelRefresher : aucune requête d'historique sur le chemin d'une
+requête HTTP.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+
+# Historique utilisé pour l'ajustement (jours)
+WAIT_MODEL_DAYS = int(os.getenv("QUEUEFLOW_WAIT_MODEL_DAYS", "56"))
+
+# Nombre minimal de services mesurés pour faire confiance à un créneau
+WAIT_MODEL_MIN_SAMPLES = int(os.getenv("QUEUEFLOW_WAIT_MODEL_MIN_SAMPLES", "20"))
+
+# Intervalle entre deux ajustements (secondes)
+WAIT_MODEL_REFRESH = float(os.getenv("QUEUEFLOW_WAIT_MODEL_REFRESH", "900"))
+
+# Services ignorés au-delà (ticket oublié ouvert, horloge faussée...)
+MAX_SERVICE_MINUTES = 240.0
+
+SLOTS_PER_WEEK = 7 * 24
+# Lignes lues par lot dans le curseur
+FETCH_SIZE = 50_000
+
+
+# ========================================
+# LECTURE EN COLONNES
+# ========================================
+
+@dataclass
+class TicketHistory:
+    """Historique des tickets, une colonne NumPy par champ"""
+    institution_id: np.ndarray   # int64
+    operator_id: np.ndarray      # int64 (-1 si aucun)
+    called_at: np.ndarray        # datetime64[us] (NaT si jamais appelé)
+    completed_at: np.ndarray     # datetime64[us] (NaT si pas complété)
+
+    def __len__(self) -> int:
+        return len(self.institution_id)
+
+
+def load_history(db: Session, since: datetime, until: Optional[datetime] = None) -> TicketHistory:
+    """
+    Lit les tickets créés depuis une date, en colonnes
+
+    Une seule requête SQL brute sur `tickets` et `tickets_archive`.
+    Chaque lot de lignes est transposé puis converti colonne par colonne
+    (np.fromiter pour les entiers ; les dates restent des chaînes ISO,
+    converties par NumPy). Pas de tableau objet sur les lignes : NumPy
+    y traiterait chaque Row comme une séquence, ~20x plus lent.
+
+    Args:
+        db: Session de base de données
+        since: Début de la fenêtre (created_at)
+        until: Fin de la fenêtre (maintenant par défaut)
+    """
+    until = until or datetime.utcnow()
+    # Tickets récents et archivés (voir archive.py)
+    select_columns = (
+        "SELECT institution_id, COALESCE(operator_id, -1), "
+        "CASE WHEN status = 'COMPLETED' THEN called_at END, "
+        "CASE WHEN status = 'COMPLETED' THEN completed_at END "
+        "FROM {table} WHERE created_at >= ? AND created_at < ?"
+    )
+    bounds = (since.isoformat(sep=" "), until.isoformat(sep=" "))
+    result = db.connection().exec_driver_sql(
+        select_columns.format(table="tickets") + " UNION ALL " + select_columns.format(table="tickets_archive"),
+        bounds + bounds
+    )
+
+    institution_ids = [np.empty(0, dtype=np.int64)]
+    operator_ids = [np.empty(0, dtype=np.int64)]
+    called_at = [np.empty(0, dtype="datetime64[us]")]
+    completed_at = [np.empty(0, dtype="datetime64[us]")]
+    while True:
+        rows = result.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        institutions, operators, called, completed = zip(*rows)
+        institution_ids.append(np.fromiter(institutions, dtype=np.int64, count=len(rows)))
+        operator_ids.append(np.fromiter(operators, dtype=np.int64, count=len(rows)))
+        called_at.append(np.array(called, dtype="datetime64[us]"))
+        completed_at.append(np.array(completed, dtype="datetime64[us]"))
+
+    return TicketHistory(
+        institution_id=np.concatenate(institution_ids),
+        operator_id=np.concatenate(operator_ids),
+        called_at=np.concatenate(called_at),
+        completed_at=np.concatenate(completed_at),
+    )
+
+
+# ========================================
+# AJUSTEMENT
+# ========================================
+
+def _hours(values: np.ndarray) -> np.ndarray:
+    """Heures écoulées depuis 1970 (entier)"""
+    return values.astype("datetime64[h]").astype(np.int64)
+
+
+def _slots(hours: np.ndarray) -> np.ndarray:
+    """Créneau de la semaine (lundi 0h = 0 ... dimanche 23h = 167)"""
+    # 1970-01-01 était un jeudi (jour 3 si lundi = 0)
+    weekday = (hours // 24 + 3) % 7
+    return weekday * 24 + hours % 24
+
+
+class WaitModel:
+    """Tables ajustées : une ligne par institution, une colonne par créneau"""
+
+    def __init__(self, institution_ids: np.ndarray, service_minutes: np.ndarray,
+                 servers: np.ndarray, samples: np.ndarray, fitted_at: datetime, rows: int):
+        self.index: Dict[int, int] = {int(i): n for n, i in enumerate(institution_ids)}
+        self.service_minutes = service_minutes
+        self.servers = servers
+        self.samples = samples
+        self.fitted_at = fitted_at
+        self.rows = rows
+
+    @classmethod
+    def fit(cls, history: TicketHistory) -> "WaitModel":
+        """Ajuste le modèle (vectorisé, sans boucle Python par ticket)"""
+        institution_ids, inst = np.unique(history.institution_id, return_inverse=True)
+        size = len(institution_ids) * SLOTS_PER_WEEK
+
+        # Services mesurés, rangés dans le créneau de leur appel
+        served = ~np.isnat(history.called_at) & ~np.isnat(history.completed_at)
+        minutes = np.zeros(len(history))
+        minutes[served] = (
+            (history.completed_at[served] - history.called_at[served]) / np.timedelta64(1, "m")
+        )
+        served &= (minutes >= 0) & (minutes <= MAX_SERVICE_MINUTES)
+
+        called_hours = _hours(history.called_at[served])
+        served_inst = inst[served]
+        served_keys = served_inst * SLOTS_PER_WEEK + _slots(called_hours)
+
+        samples = np.bincount(served_keys, minlength=size)
+        total_minutes = np.bincount(served_keys, weights=minutes[served], minlength=size)
+        service_minutes = total_minutes / np.maximum(samples, 1)
+
+        # Opérateurs actifs : couples (heure, opérateur) distincts, moyennés
+        # sur les heures où l'institution a servi au moins un ticket.
+        # Les couples sont encodés en un seul entier pour np.unique.
+        first_hour = called_hours.min() if len(called_hours) else 0
+        hour_span = int(called_hours.max() - first_hour + 1) if len(called_hours) else 1
+        open_hours = served_inst * hour_span + (called_hours - first_hour)
+        operators = history.operator_id[served] + 1
+        operator_span = int(operators.max() + 1) if len(operators) else 1
+
+        def count_by_slot(hour_keys: np.ndarray) -> np.ndarray:
+            institution, hour = np.divmod(hour_keys, hour_span)
+            return np.bincount(
+                institution * SLOTS_PER_WEEK + _slots(hour + first_hour), minlength=size
+            )
+
+        open_count = count_by_slot(np.unique(open_hours))
+        active = np.unique(open_hours * operator_span + operators)
+        active_count = count_by_slot(active // operator_span)
+        servers = active_count / np.maximum(open_count, 1)
+
+        shape = (len(institution_ids), SLOTS_PER_WEEK)
+        return cls(
+            institution_ids,
+            service_minutes=service_minutes.reshape(shape),
+            servers=servers.reshape(shape),
+            samples=samples.reshape(shape),
+            fitted_at=datetime.utcnow(),
+            rows=len(history)
+        )
+
+    def capacity(self, institution_id: int, when: datetime) -> Optional[float]:
+        """Tickets servis par minute dans le créneau, ou None sans historique"""
+        row = self.index.get(institution_id)
+        if row is None:
+            return None
+        slot = when.weekday() * 24 + when.hour
+        if self.samples[row, slot] < WAIT_MODEL_MIN_SAMPLES:
+            return None
+        service = self.service_minutes[row, slot]
+        if service <= 0:
+            return None
+        return max(self.servers[row, slot], 1.0) / service
+
+
+# ========================================
+# MODÈLE COURANT ET RAFRAÎCHISSEMENT
+# ========================================
+
+class WaitModelCache:
+    """Dernier modèle ajusté, remplacé en bloc à chaque rafraîchissement"""
+
+    def __init__(self):
+        self.model: Optional[WaitModel] = None
+
+    def refresh(self, db: Session, days: int = WAIT_MODEL_DAYS) -> WaitModel:
+        """Relit l'historique et remplace le modèle"""
+        now = datetime.utcnow()
+        history = load_history(db, now - timedelta(days=days), now)
+        self.model = WaitModel.fit(history)
+        return self.model
+
+    def estimate_wait(self, institution_id: int, people_ahead: int,
+                      fallback_service_time: int, now: Optional[datetime] = None) -> int:
+        """
+        Attente estimée (minutes) pour un ticket avec `people_ahead` devant
+
+        Consomme la file créneau par créneau (au plus 48 heures) ; un
+        créneau sans historique suffisant sert au rythme d'un guichet avec
+        le temps de service estimé en direct.
+
+        Args:
+            institution_id: ID de l'institution
+            people_ahead: Nombre de personnes devant
+            fallback_service_time: Temps de service en direct (minutes)
+            now: Instant de départ (maintenant par défaut)
+        """
+        model = self.model
+        if people_ahead <= 0:
+            return 0
+        if model is None:
+            return people_ahead * fallback_service_time
+
+        fallback_rate = 1.0 / max(fallback_service_time, 1)
+        when = now or datetime.utcnow()
+        remaining, waited = float(people_ahead), 0.0
+        for _ in range(48):
+            rate = model.capacity(institution_id, when) or fallback_rate
+            slot_left = 60 - when.minute - when.second / 60
+            if rate * slot_left >= remaining:
+                waited += remaining / rate
+                remaining = 0
+                break
+            remaining -= rate * slot_left
+            waited += slot_left
+            when = when.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        if remaining:
+            waited += remaining / fallback_rate
+        return int(round(waited))
+
+
+class WaitModelRefresher:
+    """Thread qui réajuste le modèle à intervalle régulier"""
+
+    def __init__(self, cache: WaitModelCache, interval: float = WAIT_MODEL_REFRESH):
+        self.cache = cache
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Démarre le thread (premier ajustement immédiat, en arrière-plan)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="wait-model", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            db = SessionLocal()
+            try:
+                self.cache.refresh(db)
+            except Exception as e:
+                print(f"❌ Erreur ajustement du modèle d'attente: {e}")
+            finally:
+                db.close()
+            self._stopped.wait(self.interval)
+
+
+# Instances partagées par l'API
+wait_model = WaitModelCache()
+wait_model_refresher = WaitModelRefresher(wait_model)